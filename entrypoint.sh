@@ -7,5 +7,8 @@ python manage.py migrate
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+echo "Clearing request metrics of the previous deployment..."
+rm -rf "${METRICS_DIR:-tmp_metrics}"
+
 echo "Starting Gunicorn..."
 exec gunicorn --workers=3 --worker-class=gevent --timeout=120 --access-logfile=- --error-logfile=- --bind=0.0.0.0:8000 praevia_core.wsgi:application
@@ -2,8 +2,9 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.utils import timezone
 from .models import (
-    User, Action, Document, Contentieux, DossierATMP, Audit
+    User, Action, Blob, Document, Contentieux, DossierATMP, DossierAggregate, Audit, Job, JobStatus
 )
 
 # ───────────────────────────────
@@ -44,9 +45,9 @@ class ActionAdmin(admin.ModelAdmin):
 # ───────────────────────────────
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ('original_name', 'document_type', 'uploaded_by', 'contentieux', 'created_at')
-    list_filter = ('document_type',)
-    search_fields = ('original_name', 'mime_type')
+    list_display = ('original_name', 'document_type', 'uploaded_by', 'contentieux', 'processing_status', 'page_count', 'created_at')
+    list_filter = ('document_type', 'processing_status')
+    search_fields = ('original_name', 'mime_type', 'sha256')
     ordering = ('-created_at',)
 
 # ───────────────────────────────
@@ -78,3 +79,40 @@ class AuditAdmin(admin.ModelAdmin):
     list_filter = ('status', 'decision')
     search_fields = ('dossier_atmp__reference', 'auditor__email')
     ordering = ('-created_at',)
+
+# ───────────────────────────────
+# Dashboard aggregates Admin
+# ───────────────────────────────
+@admin.register(DossierAggregate)
+class DossierAggregateAdmin(admin.ModelAdmin):
+    list_display = ('status', 'case_type', 'count', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = ('status', 'case_type', 'count', 'updated_at')
+    ordering = ('status', 'case_type')
+
+# ───────────────────────────────
+# Blob Admin
+# ───────────────────────────────
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'ref_count', 'updated_at')
+    readonly_fields = ('sha256', 'size', 'ref_count', 'created_at', 'updated_at')
+    search_fields = ('sha256',)
+    ordering = ('-updated_at',)
+
+# ───────────────────────────────
+# Job Admin
+# ───────────────────────────────
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('attempts', 'locked_at', 'locked_by', 'result', 'last_error', 'created_by', 'created_at', 'updated_at', 'finished_at')
+    ordering = ('-created_at',)
+    actions = ('retry',)
+
+    @admin.action(description='Remettre en file (nouvelles tentatives)')
+    def retry(self, request, queryset):
+        queryset.exclude(status=JobStatus.RUNNING.value).update(
+            status=JobStatus.QUEUED.value, attempts=0, run_at=timezone.now(), finished_at=None,
+        )
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class PraeviaApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'praevia_api'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals, tasks  # noqa: F401
+        if settings.METRICS_ENABLED:
+            from .metrics import instrument
+            instrument()
+        if settings.SLOW_QUERY_MS > 0:
+            from . import slowqueries
+            slowqueries.instrument()
@@ -0,0 +1,211 @@
+# /home/siisi/praevia_gemini/praevia_api/async_views.py
+
+import asyncio
+import logging
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from.caching import response_cache
+from.conditional import not_modified, representation_etag, set_validators
+from.downloads import document_response
+from.fastjson import FastJSONRenderer
+from.models import Audit, Document
+from.serializers import AuditSerializer
+from.services import DashboardAggregateService, JuristDashboardService
+
+logger = logging.getLogger(__name__)
+
+# Async views answer JSON only: the browsable API stays on the sync views
+renderer = FastJSONRenderer()
+
+
+# --- Helpers ---
+def json_response(data, status_code=status.HTTP_200_OK):
+    response = HttpResponse(renderer.render(data), status=status_code, content_type=renderer.media_type)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def authenticate(request):
+    """
+    Runs DEFAULT_AUTHENTICATION_CLASSES (session, cached token) as an
+    IsAuthenticated DRF view would: sets request.user and returns None, or
+    returns the same 401/403 response DRF sends.
+    """
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = await sync_to_async(lambda: drf_request.user)()
+        if not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as exc:
+        # DRF answers 401 only when the first authenticator has a WWW-Authenticate scheme
+        auth_header = drf_request.authenticators[0].authenticate_header(drf_request)
+        response = json_response(
+            {"detail": exc.detail},
+            status.HTTP_401_UNAUTHORIZED if auth_header else status.HTTP_403_FORBIDDEN,
+        )
+        if auth_header:
+            response['WWW-Authenticate'] = auth_header
+        return response
+    request.user = user
+    return None
+
+
+def async_api_view(view):
+    """
+    @api_view(['GET']) + IsAuthenticated for a coroutine: DRF 3.16 has no
+    async dispatch, so authentication and rendering are done here directly.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response(
+                {"detail": exceptions.MethodNotAllowed(request.method).detail},
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+        # What DRF's content negotiation would set for a JSON client (ETags and cache keys use it)
+        request.accepted_renderer = renderer
+        request.accepted_media_type = renderer.media_type
+        response = await authenticate(request)
+        if response is not None:
+            return response
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def evaluate(queryset):
+    try:
+        return list(queryset)
+    finally:
+        # No request_finished on executor threads: honour CONN_MAX_AGE here
+        close_old_connections()
+
+
+async def gather_querysets(querysets):
+    """
+    Evaluates independent querysets concurrently, each on an executor thread
+    with its own DB connection: Django's async ORM would run them one after
+    the other on the single thread-sensitive thread.
+
+    With ASYNC_QUERY_FANOUT off they run sequentially on that thread (tests:
+    other connections cannot see a TestCase's transaction).
+    """
+    if settings.ASYNC_QUERY_FANOUT:
+        run = sync_to_async(evaluate, thread_sensitive=False)
+    else:
+        run = sync_to_async(list)
+    rows = await asyncio.gather(*(run(queryset) for queryset in querysets.values()))
+    return dict(zip(querysets, rows))
+
+
+# --- Dashboard Views ---
+@async_api_view
+async def get_jurist_dashboard_data(request):
+    """
+    GET /praevia/api/dashboard/juridique/
+    """
+    async def build():
+        try:
+            rows = await gather_querysets(JuristDashboardService.querysets())
+            return json_response(JuristDashboardService.build(rows))
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des données du tableau de bord Juridique: {e}")
+            return json_response(
+                {"message": "Erreur lors de la récupération des données du tableau de bord Juridique."},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    return await response_cache.aserve(
+        request, 'dashboard-juridique', ['dashboards'], build, timeout=settings.DASHBOARD_CACHE_TTL
+    )
+
+
+@async_api_view
+async def get_rh_dashboard_data(request):
+    """
+    GET /praevia/api/dashboard/rh/
+    """
+    return json_response({"message": "RH dashboard data (not implemented)"})
+
+
+@async_api_view
+async def get_qse_dashboard_data(request):
+    """
+    GET /praevia/api/dashboard/qse/
+    """
+    return json_response({"message": "QSE dashboard data (not implemented)"})
+
+
+@async_api_view
+async def get_direction_dashboard_data(request):
+    """
+    GET /praevia/api/dashboard/direction/
+    """
+    async def build():
+        try:
+            data = await sync_to_async(DashboardAggregateService.get_direction_dashboard)()
+            return json_response(data)
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des données du tableau de bord Direction: {e}")
+            return json_response(
+                {"message": "Erreur lors de la récupération des données du tableau de bord Direction."},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    return await response_cache.aserve(
+        request, 'dashboard-direction', ['dashboards'], build, timeout=settings.DASHBOARD_CACHE_TTL
+    )
+
+
+# --- Audit Views ---
+@async_api_view
+async def audit_by_dossier_id(request, dossier_id):
+    """
+    GET /praevia/api/dossiers/<dossier_id>/audit/, as AuditByDossierIdView.
+    """
+    try:
+        version = await Audit.objects.filter(dossier_atmp_id=dossier_id).values_list('pk', 'updated_at').afirst()
+        if version is None:
+            raise Audit.DoesNotExist
+        audit_id, updated_at = version
+        etag = representation_etag(request, 'audit', audit_id, updated_at.isoformat())
+        response = not_modified(request, etag, updated_at)
+        if response is not None:
+            return response
+
+        audit = await Audit.objects.aget(id=audit_id)
+        data = await sync_to_async(lambda: AuditSerializer(audit).data)()
+        return set_validators(json_response(data), etag, updated_at)
+    except ObjectDoesNotExist:
+        return json_response({"message": "Aucun audit trouvé pour ce dossier ou dossier AT/MP non trouvé."}, status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération de l'audit: {e}")
+        return json_response({"message": "Erreur interne du serveur"}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# --- Document Views ---
+@async_api_view
+async def download_document(request, document_id):
+    """
+    GET /praevia/api/documents/<document_id>/download/, as DocumentDownloadView.
+    """
+    try:
+        document = await Document.objects.aget(id=document_id)
+        # open()/fstat() block: build the response on a worker thread, the event loop streams it
+        return await sync_to_async(document_response, thread_sensitive=False)(request, document, asynchronous=True)
+    except ObjectDoesNotExist:
+        return json_response({"message": "Document non trouvé."}, status.HTTP_404_NOT_FOUND)
+    except Http404 as e:
+        return json_response({"message": str(e)}, status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        logger.error(f"Error downloading document: {e}")
+        return json_response({"message": "Erreur lors du téléchargement du document."}, status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -3,13 +3,15 @@
 from rest_framework import viewsets, serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.exceptions import ValidationError
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import get_user_model, authenticate, login, logout
 import logging
 
+from .hashing import password_hash_pool
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
@@ -140,6 +142,16 @@ class LogoutView(APIView):
 
         if user is not None and request.user == user:
             logout(request)
+            # Revoke the API token too; the post_delete signal drops it from token_cache
+            Token.objects.filter(user=user).delete()
             return Response({'message': 'You have been logged out.'}, status=status.HTTP_200_OK)
         else:
             return Response({'error': 'Invalid credentials.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+# --- Password hashing pool metrics ---
+class PasswordHashStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(password_hash_pool.stats(), status=status.HTTP_200_OK)
@@ -0,0 +1,89 @@
+# /home/siisi/praevia_gemini/praevia_api/authentication.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenUserCache:
+    """
+    Bounded LRU of token key -> (user, token), each entry valid for a TTL.
+
+    Invalidation (signals.py, LogoutView) only reaches the current process:
+    other workers drop the entry when its TTL runs out, which bounds how long
+    a deleted token or a deactivated user stays accepted there.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Bumped on every invalidation: a lookup that started before it must not be cached
+        self.generation = 0
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def set(self, key, user, token, generation):
+        ttl = settings.TOKEN_AUTH_CACHE_TTL if self.ttl is None else self.ttl
+        max_size = settings.TOKEN_AUTH_CACHE_SIZE if self.max_size is None else self.max_size
+        if ttl <= 0 or max_size <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return  # invalidated while the row was being read
+            self._entries[key] = (user, token, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_pk):
+        with self._lock:
+            self.generation += 1
+            for key in [key for key, (user, _, _) in self._entries.items() if user.pk == user_pk]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+token_cache = TokenUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    `Authorization: Token <key>` without the Token+User query on every request:
+    the pair is kept in token_cache (TOKEN_AUTH_CACHE_SIZE entries, TOKEN_AUTH_CACHE_TTL seconds).
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            generation = token_cache.generation
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token, generation)
+            cached = user, token
+        user, token = cached
+        # Each request gets its own instance: views may change request.user
+        return copy.copy(user), token
@@ -0,0 +1,195 @@
+# /home/siisi/praevia_gemini/praevia_api/caching.py
+
+import hashlib
+import threading
+import uuid
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+# Headers a 304 built from a cached entry repeats (RFC 9110 15.4.5)
+NOT_MODIFIED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+
+def model_tag(model, pk=None):
+    name = model._meta.model_name
+    return name if pk is None else f"{name}:{pk}"
+
+
+class ResponseCache:
+    """
+    Rendered GET responses, keyed by path + query string, user role and media
+    type, in the 'responses' cache (see CACHES in settings).
+
+    Invalidation is by tag: every entry key embeds the current version of its
+    tags ('dossieratmp' for lists, 'dossieratmp:42' for a detail,
+    'dashboards'...), and signals.py replaces the versions of the tags a
+    write touches, so old entries are never read again and age out through
+    the backend's own eviction. The versions must be seen by every process,
+    so settings only enable the cache on redis or memcached.
+    """
+    alias = 'responses'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def tag_key(tag):
+        return f"resp:tag:{tag}"
+
+    def tag_versions(self, tags):
+        keys = [self.tag_key(tag) for tag in tags]
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # First use, or the version was evicted: start from a fresh random one
+                # so entries cached under the lost version can never match again
+                self.cache.add(key, uuid.uuid4().hex, timeout=None)
+                versions[key] = self.cache.get(key) or uuid.uuid4().hex
+        return [versions[key] for key in keys]
+
+    def invalidate(self, *tags):
+        self.bump(tags)
+        # Again once the write is visible: a reader may have cached the old rows in between
+        transaction.on_commit(partial(self.bump, tags))
+
+    def bump(self, tags):
+        self.cache.set_many({self.tag_key(tag): uuid.uuid4().hex for tag in tags}, timeout=None)
+
+    def key(self, request, namespace, tags):
+        parts = [
+            request.get_full_path(), request.accepted_media_type, getattr(request.user, 'role', ''),
+            *self.tag_versions(tags),
+        ]
+        return f"resp:{namespace}:{hashlib.md5('|'.join(parts).encode()).hexdigest()}"
+
+    @staticmethod
+    def cacheable(request):
+        return (
+            settings.RESPONSE_CACHE_TTL > 0
+            and request.method == 'GET'
+            and request.user.is_authenticated
+            # The browsable API shows the user's name: never shared between users
+            and getattr(request.accepted_renderer, 'format', None) != 'html'
+        )
+
+    def serve(self, request, namespace, tags, build, view=None, timeout=None):
+        """The cached response for this request, else build() and cache it when it is a 200."""
+        if not self.cacheable(request):
+            return build()
+
+        key, entry = self.lookup(request, namespace, tags)
+        if entry is not None:
+            return self.restore(request, entry)
+
+        response = build()
+        if isinstance(response, Response) and response.status_code == 200 and not response.exception:
+            # Render now (DRF would do it after the view returns) so the bytes can be stored
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = view.get_renderer_context() if view else {'request': request}
+            response.render()
+            self.store(key, response, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    async def aserve(self, request, namespace, tags, build, timeout=None):
+        """serve() for async_views.py: `build` is a coroutine function returning a rendered HttpResponse."""
+        if not self.cacheable(request):
+            return await build()
+
+        # Cache backends are blocking (Redis, file): run them off the event loop
+        key, entry = await sync_to_async(self.lookup, thread_sensitive=False)(request, namespace, tags)
+        if entry is not None:
+            return self.restore(request, entry)
+
+        response = await build()
+        if response.status_code == 200:
+            await sync_to_async(self.store, thread_sensitive=False)(key, response, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def lookup(self, request, namespace, tags):
+        key = self.key(request, namespace, tags)
+        entry = self.cache.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return key, entry
+
+    def store(self, key, response, timeout=None):
+        entry = {'status': response.status_code, 'content': response.content, 'headers': dict(response.items())}
+        self.cache.set(key, entry, timeout or settings.RESPONSE_CACHE_TTL)
+
+    @staticmethod
+    def restore(request, entry):
+        headers = entry['headers']
+        last_modified = parse_http_date_safe(headers['Last-Modified']) if 'Last-Modified' in headers else None
+        response = get_conditional_response(request, etag=headers.get('ETag'), last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(entry['content'], status=entry['status'], headers=headers)
+        else:
+            for header in NOT_MODIFIED_HEADERS:
+                if header in headers:
+                    response[header] = headers[header]
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hitRatio': round(hits / (hits + misses), 4) if hits + misses else None,
+            'backend': settings.CACHES[self.alias]['BACKEND'],
+        }
+
+
+response_cache = ResponseCache()
+
+
+class ResponseCacheMixin:
+    """Serves list/retrieve from response_cache, tagged with the viewset's model (and row)."""
+
+    def list(self, request, *args, **kwargs):
+        model = self.queryset.model
+        build = partial(super().list, request, *args, **kwargs)
+        return response_cache.serve(request, self.basename, [model_tag(model)], build, view=self)
+
+    def retrieve(self, request, *args, **kwargs):
+        model = self.queryset.model
+        build = partial(super().retrieve, request, *args, **kwargs)
+        field = model._meta.pk if self.lookup_field == 'pk' else model._meta.get_field(self.lookup_field)
+        try:
+            # The value the row stores: /42/ and /042/ are the same row, invalidated by the same tag
+            pk = field.to_python(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValidationError:
+            return build()  # no such row: a 404, not worth caching
+        return response_cache.serve(request, self.basename, [model_tag(model, pk)], build, view=self)
+
+
+def cache_response(namespace, tags, timeout=None):
+    """Same cache for @api_view functions; put it under @api_view/@permission_classes."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(request, *args, **kwargs):
+            build = partial(func, request, *args, **kwargs)
+            return response_cache.serve(request, namespace, tags, build, timeout=timeout)
+        return wrapper
+    return decorator
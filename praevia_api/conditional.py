@@ -0,0 +1,88 @@
+# /home/siisi/praevia_gemini/praevia_api/conditional.py
+
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def representation_etag(request, *version):
+    """
+    ETag of a representation: the row version (updated_at...) plus everything
+    else the body depends on: path and query string (?fields=, page, cursor)
+    and the negotiated media type.
+    """
+    parts = [request.get_full_path(), getattr(request, 'accepted_media_type', ''), *version]
+    return quote_etag(hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+def not_modified(request, etag, last_modified):
+    """A 304 response when the client's copy is current, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code != 200:
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    # Clients may keep the body but must revalidate it on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Accept', 'Authorization', 'Cookie'))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified for retrieve, from the row's updated_at, and an ETag
+    for list pages, from max(updated_at) and count of the filtered queryset.
+    Keyset (?cursor=) pages are versioned by their own rows instead, so they
+    still run neither COUNT nor MAX over the table. The validators come from
+    one small query run before the serializer, so a 304 costs no
+    serialization and no relation loading.
+    """
+
+    def validator_queryset(self):
+        # Drop the eager loading done for rendering (see prefetch.py), keep the filters
+        return self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None).order_by()
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            updated_at = (
+                self.validator_queryset()
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values_list('updated_at', flat=True)
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            updated_at = None  # /dossiers/abc/: like get_object_or_404, not a server error
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)  # 404
+
+        etag = representation_etag(request, self.basename, kwargs[lookup_url_kwarg], updated_at.isoformat())
+        response = not_modified(request, etag, updated_at)
+        if response is None:
+            response = set_validators(super().retrieve(request, *args, **kwargs), etag, updated_at)
+        return response
+
+    def list_version(self, request):
+        queryset = self.validator_queryset()
+        if getattr(self.paginator, 'cursor_query_param', None) in request.query_params:
+            # Keyset pages never count the table (see pagination.py): version the page's own rows
+            page = self.paginate_queryset(queryset.only('id', 'created_at', 'updated_at'))
+            return [(row.pk, row.updated_at.isoformat()) for row in page]
+        version = queryset.aggregate(last=Max('updated_at'), count=Count('pk'))
+        return [version['last'].isoformat() if version['last'] else '', version['count']]
+
+    def list(self, request, *args, **kwargs):
+        etag = representation_etag(request, self.basename, 'list', *self.list_version(request))
+        # ETag only: a deletion leaves max(updated_at) as is, so If-Modified-Since would be wrong
+        response = not_modified(request, etag, None)
+        if response is None:
+            response = set_validators(super().list(request, *args, **kwargs), etag, None)
+        return response
@@ -0,0 +1,169 @@
+# /home/siisi/praevia_gemini/praevia_api/downloads.py
+
+import hashlib
+import os
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def document_etag(document):
+    """
+    Strong ETag of the file, not of the row: the blob's sha256, so that
+    processing results or a rename (updated_at) keep Range resumes and 304s
+    valid. Files stored before content addressing fall back to size/updated_at.
+    """
+    if document.sha256:
+        return quote_etag(document.sha256)
+    version = f"{document.pk}:{document.size}:{document.updated_at.timestamp()}"
+    return quote_etag(hashlib.md5(version.encode()).hexdigest())
+
+
+def document_last_modified(document):
+    """Modification time of the stored file (seconds), updated_at when the storage cannot tell."""
+    try:
+        return int(document.file.storage.get_modified_time(document.file.name).timestamp())
+    except (OSError, NotImplementedError):
+        return int(document.updated_at.timestamp())
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single 'bytes=' range, None to send the whole file."""
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None  # malformed or multi-range: ignored, as RFC 9110 allows
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable
+    if end < start:
+        return None
+    return start, end
+
+
+def iter_file_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+async def aiter_file_range(file, start, length):
+    """iter_file_range() for ASGI: each read runs on a worker thread, not on the event loop."""
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        await sync_to_async(file.seek, thread_sensitive=False)(start)
+        while length > 0:
+            data = await read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def range_requested(request, etag, last_modified):
+    if 'HTTP_RANGE' not in request.META:
+        return False
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    # Resume only if the client's copy is still the current file
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def document_response(request, document, asynchronous=False):
+    """
+    Builds the download response for an already authorized request.
+
+    With DOCUMENT_DOWNLOAD_MODE = 'x-accel-redirect' (nginx) or 'x-sendfile'
+    (Apache/lighttpd) the proxy streams the file and no Python worker is held.
+    'python' serves it in-process with ETag/If-None-Match and Range support;
+    `asynchronous` streams it with an async iterator, which ASGI servers
+    consume without buffering the whole file (see async_views.py).
+    """
+    if not document.file:
+        raise Http404("Aucun fichier associé à ce document.")
+
+    etag = document_etag(document)
+    last_modified = document_last_modified(document)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    mode = settings.DOCUMENT_DOWNLOAD_MODE
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=document.mime_type)
+        response['X-Accel-Redirect'] = settings.DOCUMENT_ACCEL_REDIRECT_PREFIX + quote(document.file.name)
+    elif mode == 'x-sendfile':
+        response = HttpResponse(content_type=document.mime_type)
+        response['X-Sendfile'] = document.file.path
+    else:
+        response = file_response(request, document, etag, last_modified, asynchronous)
+
+    response['Content-Disposition'] = content_disposition_header(True, document.original_name)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def file_response(request, document, etag, last_modified, asynchronous=False):
+    file_path = document.file.path
+    if not os.path.exists(file_path):
+        raise Http404("Fichier non trouvé sur le serveur.")
+
+    file = open(file_path, 'rb')
+    size = os.fstat(file.fileno()).st_size
+    byte_range = None
+    if range_requested(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except RangeNotSatisfiable:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+
+    iter_range = aiter_file_range if asynchronous else iter_file_range
+    if byte_range is None and not asynchronous:
+        response = FileResponse(file, content_type=document.mime_type)
+    elif byte_range is None:
+        response = StreamingHttpResponse(iter_range(file, 0, size), content_type=document.mime_type)
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            iter_range(file, start, length), status=206, content_type=document.mime_type
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    response['Accept-Ranges'] = 'bytes'
+    return response
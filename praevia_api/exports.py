@@ -0,0 +1,103 @@
+# /home/siisi/praevia_gemini/praevia_api/exports.py
+
+import csv
+
+from django.http import StreamingHttpResponse
+from rest_framework import renderers
+from rest_framework.decorators import action
+
+from .fastjson import dumps
+
+
+class _Echo:
+    """File-like object handing csv.writer rows straight back to the caller."""
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+    buffer_size = 64 * 1024
+
+    def encode(self, row):
+        return dumps(row) + b'\n'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return b''.join(self.encode(row) for row in rows)
+
+    def stream(self, rows, fields):
+        buffer, size = [], 0
+        for row in rows:
+            line = self.encode(row)
+            buffer.append(line)
+            size += len(line)
+            if size >= self.buffer_size:
+                yield b''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield b''.join(buffer)
+
+
+class CSVRenderer(NDJSONRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    @staticmethod
+    def cell(value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return dumps(value).decode()
+        return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows and isinstance(rows[0], dict) else []
+        return b''.join(self.stream(rows, fields))
+
+    def stream(self, rows, fields):
+        writer = csv.writer(_Echo())
+        buffer = [writer.writerow(fields)]
+        size = len(buffer[0])
+        for row in rows:
+            line = writer.writerow([self.cell(row.get(field)) for field in fields])
+            buffer.append(line)
+            size += len(line)
+            if size >= self.buffer_size:
+                yield ''.join(buffer).encode(self.charset)
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer).encode(self.charset)
+
+
+class StreamingExportMixin:
+    """
+    Adds GET <list-url>/export/?format=ndjson|csv to a ModelViewSet.
+
+    Rows go through the viewset's filters and serializer, are read with
+    QuerySet.iterator() and streamed in small chunks, so memory stays
+    constant whatever the number of rows.
+    """
+    export_chunk_size = 2000
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer], pagination_class=None)
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        serializer = self.get_serializer()
+        fields = [name for name, field in serializer.fields.items() if not field.write_only]
+        rows = (
+            serializer.to_representation(instance)
+            for instance in queryset.iterator(chunk_size=self.export_chunk_size)
+        )
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(rows, fields),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}-export.{renderer.format}"'
+        return response
@@ -0,0 +1,70 @@
+# /home/siisi/praevia_gemini/praevia_api/fastjson.py
+
+import codecs
+
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib json module is used instead
+    orjson = None
+
+# Datetimes go through DRF's encoder too, so 'Z' suffixes and microseconds match the stdlib output
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+_encoder = encoders.JSONEncoder()
+
+
+def default(obj):
+    """Decimals, lazy translation strings, UUIDs... exactly as rest_framework.utils.encoders does."""
+    return _encoder.default(obj)
+
+
+def dumps(data):
+    """Compact UTF-8 JSON bytes, with orjson when it is installed and can encode `data`."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits: leave it to the stdlib encoder
+    return renderers.JSONRenderer().render(data)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    Drop-in JSONRenderer backed by orjson. Falls back to the stdlib renderer
+    for what orjson cannot reproduce: indents other than 2 (browsable API),
+    ASCII-only or non-compact output settings.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent not in (None, 2) or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            option = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+            ret = orjson.dumps(data, default=default, option=option)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer: U+2028/U+2029 are valid JSON but not valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(parsers.JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())  # rejects NaN/Infinity like the strict stdlib parser
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,78 @@
+# /home/siisi/praevia_gemini/praevia_api/fieldsets.py
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def split_param(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields=a,b / ?exclude=c on read requests: the serializer drops the other
+    fields and the queryset only loads the columns still rendered, so large
+    JSON columns are neither fetched nor decoded.
+
+    The list action renders `list_serializer_class` (a compact row) unless a
+    fieldset is asked for; ?fields=* returns the full representation.
+    """
+    list_serializer_class = None
+    # Always loaded: the keyset cursor is built from created_at (see pagination.py)
+    fieldset_required = ('id', 'created_at')
+
+    def fieldset_requested(self):
+        params = self.request.query_params
+        return 'fields' in params or 'exclude' in params
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.list_serializer_class is not None and not self.fieldset_requested():
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request is not None and self.request.method in SAFE_METHODS and self.fieldset_requested():
+            self.apply_fieldset(serializer.child if isinstance(serializer, serializers.ListSerializer) else serializer)
+        return serializer
+
+    def apply_fieldset(self, serializer):
+        params = self.request.query_params
+        requested = split_param(params.get('fields', '*'))
+        excluded = split_param(params.get('exclude', ''))
+        available = set(serializer.fields)
+        unknown = [name for name in requested + excluded if name != '*' and name not in available]
+        if unknown:
+            raise ValidationError({"fields": f"Champ(s) inconnu(s): {', '.join(unknown)}."})
+
+        keep = available if '*' in requested else set(requested)
+        for name in list(serializer.fields):
+            if name not in keep or name in excluded:
+                serializer.fields.pop(name)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            columns = self.fieldset_columns(self.get_serializer())
+            if columns is not None:
+                queryset = queryset.only(*columns)
+        return queryset
+
+    def fieldset_columns(self, serializer):
+        """Concrete columns the serializer reads, None if a field needs the whole row."""
+        model = serializer.Meta.model
+        columns = set(self.fieldset_required)
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if model_field.concrete and not model_field.many_to_many:
+                columns.add(model_field.name)
+        return columns
@@ -0,0 +1,53 @@
+# /home/siisi/praevia_gemini/praevia_api/filters.py
+
+from django.db import connections
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class JSONFieldFilterBackend(BaseFilterBackend):
+    """
+    Filters on keys nested in JSONFields with dotted query params, e.g.
+    ?entreprise.siret=12345678900001&accident.date__gte=2024-01-01
+
+    - keys listed in the view's `json_filter_fields` map to indexed generated
+      columns and accept every lookup in `lookups`;
+    - any other key of a field listed in `json_filter_roots` accepts exact
+      matches only, served by the jsonb GIN index on PostgreSQL;
+    - other dotted params are rejected.
+    """
+    lookups = ('exact', 'iexact', 'in', 'gt', 'gte', 'lt', 'lte', 'istartswith', 'icontains')
+
+    def filter_queryset(self, request, queryset, view):
+        filter_fields = getattr(view, 'json_filter_fields', {})
+        filter_roots = getattr(view, 'json_filter_roots', ())
+
+        for param, value in request.query_params.items():
+            path, _, lookup = param.partition('__')
+            root, dot, key = path.partition('.')
+            if not dot:
+                continue
+
+            lookup = lookup or 'exact'
+            if path in filter_fields:
+                if lookup not in self.lookups:
+                    raise ValidationError({param: f"Lookup non supporté: {lookup}."})
+                if lookup == 'in':
+                    value = [item for item in value.split(',') if item]
+                queryset = queryset.filter(**{f"{filter_fields[path]}__{lookup}": value})
+            elif root in filter_roots and key and '.' not in key:
+                if lookup != 'exact':
+                    raise ValidationError({param: "Seul le filtrage exact est supporté sur ce champ."})
+                queryset = self.filter_json_key(queryset, root, key, value)
+            else:
+                # A typo would otherwise silently return the unfiltered list
+                raise ValidationError({param: "Champ de filtrage inconnu."})
+
+        return queryset
+
+    @staticmethod
+    def filter_json_key(queryset, root, key, value):
+        if connections[queryset.db].vendor == 'postgresql':
+            # @> containment can use the jsonb_path_ops GIN index
+            return queryset.filter(**{f"{root}__contains": {key: value}})
+        return queryset.filter(**{f"{root}__{key}": value})
@@ -0,0 +1,117 @@
+# /home/siisi/praevia_gemini/praevia_api/hashing.py
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Trop de connexions simultanées, réessayez dans quelques secondes."
+    default_code = 'password_hash_busy'
+    wait = 1  # Retry-After, set by DRF's exception handler
+
+
+def _timed(func, args):
+    # Runs in a pool thread: no locks, no ORM, only the hash itself
+    started = time.monotonic()
+    result = func(*args)
+    return result, started, time.monotonic()
+
+
+class PasswordHashPool:
+    """
+    Runs password hashing (PBKDF2, ~100ms of CPU) on a few OS threads.
+
+    Under gunicorn's gevent workers a hash computed in a greenlet blocks the
+    whole worker; hashlib releases the GIL, so in a real thread it only
+    blocks the greenlet waiting for it. At most PASSWORD_HASH_WORKERS hashes
+    run and PASSWORD_HASH_QUEUE wait per process; beyond that callers get
+    PasswordHashBusy (503) right away instead of queueing behind a burst.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self.pending = 0
+        self.submitted = self.rejected = self.completed = 0
+        self.wait_seconds = self.hash_seconds = 0.0
+
+    @property
+    def capacity(self):
+        return settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE
+
+    def get_pool(self):
+        if self._pid != os.getpid():
+            # Lazily, per process: gevent patches threading after this module is imported
+            self._pid = os.getpid()
+            try:
+                from gevent import monkey
+                from gevent.threadpool import ThreadPool
+            except ImportError:
+                monkey = None
+            if monkey is not None and monkey.is_module_patched('threading'):
+                self._pool = ThreadPool(settings.PASSWORD_HASH_WORKERS)
+            else:
+                self._pool = ThreadPoolExecutor(settings.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+        return self._pool
+
+    def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise PasswordHashBusy()
+            self.pending += 1
+            self.submitted += 1
+            pool = self.get_pool()
+
+        submitted = time.monotonic()
+        try:
+            if isinstance(pool, ThreadPoolExecutor):
+                result, started, finished = pool.submit(_timed, func, args).result()
+            else:
+                result, started, finished = pool.apply(_timed, (func, args))
+        finally:
+            with self._lock:
+                self.pending -= 1
+        with self._lock:
+            self.completed += 1
+            self.wait_seconds += started - submitted
+            self.hash_seconds += finished - started
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self.pending,
+                'capacity': self.capacity,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'waitSecondsTotal': round(self.wait_seconds, 6),
+                'hashSecondsTotal': round(self.hash_seconds, 6),
+            }
+
+
+password_hash_pool = PasswordHashPool()
+
+
+def make_password(raw_password):
+    if raw_password is None:
+        return hashers.make_password(None)  # unusable password: nothing to hash
+    return password_hash_pool.run(hashers.make_password, raw_password)
+
+
+def check_password(raw_password, encoded, setter=None):
+    """hashers.check_password(), with the verification in the pool and `setter` (a DB write) in the caller."""
+    is_correct, must_update = password_hash_pool.run(hashers.verify_password, raw_password, encoded)
+    if setter and is_correct and must_update:
+        setter(raw_password)
+    return is_correct
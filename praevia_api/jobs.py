@@ -0,0 +1,205 @@
+# /home/siisi/praevia_gemini/praevia_api/jobs.py
+
+import logging
+import random
+import time
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# name -> function, filled by @task in tasks.py (imported from AppConfig.ready)
+TASKS = {}
+
+
+def task(name, max_attempts=None, atomic=True):
+    """
+    Registers a function as a job; it is called with the job payload as
+    keyword arguments, in a transaction unless atomic=False (tasks that wait
+    on something else than the database open their own, short ones).
+    """
+    def register(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        func.atomic = atomic
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, *, priority=0, delay=0, max_attempts=None, user=None):
+    """
+    Queues a job (JSON payload: ids, not instances). Inside a transaction the
+    job only becomes visible to workers once it commits.
+    """
+    if name not in TASKS:
+        raise ValueError(f"Tâche inconnue: {name}")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or TASKS[name].max_attempts or settings.JOB_MAX_ATTEMPTS,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def enqueue_many(name, payloads, *, priority=0, batch_size=1000):
+    """One job per payload, inserted in batches (backfills); returns how many were queued."""
+    if name not in TASKS:
+        raise ValueError(f"Tâche inconnue: {name}")
+    max_attempts = TASKS[name].max_attempts or settings.JOB_MAX_ATTEMPTS
+    now = timezone.now()
+    jobs = (Job(name=name, payload=payload, priority=priority, run_at=now, max_attempts=max_attempts) for payload in payloads)
+    queued = 0
+    while batch := list(islice(jobs, batch_size)):
+        Job.objects.bulk_create(batch)
+        queued += len(batch)
+    return queued
+
+
+def prefers_async(request):
+    """Prefer: respond-async (RFC 7240): the client accepts a 202 and a job to poll."""
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+
+def accepted_response(request, job, message, **data):
+    url = reverse('praevia_api:job-detail', args=[job.pk], request=request)
+    response = Response(
+        {"message": message, **data, "jobId": job.pk, "status": job.status, "statusUrl": url},
+        status=status.HTTP_202_ACCEPTED,
+    )
+    response['Location'] = url
+    return response
+
+
+def backoff(attempts):
+    """Seconds before retry number `attempts`: exponential, capped, +-10% so failed batches spread out."""
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.9, 1.1)
+
+
+class Worker:
+    """
+    One worker thread: claims the next ready job (highest priority, then
+    oldest run_at), runs it (in a transaction unless the task opted out) and
+    records the outcome. On PostgreSQL the claim skips rows other workers
+    hold (FOR UPDATE SKIP LOCKED); the conditional UPDATE makes it safe on
+    SQLite too.
+    """
+
+    def __init__(self, name, stop_event, poll_interval=None):
+        self.name = name
+        self.stop = stop_event
+        self.poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.succeeded = self.failed = 0
+
+    def run(self, burst=False, reap_stale=False):
+        """Processes jobs until stop is set (or, with burst, until none is ready)."""
+        next_reap = 0.0
+        try:
+            while not self.stop.is_set():
+                try:
+                    if reap_stale and time.monotonic() >= next_reap:
+                        requeue_stale_jobs()
+                        next_reap = time.monotonic() + 60
+                    job = self.claim()
+                except (OperationalError, InterfaceError) as e:
+                    self.database_error('impossible de réserver un job', e)
+                    continue
+                if job is None:
+                    if burst:
+                        return
+                    self.stop.wait(self.poll_interval)
+                    continue
+                try:
+                    self.execute(job)
+                except (OperationalError, InterfaceError) as e:
+                    # Outcome not recorded: the job stays RUNNING until requeue_stale_jobs() picks it up
+                    self.database_error(f"résultat du job #{job.pk} non enregistré", e)
+        finally:
+            close_old_connections()
+
+    def database_error(self, message, error):
+        # Lost connection, or SQLite busy with another writer: a new connection after a pause
+        logger.warning(f"{self.name}: {message}: {error}")
+        close_old_connections()
+        self.stop.wait(self.poll_interval)
+
+    def claim(self):
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status=JobStatus.QUEUED.value, run_at__lte=now)
+                .order_by('-priority', 'run_at', 'id')
+                .first()
+            )
+            if job is None:
+                return None
+            claimed = Job.objects.filter(pk=job.pk, status=JobStatus.QUEUED.value).update(
+                status=JobStatus.RUNNING.value, attempts=F('attempts') + 1,
+                locked_at=now, locked_by=self.name, updated_at=now,
+            )
+        if not claimed:
+            return None  # taken by another worker between the SELECT and the UPDATE
+        job.status, job.attempts, job.locked_at, job.locked_by = JobStatus.RUNNING.value, job.attempts + 1, now, self.name
+        return job
+
+    def execute(self, job):
+        start = time.perf_counter()
+        try:
+            func = TASKS.get(job.name)
+            if func is None:
+                raise LookupError(f"Tâche inconnue: {job.name}")
+            with transaction.atomic() if func.atomic else nullcontext():
+                result = func(**job.payload)
+        except Exception:
+            self.failed += 1
+            self.record_failure(job, traceback.format_exc())
+        else:
+            self.succeeded += 1
+            self.record_success(job, result)
+            logger.info(f"Job {job.name} #{job.pk} terminé en {time.perf_counter() - start:.2f}s")
+
+    def record_success(self, job, result):
+        now = timezone.now()
+        Job.objects.filter(pk=job.pk, locked_by=self.name).update(
+            status=JobStatus.SUCCEEDED.value, result=result, last_error='',
+            locked_at=None, locked_by='', finished_at=now, updated_at=now,
+        )
+
+    def record_failure(self, job, error):
+        now = timezone.now()
+        fields = {'last_error': error[-10000:], 'locked_at': None, 'locked_by': '', 'updated_at': now}
+        if job.attempts >= job.max_attempts:
+            fields.update(status=JobStatus.FAILED.value, finished_at=now)
+            logger.error(f"Job {job.name} #{job.pk} en échec après {job.attempts} tentative(s): {error.splitlines()[-1]}")
+        else:
+            fields.update(status=JobStatus.QUEUED.value, run_at=now + timedelta(seconds=backoff(job.attempts)))
+            logger.warning(f"Job {job.name} #{job.pk} tentative {job.attempts} échouée, nouvel essai prévu: {error.splitlines()[-1]}")
+        Job.objects.filter(pk=job.pk, locked_by=self.name).update(**fields)
+
+
+def requeue_stale_jobs():
+    """RUNNING for longer than JOB_TIMEOUT: its worker died. Requeued, or failed when out of attempts."""
+    now = timezone.now()
+    stale = Job.objects.filter(status=JobStatus.RUNNING.value, locked_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT))
+    reset = {'locked_at': None, 'locked_by': '', 'updated_at': now, 'last_error': 'Worker arrêté pendant l\'exécution (JOB_TIMEOUT dépassé).'}
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(status=JobStatus.FAILED.value, finished_at=now, **reset)
+    requeued = stale.update(status=JobStatus.QUEUED.value, run_at=now, **reset)
+    if failed or requeued:
+        logger.warning(f"Jobs bloqués: {requeued} remis en file, {failed} en échec")
+    return requeued, failed
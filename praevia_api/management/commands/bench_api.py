@@ -0,0 +1,428 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/bench_api.py
+
+import http.client
+import itertools
+import json
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from praevia_api.fastjson import dumps
+from praevia_api.management.commands.bench_servers import percentile
+from praevia_api.models import (
+    User, Audit, AuditDecision, AuditStatus, Blob, Contentieux, ContentieuxStatus, Document, DocumentType,
+    DossierATMP, DossierStatus, Job
+)
+from praevia_api.services import DashboardAggregateService, DocumentProcessingService
+from praevia_api.storage import get_document_storage
+
+BENCH_PREFIX = 'BENCH-'  # same dossiers as bench_pagination
+FINALIZE_PREFIX = 'BENCHFIN-'  # consumed by the finalize endpoint, one per request
+BENCH_DOCUMENTS = 20
+BENCH_EMAIL = 'bench@example.com'  # owner of every benchmark row and document, never logs in
+JSON = 'application/json'
+
+
+def json_body(data):
+    return dumps(data), JSON
+
+
+def multipart_body(data):
+    return encode_multipart(BOUNDARY, data), MULTIPART_CONTENT
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a sized dataset, then drives the API endpoints (list, retrieve, create, finalize, upload, download, '
+        'dashboards) with concurrent clients. Reports p50/p95/p99, req/s and queries per request as JSON and '
+        'compares them with a saved baseline. Writes to the configured database: run it on a bench copy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dossiers', type=int, default=2000, help='Benchmark dossiers the table must hold.')
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients.')
+        parser.add_argument('--only', help='Comma-separated endpoint names (default: all).')
+        parser.add_argument('--url', help='Drive a running server (e.g. http://127.0.0.1:8000) instead of the in-process client.')
+        parser.add_argument('--with-cache', action='store_true', help='Keep the response cache on (in-process only).')
+        parser.add_argument('--document-size', type=int, default=64 * 1024, help='Bytes per seeded/uploaded document.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--baseline', help='JSON file from a previous --output to compare against.')
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help='p99 increase (percent) reported as a regression.')
+        parser.add_argument('--i-know', action='store_true',
+                            help='Run although DEBUG is off: the configured database gets benchmark rows.')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['i_know']:
+            raise CommandError('DEBUG is off: this writes to the configured database. Run it on a bench copy with --i-know.')
+        # In-process the seeded and uploaded files go to a throwaway MEDIA_ROOT; with --url they
+        # land in the server's, and remove_documents() deletes them in both cases
+        media_root = None if options['url'] else tempfile.mkdtemp(prefix='bench-media-')
+        try:
+            with override_settings(MEDIA_ROOT=media_root) if media_root else nullcontext():
+                try:
+                    self.bench(options)
+                finally:
+                    self.remove_documents()
+                    self.remove_client()
+        finally:
+            if media_root:
+                shutil.rmtree(media_root, ignore_errors=True)
+
+    def bench(self, options):
+        self.document_content = b'%PDF-1.4 bench\n'.ljust(options['document_size'], b'.')
+        ids = self.seed(options['dossiers'])
+        scenarios = self.scenarios(ids)
+        if options['only']:
+            names = [name.strip() for name in options['only'].split(',') if name.strip()]
+            unknown = set(names) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}. Known: {', '.join(scenarios)}")
+            scenarios = {name: scenarios[name] for name in names}
+
+        self.token = self.create_client().key
+        self.target = options['url']
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['with_cache']:
+            overrides['RESPONSE_CACHE_TTL'] = 0
+
+        results = {
+            'generatedAt': timezone.now().isoformat(),
+            'target': self.target or 'in-process',
+            'database': connection.vendor,
+            'dossiers': options['dossiers'],
+            'concurrency': options['concurrency'],
+            'requestsPerEndpoint': options['requests'],
+            'endpoints': {},
+        }
+        self.stdout.write(
+            f"{'endpoint':<20} {'requests':>8} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+            f"{'queries':>8} {'errors':>7}"
+        )
+        with override_settings(**overrides):
+            for name, (method, build, prepare) in scenarios.items():
+                if prepare:
+                    prepare(options['warmup'] + options['requests'])
+                if options['warmup']:
+                    self.run(method, build, options['warmup'], 1, offset=0)
+                row = self.run(method, build, options['requests'], options['concurrency'], offset=options['warmup'])
+                results['endpoints'][name] = {'method': method, 'path': build(0)[0], **row}
+                self.stdout.write(
+                    f"{name:<20} {row['requests']:>8} {row['rps']:>8.1f} {row['p50Ms']:>9.1f} {row['p95Ms']:>9.1f} "
+                    f"{row['p99Ms']:>9.1f} {row['queriesPerRequest'] if row['queriesPerRequest'] is not None else '-':>8} "
+                    f"{row['errors']:>7}"
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['threshold'])
+
+    # --- Dataset ---
+    def create_client(self):
+        """A throwaway RH account (no password, not staff) whose token the clients send; see remove_client()."""
+        name = f"bench-client-{uuid.uuid4().hex[:12]}"
+        self.client_user = User.objects.create(
+            email=f"{name}@example.com", username=name, name='Bench Client', role='RH', password='!',
+        )
+        return Token.objects.create(user=self.client_user)
+
+    def remove_client(self):
+        client_user = getattr(self, 'client_user', None)
+        if client_user is not None:
+            Token.objects.filter(user=client_user).delete()
+            client_user.delete()  # its jobs keep running, created_by is set to NULL
+
+    def remove_documents(self):
+        """Deletes the benchmark's documents (seeded and uploaded), their jobs and the blobs only they used."""
+        documents = Document.objects.filter(uploaded_by__email=BENCH_EMAIL)
+        document_ids = list(documents.values_list('pk', flat=True))
+        sha256s = set(documents.values_list('sha256', flat=True)) - {''}
+        documents.delete()  # per-row signals: blob reference counts drop
+        Job.objects.filter(name='documents.process', payload__document_id__in=document_ids).delete()
+        storage = get_document_storage()
+        for sha256 in Blob.objects.filter(sha256__in=sha256s, ref_count__lte=0).values_list('sha256', flat=True):
+            storage.delete(storage.blob_name(sha256))
+            default_storage.delete(DocumentProcessingService.thumbnail_name(sha256))
+        Blob.objects.filter(sha256__in=sha256s, ref_count__lte=0).delete()
+
+    def seed(self, dossiers, batch_size=1000):
+        """Creates what is missing of the benchmark dataset; returns the ids the endpoints pick from."""
+        user, _ = User.objects.get_or_create(
+            email=BENCH_EMAIL,
+            defaults={'username': 'bench', 'name': 'Bench User', 'role': 'RH'},
+        )
+        # Owns the rows, never logs in (older versions of this command made it a superuser)
+        User.objects.filter(pk=user.pk).update(is_superuser=False, is_staff=False, password='!')
+        Token.objects.filter(user=user).delete()
+
+        bench = DossierATMP.objects.filter(reference__startswith=BENCH_PREFIX)
+        start = bench.count()
+        if start < dossiers:
+            self.stdout.write(f"Seeding {dossiers - start} dossiers...")
+        for batch_start in range(start, dossiers, batch_size):
+            DossierATMP.objects.bulk_create([
+                DossierATMP(
+                    reference=f"{BENCH_PREFIX}{i}",
+                    status=DossierStatus.A_ANALYSER.value,
+                    created_by=user,
+                    entreprise={'siret': f"{i:014d}", 'raisonSociale': f"Entreprise {i}"},
+                    salarie={'nom': f"Salarie {i}", 'numeroSecu': f"{i:015d}"},
+                    accident={'type': 'AT', 'date': '2024-06-01T00:00:00', 'lieu': 'Atelier'},
+                )
+                for i in range(batch_start, min(batch_start + batch_size, dossiers))
+            ], batch_size=batch_size)
+
+        dossier_ids = list(bench.order_by('pk').values_list('pk', flat=True)[:dossiers])
+        with_contentieux = set(Contentieux.objects.filter(dossier_atmp_id__in=dossier_ids).values_list('dossier_atmp_id', flat=True))
+        Contentieux.objects.bulk_create([
+            Contentieux(
+                dossier_atmp_id=pk, reference=f"{BENCH_PREFIX}CONT-{pk}", subject={},
+                status=ContentieuxStatus.DRAFT.value,
+            )
+            for pk in dossier_ids[::4] if pk not in with_contentieux
+        ], batch_size=batch_size)
+        with_audit = set(Audit.objects.filter(dossier_atmp_id__in=dossier_ids).values_list('dossier_atmp_id', flat=True))
+        Audit.objects.bulk_create([
+            Audit(dossier_atmp_id=pk, auditor=user, status=AuditStatus.IN_PROGRESS.value)
+            for pk in dossier_ids[1::2] if pk not in with_audit
+        ], batch_size=batch_size)
+
+        contentieux_ids = list(
+            Contentieux.objects.filter(dossier_atmp_id__in=dossier_ids).order_by('pk').values_list('pk', flat=True)
+        )
+        documents = Document.objects.filter(original_name__startswith='bench-')
+        for i in range(documents.count(), BENCH_DOCUMENTS):
+            Document.objects.create(
+                contentieux_id=contentieux_ids[i % len(contentieux_ids)], uploaded_by=user,
+                document_type=DocumentType.DAT.value, original_name=f"bench-{i}.pdf",
+                file=ContentFile(self.document_content, name=f"bench-{i}.pdf"),
+                mime_type='application/pdf', size=len(self.document_content),
+            )
+        # bulk_create skips the counter signals
+        DashboardAggregateService.rebuild()
+
+        return {
+            'user': user,
+            'dossiers': dossier_ids,
+            'contentieux': contentieux_ids,
+            'audited_dossiers': list(
+                Audit.objects.filter(dossier_atmp_id__in=dossier_ids).order_by('dossier_atmp_id')
+                .values_list('dossier_atmp_id', flat=True)
+            ),
+            'audits': list(Audit.objects.filter(dossier_atmp_id__in=dossier_ids).order_by('pk').values_list('pk', flat=True)),
+            'documents': list(documents.order_by('pk').values_list('pk', flat=True)),
+        }
+
+    def scenarios(self, ids):
+        """name -> (method, build(i) -> (path, body, content_type), prepare(count) or None)."""
+        def api(name, *args):
+            return reverse(f"praevia_api:{name}", args=args)
+
+        def pick(values, i):
+            return values[i % len(values)]
+
+        user = ids['user']
+        finalize_audits = []
+
+        def prepare_finalize(count):
+            # Each finalize closes an audit for good: give every request a fresh one
+            run = int(time.time() * 1000)
+            dossiers = DossierATMP.objects.bulk_create([
+                DossierATMP(
+                    reference=f"{FINALIZE_PREFIX}{run}-{i}", created_by=user,
+                    entreprise={}, salarie={}, accident={'type': 'AT'},
+                )
+                for i in range(count)
+            ])
+            audits = Audit.objects.bulk_create([
+                Audit(dossier_atmp=dossier, auditor=user, status=AuditStatus.IN_PROGRESS.value) for dossier in dossiers
+            ])
+            DashboardAggregateService.rebuild()
+            finalize_audits[:] = [audit.pk for audit in audits]
+
+        def create_dossier(i):
+            return (api('dossier-list'), *json_body({
+                'created_by': user.pk,
+                'entreprise': {'siret': f"{i:014d}", 'raisonSociale': f"Entreprise {i}"},
+                'salarie': {'nom': f"Salarie {i}", 'numeroSecu': f"{i:015d}"},
+                'accident': {'type': 'AT', 'date': '2024-06-01T00:00:00', 'lieu': 'Atelier'},
+            }))
+
+        def upload(i):
+            return (api('upload_document'), *multipart_body({
+                'file': SimpleUploadedFile(f"upload-{i}.pdf", self.document_content + str(i).encode(), 'application/pdf'),
+                'contentieuxId': pick(ids['contentieux'], i),
+                'uploadedBy': user.pk,
+                'documentType': DocumentType.DAT.value,
+            }))
+
+        def get(name, values=None):
+            if values is None:
+                return 'GET', lambda i: (api(name), b'', JSON), None
+            return 'GET', lambda i: (api(name, pick(values, i)), b'', JSON), None
+
+        return {
+            'dossier-list': get('dossier-list'),
+            'dossier-detail': get('dossier-detail', ids['dossiers']),
+            'dossier-create': ('POST', create_dossier, None),
+            'contentieux-list': get('contentieux-list'),
+            'contentieux-detail': get('contentieux-detail', ids['contentieux']),
+            'audit-list': get('audit-list'),
+            'audit-detail': get('audit-detail', ids['audits']),
+            'audit-by-dossier': get('audit-by-dossier', ids['audited_dossiers']),
+            'audit-finalize': (
+                'POST',
+                lambda i: (
+                    api('finalize-audit', finalize_audits[i] if finalize_audits else 0),
+                    *json_body({'decision': AuditDecision.DO_NOT_CONTEST.value}),
+                ),
+                prepare_finalize,
+            ),
+            'document-list': get('document-list'),
+            'document-detail': get('document-detail', ids['documents']),
+            'document-upload': ('POST', upload, None),
+            'document-download': get('download_document', ids['documents']),
+            'user-list': get('user-list'),
+            'dashboard-juridique': get('jurist_dashboard_data'),
+            'dashboard-rh': get('rh_dashboard_data'),
+            'dashboard-qse': get('qse_dashboard_data'),
+            'dashboard-direction': get('direction_dashboard_data'),
+        }
+
+    # --- Load ---
+    def run(self, method, build, count, concurrency, offset):
+        """`count` requests build(offset..offset+count-1), spread over `concurrency` client threads."""
+        indexes = itertools.count(offset)
+        latencies, queries, errors = [], [], [0]
+        lock = threading.Lock()
+
+        def client():
+            session = self.open_session()
+            own_latencies, own_queries, failed = [], [], 0
+            try:
+                while (i := next(indexes)) < offset + count:
+                    path, body, content_type = build(i)
+                    start = time.perf_counter()
+                    try:
+                        status, query_count = self.send(session, method, path, body, content_type)
+                    except (OSError, http.client.HTTPException):
+                        session = self.open_session()
+                        status, query_count = 599, None
+                    if status >= 400:
+                        failed += 1
+                        continue
+                    own_latencies.append((time.perf_counter() - start) * 1000)
+                    if query_count is not None:
+                        own_queries.append(query_count)
+            finally:
+                self.close_session(session)
+            with lock:
+                latencies.extend(own_latencies)
+                queries.extend(own_queries)
+                errors[0] += failed
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client) for _ in range(max(1, min(concurrency, count)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors[0],
+            'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'p50Ms': round(percentile(latencies, 50), 2),
+            'p95Ms': round(percentile(latencies, 95), 2),
+            'p99Ms': round(percentile(latencies, 99), 2),
+            'queriesPerRequest': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+
+    def open_session(self):
+        if self.target:
+            url = urlsplit(self.target)
+            return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        client = APIClient(raise_request_exception=False)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")
+        return client
+
+    def close_session(self, session):
+        if self.target:
+            session.close()
+        else:
+            connection.close()  # each client thread has its own DB connection
+
+    def send(self, session, method, path, body, content_type):
+        """(status, queries run by the request); queries are only known in-process."""
+        if self.target:
+            session.request(method, path, body=body or None, headers={
+                'Authorization': f"Token {self.token}", 'Content-Type': content_type, 'Accept': JSON,
+            })
+            response = session.getresponse()
+            response.read()
+            return response.status, None
+
+        with CaptureQueriesContext(connection) as captured:
+            response = session.generic(method, path, data=body, content_type=content_type, HTTP_ACCEPT=JSON)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            response.close()
+        return response.status_code, len(captured.captured_queries)
+
+    # --- Baseline ---
+    def compare(self, results, baseline_path, threshold):
+        try:
+            with open(baseline_path) as f:
+                baseline = json.load(f)['endpoints']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read baseline {baseline_path}: {e}")
+
+        regressions = []
+        self.stdout.write(f"\n{'endpoint':<20} {'p99 base':>9} {'p99 now':>9} {'delta':>8} {'queries':>13}")
+        for name, row in results['endpoints'].items():
+            base = baseline.get(name)
+            if base is None:
+                self.stdout.write(f"{name:<20} {'(new endpoint)':>28}")
+                continue
+            delta = (row['p99Ms'] - base['p99Ms']) / base['p99Ms'] * 100 if base['p99Ms'] else 0.0
+            queries = f"{base['queriesPerRequest']} -> {row['queriesPerRequest']}"
+            more_queries = (
+                row['queriesPerRequest'] is not None and base['queriesPerRequest'] is not None
+                and round(row['queriesPerRequest'], 1) > round(base['queriesPerRequest'], 1)
+            )
+            line = f"{name:<20} {base['p99Ms']:>9.1f} {row['p99Ms']:>9.1f} {delta:>+7.1f}% {queries:>13}"
+            if delta > threshold or more_queries:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {baseline_path}: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS(f"No regression against {baseline_path} (threshold {threshold:.0f}% on p99)."))
@@ -0,0 +1,80 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/bench_json.py
+
+import statistics
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from rest_framework import parsers, renderers
+
+from praevia_api.fastjson import FastJSONParser, FastJSONRenderer, orjson
+
+
+def dossier_payload(count):
+    """A page of full dossiers as DossierATMPSerializer renders them, with realistic JSON blobs."""
+    now = '2024-06-01T08:30:12.345678Z'  # DateTimeField output
+    return {
+        'count': count, 'next': None, 'previous': None,
+        'results': [
+            {
+                'id': i, 'reference': f"DAT-{i:08d}", 'status': 'A_ANALYSER', 'created_by': 1,
+                'entreprise': {
+                    'siret': f"{i:014d}", 'raisonSociale': f"Entreprise {i}",
+                    'adresse': f"{i} rue de la République, 75011 Paris", 'effectif': 250, 'codeNaf': '4321A',
+                },
+                'salarie': {
+                    'nom': f"Salarié {i}", 'prenom': 'Élodie', 'numeroSecu': f"{i:015d}",
+                    'dateNaissance': '1985-04-12', 'poste': 'Opératrice de production', 'anciennete': 7.5,
+                },
+                'accident': {
+                    'type': 'AT', 'date': '2024-05-28T14:05:00', 'lieu': 'Atelier 3',
+                    'circonstances': "Chute d'une palette lors du déchargement du camion. " * 4,
+                    'lesions': ['Contusion', 'Entorse cheville droite'], 'arretTravail': True, 'joursArret': 21,
+                },
+                'temoins': [{'nom': 'Jean Martin', 'coordonnees': '06 12 34 56 78'}] * 2,
+                'tiers_implique': None, 'service_sante': 'SST Paris Est',
+                'documents': list(range(i, i + 5)),
+                'created_at': now, 'updated_at': now,
+            }
+            for i in range(count)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compares encode/decode time of the stdlib JSON renderer/parser and the orjson-backed ones on dossier pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Dossiers per payload.')
+        parser.add_argument('--repeat', type=int, default=50, help='Runs per measurement (median is reported).')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed: FastJSON* fall back to the stdlib."))
+
+        data = dossier_payload(options['rows'])
+        body = renderers.JSONRenderer().render(data)
+        self.stdout.write(f"Payload: {options['rows']} dossiers, {len(body) / 1024:.1f} KB")
+
+        rows = [
+            ('encode', lambda: renderers.JSONRenderer().render(data), lambda: FastJSONRenderer().render(data)),
+            ('decode', lambda: parsers.JSONParser().parse(BytesIO(body)), lambda: FastJSONParser().parse(BytesIO(body))),
+        ]
+        self.stdout.write(f"{'':>8} {'stdlib (ms)':>12} {'fast (ms)':>12} {'speedup':>8}")
+        for name, stdlib, fast in rows:
+            stdlib_ms = self.measure(stdlib, options['repeat'])
+            fast_ms = self.measure(fast, options['repeat'])
+            self.stdout.write(f"{name:>8} {stdlib_ms:>12.3f} {fast_ms:>12.3f} {stdlib_ms / fast_ms:>7.1f}x")
+
+        if FastJSONRenderer().render(data) != body:
+            self.stdout.write(self.style.ERROR("Outputs differ!"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Outputs are byte-identical."))
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,89 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/bench_pagination.py
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from praevia_api.models import User, DossierATMP, DossierStatus
+from praevia_api.pagination import KeysetPagination
+
+BENCH_PREFIX = 'BENCH-'
+
+
+class Command(BaseCommand):
+    help = 'Compares page-number (OFFSET + COUNT) and keyset pagination on dossiers_atmp at increasing depths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of dossiers the table must hold.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (median is reported).')
+        parser.add_argument('--depths', type=str, default='1,100,1000,10000,50000',
+                            help='Comma-separated page numbers to measure.')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the generated rows afterwards.')
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        self.seed(options['rows'], options['batch_size'])
+
+        queryset = DossierATMP.objects.all()
+        paginator = KeysetPagination()
+        page_size = paginator.page_size
+        depths = [int(d) for d in options['depths'].split(',') if d.strip()]
+
+        self.stdout.write(f"{'page':>8} {'offset (ms)':>12} {'keyset (ms)':>12}")
+        for page in depths:
+            offset = (page - 1) * page_size
+            if offset >= queryset.count():
+                self.stdout.write(self.style.WARNING(f"{page:>8} skipped (beyond table size)"))
+                continue
+
+            cursor = ''
+            if offset:
+                created_at, pk = queryset.order_by('-created_at', '-id').values_list('created_at', 'id')[offset - 1]
+                cursor = KeysetPagination.encode_cursor(created_at, pk)
+
+            offset_ms = self.measure(queryset, {'page': page}, options['repeat'])
+            keyset_ms = self.measure(queryset, {'cursor': cursor}, options['repeat'])
+            self.stdout.write(f"{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+
+        if options['cleanup']:
+            deleted, _ = DossierATMP.objects.filter(reference__startswith=BENCH_PREFIX).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} benchmark rows."))
+
+    def measure(self, queryset, params, repeat):
+        timings = []
+        for _ in range(repeat):
+            request = Request(self.factory.get('/', params))
+            start = time.perf_counter()
+            list(KeysetPagination().paginate_queryset(queryset, request))
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def seed(self, rows, batch_size):
+        missing = rows - DossierATMP.objects.count()
+        if missing <= 0:
+            return
+
+        user, _ = User.objects.get_or_create(
+            email='bench@example.com',
+            defaults={'username': 'bench', 'name': 'Bench User', 'role': 'RH'},
+        )
+        start = DossierATMP.objects.filter(reference__startswith=BENCH_PREFIX).count()
+        self.stdout.write(f"Seeding {missing} dossiers...")
+        for batch_start in range(start, start + missing, batch_size):
+            batch_end = min(batch_start + batch_size, start + missing)
+            DossierATMP.objects.bulk_create([
+                DossierATMP(
+                    reference=f"{BENCH_PREFIX}{i}",
+                    status=DossierStatus.A_ANALYSER.value,
+                    created_by=user,
+                    entreprise={'siret': f"{i:014d}", 'raisonSociale': f"Entreprise {i}"},
+                    salarie={'nom': f"Salarie {i}", 'numeroSecu': f"{i:015d}"},
+                    accident={'date': '2024-06-01T00:00:00', 'lieu': 'Atelier'},
+                )
+                for i in range(batch_start, batch_end)
+            ], batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Table now holds {DossierATMP.objects.count()} dossiers."))
@@ -0,0 +1,149 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/bench_servers.py
+
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+API_PREFIX = '/praevia/gemini/api/'
+DEFAULT_PATHS = ['dashboard/juridique/', 'dashboard/direction/']
+
+# name -> (command line after the bind address, ASYNC_VIEWS)
+SERVERS = {
+    'gevent': (['gunicorn', '--worker-class=gevent', 'praevia_core.wsgi:application'], 'False'),
+    'uvicorn': (['gunicorn', '--worker-class=uvicorn.workers.UvicornWorker', 'praevia_core.asgi:application'], 'True'),
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        'Starts the API under gunicorn+gevent (sync views) and gunicorn+uvicorn (async_views.py) in turn, '
+        'loads the same endpoints with N concurrent keep-alive clients and compares latency percentiles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', help=f"Endpoint under {API_PREFIX} (repeatable).")
+        parser.add_argument('--server', action='append', dest='servers', choices=sorted(SERVERS), help='Server(s) to run (default: all).')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per server.')
+        parser.add_argument('--workers', type=int, default=1, help='Server worker processes.')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--user', help='Email of the user whose token is sent (default: first superuser).')
+        parser.add_argument('--with-cache', action='store_true', help='Keep the response cache on (default: off, every request hits the DB).')
+
+    def handle(self, *args, **options):
+        token = self.get_token(options['user'])
+        paths = [API_PREFIX + path.lstrip('/') for path in options['paths'] or DEFAULT_PATHS]
+
+        self.stdout.write(
+            f"{options['concurrency']} clients, {options['duration']:.0f}s per server, {options['workers']} worker(s), "
+            f"paths: {', '.join(paths)}"
+        )
+        self.stdout.write(f"{'server':>8} {'requests':>9} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'errors':>7}")
+        for name in options['servers'] or SERVERS:
+            server = self.start_server(name, options)
+            try:
+                self.wait_until_ready(options['port'], paths[0], token)
+                latencies, errors, elapsed = self.load(options['port'], paths, token, options['concurrency'], options['duration'])
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            latencies.sort()
+            self.stdout.write(
+                f"{name:>8} {len(latencies):>9} {len(latencies) / elapsed:>8.0f} {percentile(latencies, 50):>9.1f} "
+                f"{percentile(latencies, 95):>9.1f} {percentile(latencies, 99):>9.1f} {errors:>7}"
+            )
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    def get_token(self, email):
+        users = get_user_model().objects.filter(is_active=True)
+        user = users.filter(email=email).first() if email else users.order_by('-is_superuser', 'pk').first()
+        if user is None:
+            raise CommandError("No active user to authenticate with: create one or pass --user.")
+        return Token.objects.get_or_create(user=user)[0].key
+
+    def start_server(self, name, options):
+        command, async_views = SERVERS[name]
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'praevia_core.settings'),
+            'ASYNC_VIEWS': async_views,
+            'ALLOWED_HOSTS': '127.0.0.1',
+        }
+        if not options['with_cache']:
+            env['RESPONSE_CACHE_TTL'] = '0'
+        command = [
+            sys.executable, '-m', *command,
+            f"--workers={options['workers']}", f"--bind=127.0.0.1:{options['port']}", '--log-level=warning',
+        ]
+        return subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+
+    def wait_until_ready(self, port, path, token, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                status = self.request(http.client.HTTPConnection('127.0.0.1', port, timeout=5), path, token)
+            except OSError:
+                time.sleep(0.2)
+                continue
+            if status != 200:
+                raise CommandError(f"GET {path} answered {status}: check --user and ALLOWED_HOSTS.")
+            return
+        raise CommandError(f"Server did not start on port {port} within {timeout}s.")
+
+    @staticmethod
+    def request(connection, path, token):
+        connection.request('GET', path, headers={'Authorization': f"Token {token}", 'Accept': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def load(self, port, paths, token, concurrency, duration):
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def client(offset):
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            own, failed, i = [], 0, offset
+            while time.monotonic() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    ok = self.request(connection, path, token) == 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                    ok = False
+                if ok:
+                    own.append((time.perf_counter() - start) * 1000)
+                else:
+                    failed += 1
+            connection.close()
+            with lock:
+                latencies.extend(own)
+                errors[0] += failed
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0], time.monotonic() - started
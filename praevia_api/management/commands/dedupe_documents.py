@@ -0,0 +1,42 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/dedupe_documents.py
+
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from praevia_api.models import Document
+from praevia_api.services import BlobService
+from praevia_api.storage import get_document_storage
+
+
+class Command(BaseCommand):
+    help = 'Moves documents stored under their upload name into the content-addressed blob store, then collects unreferenced blobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gc', action='store_true', help='Only delete blobs no document references.')
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Keep unreferenced blobs this long (an upload may be about to reference them).')
+
+    def handle(self, *args, **options):
+        storage = get_document_storage()
+        if not options['gc']:
+            migrated = skipped = 0
+            legacy = Document.objects.exclude(file='').exclude(file__isnull=True).filter(sha256='')
+            for document in legacy.iterator(chunk_size=500):
+                old_name = document.file.name
+                if not storage.exists(old_name):
+                    skipped += 1
+                    continue
+                with storage.open(old_name, 'rb') as content:
+                    document.file = File(content, name=old_name)
+                    document.save()  # stores the blob, sets sha256, counts the reference
+                if not Document.objects.filter(file=old_name).exists():
+                    storage.delete(old_name)
+                migrated += 1
+            self.stdout.write(self.style.SUCCESS(f"Migrated {migrated} document(s), skipped {skipped}."))
+
+        older_than = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        deleted = BlobService.collect_garbage(storage, older_than)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} unreferenced blob(s)."))
@@ -0,0 +1,32 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/process_documents.py
+
+from django.core.management.base import BaseCommand
+
+from praevia_api.jobs import enqueue_many
+from praevia_api.models import Document, DocumentProcessingStatus
+
+
+class Command(BaseCommand):
+    help = 'Queues documents.process jobs (text, page count, thumbnail) for documents uploaded before processing existed or that failed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help='Also retry documents whose processing failed.')
+        parser.add_argument('--all', action='store_true', help='Reprocess every document (new DOCUMENT_* settings, OCR installed...).')
+        parser.add_argument('--priority', type=int, default=-10, help='Job priority; below uploads by default.')
+
+    def handle(self, *args, **options):
+        documents = Document.objects.exclude(file='').exclude(file__isnull=True)
+        if not options['all']:
+            statuses = [DocumentProcessingStatus.PENDING.value]
+            if options['failed']:
+                statuses.append(DocumentProcessingStatus.FAILED.value)
+            documents = documents.filter(processing_status__in=statuses)
+        else:
+            # Otherwise duplicates would copy the previous results of an already processed copy
+            documents.update(processing_status=DocumentProcessingStatus.PENDING.value)
+        ids = documents.order_by('pk').values_list('pk', flat=True)
+        queued = enqueue_many(
+            'documents.process', ({'document_id': pk} for pk in ids.iterator(chunk_size=2000)),
+            priority=options['priority'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} document(s); `manage.py run_workers` processes them."))
@@ -0,0 +1,19 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/purge_upload_sessions.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from praevia_api.uploads import ChunkedUploadService
+
+
+class Command(BaseCommand):
+    help = 'Deletes chunked uploads left unfinished (and their temp files).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Purge sessions idle for longer than this.')
+
+    def handle(self, *args, **options):
+        purged = ChunkedUploadService.purge(timezone.now() - timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} unfinished upload(s)."))
@@ -0,0 +1,28 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/rebuild_dashboard_aggregates.py
+
+from django.core.management.base import BaseCommand
+
+from praevia_api.services import DashboardAggregateService
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the dashboard counters (dossier_aggregates) from dossiers_atmp to repair drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report drift, do not write anything.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = DashboardAggregateService.compute_drift()
+        else:
+            drift = DashboardAggregateService.rebuild()
+
+        for (status, case_type), delta in sorted(drift.items()):
+            self.stdout.write(f"{status:<30} {case_type or '-':<15} {delta:+d}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Dashboard aggregates are consistent."))
+        elif options['check']:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} bucket(s) drifted."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} bucket(s)."))
@@ -0,0 +1,13 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+
+from praevia_api.search import SearchService
+
+
+class Command(BaseCommand):
+    help = 'Recomputes search_entries (the /search/ index) from dossiers and contentieux, e.g. after raw SQL or COPY imports.'
+
+    def handle(self, *args, **options):
+        written = SearchService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} dossier(s) and contentieux."))
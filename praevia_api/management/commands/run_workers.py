@@ -0,0 +1,59 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/run_workers.py
+
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from praevia_api.jobs import TASKS, Worker
+
+
+class Command(BaseCommand):
+    help = 'Runs queued jobs (praevia_api/tasks.py) with N worker threads until SIGTERM/SIGINT; the running jobs finish first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Worker threads (one DB connection each).')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL, help='Seconds an idle worker waits before looking again.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is ready instead of waiting for more.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+        if connection.vendor == 'sqlite' and options['concurrency'] > 1:
+            # One writer at a time: concurrent write transactions fail with "database is locked" and are retried
+            self.stdout.write(self.style.WARNING('SQLite allows a single writer, use --concurrency 1 outside PostgreSQL.'))
+
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write(f"{signal.Signals(signum).name}: finishing the running jobs...")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        workers = [
+            Worker(f"{prefix}:{i}", stop, poll_interval=options['poll_interval'])
+            for i in range(options['concurrency'])
+        ]
+        threads = [
+            # One worker also requeues the jobs of workers that died (JOB_TIMEOUT)
+            threading.Thread(target=worker.run, kwargs={'burst': options['burst'], 'reap_stale': i == 0}, name=worker.name)
+            for i, worker in enumerate(workers)
+        ]
+        self.stdout.write(f"{len(workers)} worker(s) on {prefix}, tasks: {', '.join(sorted(TASKS))}")
+        for thread in threads:
+            thread.start()
+        # join() with a timeout: the main thread keeps handling signals
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+
+        succeeded = sum(worker.succeeded for worker in workers)
+        failed = sum(worker.failed for worker in workers)
+        self.stdout.write(self.style.SUCCESS(f"Stopped: {succeeded} job(s) succeeded, {failed} attempt(s) failed."))
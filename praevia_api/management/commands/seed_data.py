@@ -2,10 +2,16 @@
 
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
 import bcrypt
-from django.core.management.base import BaseCommand # Import BaseCommand
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError # Import BaseCommand
+from django.db import connections
+from django.db.models import Max
 from django.utils import timezone # Import timezone for datetime objects
 
 # No need for manual sys.path.append or django.setup() here,
@@ -13,13 +19,41 @@ from django.utils import timezone # Import timezone for datetime objects
 
 from praevia_api.models import ( # Use absolute import from praevia_api
     User, DossierATMP, DossierStatus, Document, DocumentType,
-    Contentieux, ContentieuxStatus, Audit, AuditStatus, AuditDecision, Action
+    Contentieux, ContentieuxStatus, Audit, AuditStatus, AuditDecision, Action, ReferenceCounter, UserRole
 )
+from praevia_api.caching import response_cache
+from praevia_api.search import SearchService
+from praevia_api.services import DashboardAggregateService
+from praevia_api.references import contentieux_references, dossier_references, next_contentieux_reference, next_dossier_reference
+from praevia_api.seeding import SEEDED_MODELS, DossierGenerator, day_end, reset_sequences, seed_chunk
 
 class Command(BaseCommand):
-    help = 'Seeds the database with initial data for testing and development.'
+    help = (
+        'Seeds the database with initial data for testing and development. '
+        'With --dossiers N, replaces all data with N generated dossiers (scale mode, for profiling).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dossiers', type=int, help='Scale mode: number of dossiers to generate.')
+        parser.add_argument('--audits-ratio', type=float, default=0.6, help='Share of dossiers with an audit.')
+        parser.add_argument('--contentieux-ratio', type=float, default=0.2,
+                            help='Share of dossiers turned into a contentieux (at most --audits-ratio).')
+        parser.add_argument('--documents-per-contentieux', type=int, default=3)
+        parser.add_argument('--users', type=int, default=50, help='Synthetic users (RH and jurists), without passwords.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Dossiers per chunk (one transaction each).')
+        parser.add_argument('--processes', type=int, default=1, help='Chunks generated and inserted in parallel.')
+        parser.add_argument('--seed', type=int, default=1, help='Same seed and options, same data.')
+        parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                            help='Latest date in the data (YYYY-MM-DD, default: today).')
+        parser.add_argument('--no-copy', action='store_true', help='Use INSERT instead of COPY on PostgreSQL.')
 
     def handle(self, *args, **options):
+        if options['dossiers']:
+            self.seed_scale(options)
+        else:
+            self.seed_fixtures()
+
+    def seed_fixtures(self):
         self.stdout.write("Starting data seeding...")
 
         # Clear existing data (optional, for clean slate)
@@ -65,7 +99,7 @@ class Command(BaseCommand):
 
         # Create a Dossier ATMP
         dossier_atmp_1 = DossierATMP(
-            reference=f"DAT-{int(datetime.now().timestamp())}",
+            reference=next_dossier_reference(),
             status=DossierStatus.A_ANALYSER.value,
             created_by=rh_user, # Pass the User instance
             entreprise={
@@ -99,7 +133,7 @@ class Command(BaseCommand):
         # Create a Contentieux (linked to dossier_atmp_1)
         contentieux_1 = Contentieux(
             dossier_atmp=dossier_atmp_1, # Link to the DossierATMP instance
-            reference=f"CONT-{int(datetime.now().timestamp())}",
+            reference=next_contentieux_reference(),
             subject={
                 "title": f"Contentieux pour dossier {dossier_atmp_1.reference}",
                 "description": f"Contentieux initié suite à l'audit du dossier AT/MP {dossier_atmp_1.reference}."
@@ -142,3 +176,80 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"Created Audit for Dossier: {dossier_atmp_1.reference}"))
 
         self.stdout.write(self.style.SUCCESS("Data seeding completed."))
+
+    # --- Scale mode ---
+    def seed_scale(self, options):
+        dossiers, batch_size = options['dossiers'], options['batch_size']
+        if not 0 <= options['contentieux_ratio'] <= options['audits_ratio'] <= 1:
+            raise CommandError("Expected 0 <= --contentieux-ratio <= --audits-ratio <= 1 (a contentieux follows an audit).")
+        started = time.monotonic()
+
+        self.stdout.write("Flushing the database...")
+        call_command('flush', interactive=False, verbosity=0)
+        self.seed_fixtures()
+        creators, auditors = self.seed_users(options['users'])
+        # Fixture rows took the first ids: generated rows start after them
+        offset = max(model.objects.aggregate(last=Max('pk'))['last'] or 0 for model in SEEDED_MODELS)
+
+        generator = DossierGenerator(
+            seed=options['seed'],
+            end=day_end(options['end_date'] or timezone.now().date()),
+            audits_ratio=options['audits_ratio'],
+            contentieux_ratio=options['contentieux_ratio'],
+            documents_per_contentieux=options['documents_per_contentieux'],
+            creators=creators,
+            auditors=auditors,
+            employers=max(10, dossiers // 50),
+        )
+        chunks = [
+            (offset + first, offset + min(first + batch_size - 1, dossiers))
+            for first in range(1, dossiers + 1, batch_size)
+        ]
+        use_copy = not options['no_copy']
+        self.stdout.write(f"Generating {dossiers} dossiers in {len(chunks)} chunk(s) on {options['processes']} process(es)...")
+
+        totals = {}
+        if options['processes'] > 1:
+            # Children must not share the parent's DB socket: each opens its own connection
+            connections.close_all()
+            with ProcessPoolExecutor(options['processes']) as pool:
+                futures = [pool.submit(seed_chunk, generator, first, last, use_copy) for first, last in chunks]
+                for done, future in enumerate(futures, 1):
+                    self.report_chunk(totals, future.result(), done, len(chunks), started)
+        else:
+            for done, (first, last) in enumerate(chunks, 1):
+                self.report_chunk(totals, seed_chunk(generator, first, last, use_copy), done, len(chunks), started)
+
+        self.finish_scale(offset + dossiers)
+        summary = ', '.join(f"{count} {table}" for table, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Scale seeding completed in {time.monotonic() - started:.0f}s: {summary}."))
+
+    def seed_users(self, count):
+        """Synthetic RH users (dossier creators) and jurists (auditors); unusable passwords, so no hashing."""
+        users = [
+            User(
+                email=f"user{i}@praevia.example", username=f"user{i}", name=f"Utilisateur {i}",
+                role=UserRole.JURISTE if i % 3 == 0 else UserRole.RH, password=make_password(None),
+            )
+            for i in range(1, count + 1)
+        ]
+        User.objects.bulk_create(users)
+        creators = list(User.objects.filter(role=UserRole.RH).order_by('pk').values_list('pk', flat=True))
+        auditors = list(User.objects.filter(role=UserRole.JURISTE).order_by('pk').values_list('pk', flat=True))
+        return creators, auditors
+
+    def report_chunk(self, totals, counts, done, total, started):
+        for table, count in counts.items():
+            totals[table] = totals.get(table, 0) + count
+        rate = totals['dossiers_atmp'] / max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f"  chunk {done}/{total}: {totals['dossiers_atmp']} dossiers ({rate:.0f}/s)")
+
+    def finish_scale(self, last_number):
+        """What the bypassed signals and allocators would have maintained."""
+        reset_sequences()
+        for allocator in (dossier_references, contentieux_references):
+            ReferenceCounter.objects.update_or_create(prefix=allocator.prefix, defaults={'next_value': last_number + 1})
+            allocator.reset()  # its block predates the new counter value
+        DashboardAggregateService.rebuild()
+        SearchService.rebuild()
+        response_cache.bump(['dossieratmp', 'contentieux', 'audit', 'document', 'dashboards'])
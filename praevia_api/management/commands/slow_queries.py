@@ -0,0 +1,77 @@
+# /home/siisi/praevia_gemini/praevia_api/management/commands/slow_queries.py
+
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+ORDERS = {
+    'total': lambda totals: totals['totalMs'],
+    'max': lambda totals: totals['maxMs'],
+    'count': lambda totals: totals['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Reports the slowest SQL fingerprints recorded by every worker in SLOW_QUERY_LOG (statements over SLOW_QUERY_MS).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG, help='Slow query log (JSON lines).')
+        parser.add_argument('--hours', type=float, help='Only statements recorded in the last N hours.')
+        parser.add_argument('--view', help='Only statements run by this route (e.g. praevia_api:dossier-list).')
+        parser.add_argument('--top', type=int, default=10, help='Fingerprints to show.')
+        parser.add_argument('--order', choices=sorted(ORDERS), default='total', help='Rank by total, max time or count.')
+        parser.add_argument('--plans', action='store_true', help='Print the latest EXPLAIN plan of each fingerprint.')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours']) if options['hours'] else None
+        fingerprints = {}
+        try:
+            with open(options['log']) as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # line cut by a crash or a rotation
+                    if since and datetime.fromisoformat(entry['at']) < since:
+                        continue
+                    if options['view'] and entry['view'] != options['view']:
+                        continue
+                    self.add(fingerprints, entry)
+        except FileNotFoundError:
+            raise CommandError(f"{options['log']} does not exist: no statement over SLOW_QUERY_MS yet, or SLOW_QUERY_MS=0.")
+
+        if not fingerprints:
+            self.stdout.write("No slow statement matches.")
+            return
+        ranked = sorted(fingerprints.values(), key=ORDERS[options['order']], reverse=True)[:options['top']]
+        self.stdout.write(f"{'fingerprint':<12} {'count':>6} {'total (ms)':>11} {'mean (ms)':>10} {'max (ms)':>9}  views")
+        for totals in ranked:
+            self.stdout.write(
+                f"{totals['fingerprint']:<12} {totals['count']:>6} {totals['totalMs']:>11.0f} "
+                f"{totals['totalMs'] / totals['count']:>10.1f} {totals['maxMs']:>9.1f}  {', '.join(sorted(totals['views'])) or '-'}"
+            )
+            self.stdout.write(f"    {totals['sql'][:300]}")
+            if options['plans'] and totals['plan']:
+                self.stdout.write(f"    plan ({totals['vendor']}, explained after a {totals['planMs']:.1f} ms run):")
+                for row in totals['plan']:
+                    self.stdout.write(f"      {row}")
+        self.stdout.write(self.style.SUCCESS(f"{len(fingerprints)} fingerprint(s), {sum(t['count'] for t in fingerprints.values())} statement(s)."))
+
+    @staticmethod
+    def add(fingerprints, entry):
+        totals = fingerprints.get(entry['fingerprint'])
+        if totals is None:
+            totals = fingerprints[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'], 'sql': entry['sql'], 'count': 0, 'totalMs': 0.0, 'maxMs': 0.0,
+                'views': set(), 'plan': None, 'planMs': None, 'vendor': entry['vendor'],
+            }
+        totals['count'] += 1
+        totals['totalMs'] += entry['ms']
+        totals['maxMs'] = max(totals['maxMs'], entry['ms'])
+        if entry['view']:
+            totals['views'].add(entry['view'])
+        if entry['plan']:
+            totals['plan'], totals['planMs'] = entry['plan'], entry['ms']  # log order: the latest wins
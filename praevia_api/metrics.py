@@ -0,0 +1,415 @@
+# /home/siisi/praevia_gemini/praevia_api/metrics.py
+
+import fcntl
+import glob
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name -> (help, buckets); all labelled by route and method
+HISTOGRAMS = {
+    'praevia_http_request_duration_seconds': ('Wall time until the response is returned (streamed bodies excluded).', DURATION_BUCKETS),
+    'praevia_http_request_db_queries': ('SQL statements executed per request.', QUERY_BUCKETS),
+    'praevia_http_request_db_duration_seconds': ('Time spent in SQL statements per request (summed over connections).', DURATION_BUCKETS),
+    'praevia_http_request_serializer_duration_seconds': ('Time spent in serializer.data per request, SQL excluded.', DURATION_BUCKETS),
+    'praevia_http_request_render_duration_seconds': ('Time spent rendering the response body (JSON encoding).', DURATION_BUCKETS),
+    'praevia_http_response_size_bytes': ('Response body size (Content-Length for streamed bodies).', SIZE_BUCKETS),
+}
+REQUESTS_TOTAL = 'praevia_http_requests_total'
+
+# The request being measured: queries run on executor threads (async views) inherit it
+_current = ContextVar('praevia_request_metrics', default=None)
+
+
+class RequestStats:
+    __slots__ = ('route', 'queries', 'db_seconds', 'serializer_seconds', 'render_seconds', 'serializing')
+
+    def __init__(self):
+        self.route = None
+        self.queries = 0
+        self.db_seconds = self.serializer_seconds = self.render_seconds = 0.0
+        self.serializing = False
+
+
+def current_route():
+    """Route name of the request being served (None outside requests or with METRICS_ENABLED off)."""
+    stats = _current.get()
+    return stats.route if stats is not None else None
+
+
+# --- Instrumentation hooks ---
+def time_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - start
+
+
+def install_query_timer(sender, connection, **kwargs):
+    # First in the list (outermost): connection.execute_wrapper() blocks pop() from the end
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_query)
+
+
+def timed_serializer_data(data):
+    """Wraps BaseSerializer.data: only top-level serializers are timed, minus the SQL they trigger."""
+    def fget(serializer):
+        stats = _current.get()
+        if stats is None or stats.serializing:
+            return data.fget(serializer)
+        stats.serializing = True
+        db_before, start = stats.db_seconds, time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            stats.serializing = False
+            stats.serializer_seconds += time.perf_counter() - start - (stats.db_seconds - db_before)
+    fget.wrapped = data
+    return property(fget)
+
+
+def timed_render(render):
+    """Wraps FastJSONRenderer.render (sync and async views, and the response cache, go through it)."""
+    @wraps(render)
+    def wrapper(renderer, data, *args, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return render(renderer, data, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return render(renderer, data, *args, **kwargs)
+        finally:
+            stats.render_seconds += time.perf_counter() - start
+    wrapper.wrapped = render
+    return wrapper
+
+
+def instrument():
+    """Called from AppConfig.ready() when METRICS_ENABLED."""
+    from rest_framework.serializers import BaseSerializer
+
+    from .fastjson import FastJSONRenderer
+
+    connection_created.connect(install_query_timer, dispatch_uid='praevia_metrics_query_timer')
+    if not hasattr(BaseSerializer.data.fget, 'wrapped'):
+        BaseSerializer.data = timed_serializer_data(BaseSerializer.data)
+    if not hasattr(FastJSONRenderer.render, 'wrapped'):
+        FastJSONRenderer.render = timed_render(FastJSONRenderer.render)
+
+
+# --- Registry ---
+class MetricsRegistry:
+    """
+    Per-worker histograms. Each OS thread writes to its own shard (dict of
+    bucket lists), so recording takes no lock; gevent greenlets share their
+    thread's shard but never switch in the middle of an update.
+
+    Workers write a snapshot to METRICS_DIR every METRICS_FLUSH_INTERVAL
+    seconds; /metrics sums the snapshots of every worker of the host.
+    Snapshots of dead workers are folded into archive.json so totals never go
+    backwards.
+    """
+
+    def __init__(self):
+        self._shards = {}
+        self._flush_lock = threading.Lock()
+        self._next_flush = 0.0
+        self._pid = self._filename = None
+
+    def _shard(self):
+        thread_id = threading.get_native_id()  # the OS thread, also under gevent
+        shard = self._shards.get(thread_id)
+        if shard is None:
+            shard = self._shards[thread_id] = {}
+        return shard
+
+    @staticmethod
+    def _observe(shard, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, *labels)
+        cells = shard.get(key)
+        if cells is None:
+            cells = shard[key] = [0] * (len(buckets) + 1) + [0.0]  # buckets, +Inf, sum
+        cells[bisect_left(buckets, value)] += 1
+        cells[-1] += value
+
+    def record(self, route, method, status_code, stats, duration, size):
+        shard = self._shard()
+        labels = (route, method)
+        key = (REQUESTS_TOTAL, route, method, str(status_code))
+        shard[key] = shard.get(key, 0) + 1
+        self._observe(shard, 'praevia_http_request_duration_seconds', labels, duration)
+        self._observe(shard, 'praevia_http_request_db_queries', labels, stats.queries)
+        self._observe(shard, 'praevia_http_request_db_duration_seconds', labels, stats.db_seconds)
+        self._observe(shard, 'praevia_http_request_serializer_duration_seconds', labels, stats.serializer_seconds)
+        self._observe(shard, 'praevia_http_request_render_duration_seconds', labels, stats.render_seconds)
+        if size is not None:
+            self._observe(shard, 'praevia_http_response_size_bytes', labels, size)
+
+        if settings.METRICS_DIR and time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def snapshot(self):
+        """This worker's series: {key tuple: int | [bucket counts..., sum]}."""
+        merged = {}
+        for shard in list(self._shards.values()):
+            merge_series(merged, list(shard.items()))
+        merge_series(merged, process_series().items())
+        return merged
+
+    def reset(self):
+        self._shards.clear()
+
+    # --- Cross-worker aggregation ---
+    def flush(self):
+        """Writes this worker's snapshot (at most one thread at a time, never blocking a request)."""
+        if not settings.METRICS_DIR or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = time.monotonic() + settings.METRICS_FLUSH_INTERVAL
+            if self._pid != os.getpid():  # first flush in this (possibly forked) worker
+                self._pid = os.getpid()
+                self._filename = f"{self._pid}-{time.time_ns()}.json"
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            write_series(os.path.join(settings.METRICS_DIR, self._filename), self.snapshot())
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire les métriques dans {settings.METRICS_DIR}: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """Series of all the workers of this host (this worker only without METRICS_DIR)."""
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+        self.flush()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        archive = os.path.join(settings.METRICS_DIR, 'archive.json')
+        with open(os.path.join(settings.METRICS_DIR, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = read_series(archive)
+            dead = {}
+            for path in glob.glob(os.path.join(settings.METRICS_DIR, '*-*.json')):
+                series = read_series(path)
+                if pid_alive(int(os.path.basename(path).split('-')[0])):
+                    merge_series(merged, series.items())
+                else:
+                    merge_series(dead, ((key, value) for key, value in series.items() if cumulative(key[0])))
+                    os.unlink(path)
+            if dead:
+                merge_series(merged, dead.items())
+                write_series(archive, merge_series(dead, read_series(archive).items()))
+        return merged
+
+    def render(self):
+        return render_prometheus(self.collect())
+
+
+registry = MetricsRegistry()
+
+
+def merge_series(merged, items):
+    for key, value in items:
+        current = merged.get(key)
+        if current is None:
+            merged[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            for i, cell in enumerate(value):
+                current[i] += cell
+        else:
+            merged[key] = current + value
+    return merged
+
+
+def cumulative(name):
+    """Histograms and counters add up across worker lifetimes; gauges die with their worker."""
+    return name in HISTOGRAMS or name.endswith('_total')
+
+
+def write_series(path, series):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump([[list(key), value] for key, value in series.items()], f, separators=(',', ':'))
+    os.replace(tmp, path)  # readers never see a partial file
+
+
+def read_series(path):
+    try:
+        with open(path) as f:
+            return {tuple(key): value for key, value in json.load(f)}
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logger.warning(f"Fichier de métriques illisible ignoré: {path}")
+        return {}
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def process_series():
+    """Counters the per-worker caches and pools already keep, exported as totals."""
+    from .authentication import token_cache
+    from .caching import response_cache
+    from .hashing import password_hash_pool
+
+    hashing = password_hash_pool.stats()
+    cache = response_cache.stats()
+    return {
+        ('praevia_response_cache_hits_total',): cache['hits'],
+        ('praevia_response_cache_misses_total',): cache['misses'],
+        ('praevia_token_cache_hits_total',): token_cache.hits,
+        ('praevia_token_cache_misses_total',): token_cache.misses,
+        ('praevia_password_hash_submitted_total',): hashing['submitted'],
+        ('praevia_password_hash_rejected_total',): hashing['rejected'],
+        ('praevia_password_hash_completed_total',): hashing['completed'],
+        ('praevia_password_hash_wait_seconds_total',): hashing['waitSecondsTotal'],
+        ('praevia_password_hash_seconds_total',): hashing['hashSecondsTotal'],
+        ('praevia_password_hash_pending',): hashing['pending'],
+    }
+
+
+# --- Prometheus text format ---
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def labels_text(names, values):
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+def number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(series):
+    by_name = {}
+    for key, value in series.items():
+        by_name.setdefault(key[0], []).append((key[1:], value))
+
+    lines = []
+    for name in sorted(by_name):
+        rows = sorted(by_name[name])
+        if name in HISTOGRAMS:
+            help_text, buckets = HISTOGRAMS[name]
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for labels, cells in rows:
+                base = labels_text(('route', 'method'), labels)
+                running = 0
+                for bound, count in zip((*buckets, '+Inf'), cells[:-1]):
+                    running += count
+                    lines.append(f'{name}_bucket{{{base},le="{bound}"}} {running}')
+                lines.append(f"{name}_sum{{{base}}} {number(cells[-1])}")
+                lines.append(f"{name}_count{{{base}}} {running}")
+        elif name == REQUESTS_TOTAL:
+            lines += [f"# HELP {name} Requests by route, method and status code.", f"# TYPE {name} counter"]
+            for labels, value in rows:
+                lines.append(f"{name}{{{labels_text(('route', 'method', 'status'), labels)}}} {value}")
+        else:
+            lines.append(f"# TYPE {name} {'counter' if cumulative(name) else 'gauge'}")
+            lines += [f"{name} {number(value)}" for _, value in rows]
+    return '\n'.join(lines) + '\n'
+
+
+# --- Middleware ---
+class RequestMetricsMiddleware:
+    """
+    Records, per route name (e.g. praevia_api:dossier-list), wall time, SQL
+    count and time, serializer and render time and response size. Put it
+    first in MIDDLEWARE so the other middleware are included in the wall time.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Resolved by now: lets the view's queries be attributed to it (slow query log)
+        stats = _current.get()
+        if stats is not None:
+            stats.route = request.resolver_match.view_name
+
+    @staticmethod
+    def record(request, response, stats, duration):
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'  # keeps 404 paths out of the labels
+        if response.streaming:
+            size = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            size = len(response.content)
+        registry.record(route, request.method, response.status_code, stats, duration, size)
+
+
+# --- Endpoint ---
+def authorized(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    return getattr(request, 'user', None) is not None and request.user.is_staff
+
+
+@require_GET
+def metrics_view(request):
+    """GET /metrics: Prometheus text format, METRICS_TOKEN bearer (or a staff session without one)."""
+    if not authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
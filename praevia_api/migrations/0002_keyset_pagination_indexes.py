@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('praevia_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='audit',
+            index=models.Index(fields=['-created_at', '-id'], name='audits_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contentieux',
+            index=models.Index(fields=['-created_at', '-id'], name='contentieux_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-created_at', '-id'], name='documents_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dossieratmp',
+            index=models.Index(fields=['-created_at', '-id'], name='dossiers_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:23
+
+import django.db.models.fields.json
+from django.db import migrations, models
+
+JSON_GIN_INDEXES = (
+    ('dossiers_entreprise_gin', 'entreprise'),
+    ('dossiers_salarie_gin', 'salarie'),
+    ('dossiers_accident_gin', 'accident'),
+)
+
+
+def create_gin_indexes(apps, schema_editor):
+    # jsonb containment (@>) indexes only exist on PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in JSON_GIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "dossiers_atmp" USING gin ("{column}" jsonb_path_ops)'
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in JSON_GIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('praevia_api', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dossieratmp',
+            name='accident_date',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('date', 'accident'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='dossieratmp',
+            name='accident_lieu',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('lieu', 'accident'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='dossieratmp',
+            name='entreprise_siret',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('siret', 'entreprise'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='dossieratmp',
+            name='salarie_numero_secu',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.fields.json.KeyTextTransform('numeroSecu', 'salarie'), output_field=models.TextField()),
+        ),
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
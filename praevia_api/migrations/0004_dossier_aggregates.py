@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:24
+
+from django.db import migrations, models
+from django.db.models import Count, Value
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
+
+
+def populate_aggregates(apps, schema_editor):
+    DossierATMP = apps.get_model('praevia_api', 'DossierATMP')
+    DossierAggregate = apps.get_model('praevia_api', 'DossierAggregate')
+    rows = (
+        DossierATMP.objects.order_by()
+        .values('status', bucket_case_type=Coalesce(KT('accident__type'), Value(''), output_field=models.TextField()))
+        .annotate(total=Count('id'))
+    )
+    DossierAggregate.objects.bulk_create([
+        DossierAggregate(status=row['status'], case_type=str(row['bucket_case_type']), count=row['total'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('praevia_api', '0003_dossier_json_filter_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DossierAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('A_ANALYSER', 'A_ANALYSER'), ('ANALYSE_EN_COURS', 'ANALYSE_EN_COURS'), ('CONTESTATION_RECOMMANDEE', 'CONTESTATION_RECOMMANDEE'), ('CONTESTATION_NON_RECOMMANDEE', 'CONTESTATION_NON_RECOMMANDEE'), ('CLOTURE_SANS_SUITE', 'CLOTURE_SANS_SUITE'), ('TRANSFORME_EN_CONTENTIEUX', 'TRANSFORME_EN_CONTENTIEUX')], max_length=50)),
+                ('case_type', models.CharField(blank=True, default='', max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'dossier_aggregates',
+                'constraints': [models.UniqueConstraint(fields=('status', 'case_type'), name='dossier_aggregates_bucket_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
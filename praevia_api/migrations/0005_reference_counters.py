@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('praevia_api', '0004_dossier_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceCounter',
+            fields=[
+                ('prefix', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'reference_counters',
+            },
+        ),
+    ]
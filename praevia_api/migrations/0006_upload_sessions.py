@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:32
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('praevia_api', '0005_reference_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('document_type', models.CharField(choices=[('DAT', 'DAT'), ('CERTIFICAT_MEDICAL', 'CERTIFICAT_MEDICAL'), ('ARRET_TRAVAIL', 'ARRET_TRAVAIL'), ('TEMOIGNAGE', 'TEMOIGNAGE'), ('DECISION_CPAM', 'DECISION_CPAM'), ('EXPERTISE_MEDICALE', 'EXPERTISE_MEDICALE'), ('LETTRE_RESERVE', 'LETTRE_RESERVE'), ('CONTRAT_TRAVAIL', 'CONTRAT_TRAVAIL'), ('FICHE_POSTE', 'FICHE_POSTE'), ('RAPPORT_ENQUETE', 'RAPPORT_ENQUETE'), ('NOTIFICATION_TAUX', 'NOTIFICATION_TAUX'), ('COURRIER', 'COURRIER'), ('AUTRE', 'AUTRE')], max_length=50)),
+                ('original_name', models.CharField(max_length=255)),
+                ('mime_type', models.CharField(max_length=100)),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0)),
+                ('chunks', models.IntegerField(default=0)),
+                ('sha256', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contentieux', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='praevia_api.contentieux')),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='praevia_api.document')),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'upload_sessions',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
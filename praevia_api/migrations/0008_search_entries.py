@@ -0,0 +1,131 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:10
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# names: fuzzy (trigram) and full text, weight A; body: full text, weight B
+POSTGRES_INDEX = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """ALTER TABLE "search_entries" ADD COLUMN "document" tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', "reference" || ' ' || "names"), 'A') ||
+        setweight(to_tsvector('french', "body"), 'B')
+    ) STORED""",
+    'CREATE INDEX "search_entries_document_gin" ON "search_entries" USING gin ("document")',
+    'CREATE INDEX "search_entries_names_trgm" ON "search_entries" USING gin ("names" gin_trgm_ops)',
+]
+# External-content FTS5 table kept in step by triggers (no second copy of the text)
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE "search_entries_fts" USING fts5(
+        reference, names, body, content='search_entries', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER "search_entries_fts_insert" AFTER INSERT ON "search_entries" BEGIN
+        INSERT INTO search_entries_fts(rowid, reference, names, body) VALUES (new.id, new.reference, new.names, new.body);
+    END""",
+    """CREATE TRIGGER "search_entries_fts_delete" AFTER DELETE ON "search_entries" BEGIN
+        INSERT INTO search_entries_fts(search_entries_fts, rowid, reference, names, body)
+        VALUES ('delete', old.id, old.reference, old.names, old.body);
+    END""",
+    """CREATE TRIGGER "search_entries_fts_update" AFTER UPDATE ON "search_entries" BEGIN
+        INSERT INTO search_entries_fts(search_entries_fts, rowid, reference, names, body)
+        VALUES ('delete', old.id, old.reference, old.names, old.body);
+        INSERT INTO search_entries_fts(rowid, reference, names, body) VALUES (new.id, new.reference, new.names, new.body);
+    END""",
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_INDEX, 'sqlite': SQLITE_INDEX}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE "search_entries" DROP COLUMN IF EXISTS "document"')
+    elif vendor == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS "search_entries_fts_{trigger}"')
+        schema_editor.execute('DROP TABLE IF EXISTS "search_entries_fts"')
+
+
+def populate_search_entries(apps, schema_editor):
+    # Frozen copy of search.py as of this migration (no document texts yet): later
+    # changes to the live indexing code must not change what it writes
+    DossierATMP = apps.get_model('praevia_api', 'DossierATMP')
+    Contentieux = apps.get_model('praevia_api', 'Contentieux')
+    SearchEntry = apps.get_model('praevia_api', 'SearchEntry')
+
+    def strings(value):
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, dict):
+            value = value.values()
+        elif not isinstance(value, list):
+            return []
+        return [text for item in value for text in strings(item)]
+
+    def names(salarie, entreprise):
+        salarie = salarie if isinstance(salarie, dict) else {}
+        entreprise = entreprise if isinstance(entreprise, dict) else {}
+        parts = (salarie.get('prenom'), salarie.get('nom'), entreprise.get('raisonSociale'))
+        return ' '.join(str(part) for part in parts if part)
+
+    def body(accident):
+        accident = accident if isinstance(accident, dict) else {}
+        return '\n'.join(str(accident[key]) for key in ('circonstances', 'descriptionLesions') if accident.get(key))
+
+    def insert(entries):
+        while batch := list(islice(entries, 2000)):
+            SearchEntry.objects.bulk_create(batch)
+
+    dossiers = DossierATMP.objects.order_by('pk').values_list('pk', 'reference', 'salarie', 'entreprise', 'accident')
+    insert(
+        SearchEntry(
+            kind='dossier', object_id=pk, dossier_atmp_id=pk, reference=reference,
+            names=names(salarie, entreprise), body=body(accident),
+        )
+        for pk, reference, salarie, entreprise, accident in dossiers.iterator(chunk_size=2000)
+    )
+
+    contentieux = Contentieux.objects.order_by('pk').values_list(
+        'pk', 'dossier_atmp_id', 'reference', 'subject', 'dossier_atmp__salarie', 'dossier_atmp__entreprise'
+    )
+    insert(
+        SearchEntry(
+            kind='contentieux', object_id=pk, dossier_atmp_id=dossier_id, reference=reference,
+            names=names(salarie, entreprise), body='\n'.join(strings(subject))[:200_000],
+        )
+        for pk, dossier_id, reference, subject, salarie, entreprise in contentieux.iterator(chunk_size=2000)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('praevia_api', '0007_content_addressed_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('dossier', 'DOSSIER'), ('contentieux', 'CONTENTIEUX')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('reference', models.CharField(max_length=255)),
+                ('names', models.TextField(blank=True, default='')),
+                ('body', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dossier_atmp', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='praevia_api.dossieratmp')),
+            ],
+            options={
+                'db_table': 'search_entries',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entries_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_entries, migrations.RunPython.noop),
+    ]
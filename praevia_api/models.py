@@ -1,10 +1,15 @@
 # /home/siisi/praevia_gemini/praevia_api/models.py
 
 from django.db import models
+from django.db.models.fields.json import KT
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.conf import settings
 from django.utils import timezone
 import enum
+import uuid
+
+from .hashing import check_password, make_password
+from .storage import get_document_storage
 
 # ───────────────────────────────────────────────────────────────
 # ENUMS (unchanged)
@@ -36,6 +41,27 @@ class JuridictionType(enum.Enum):
     @classmethod
     def choices(cls): return [(m.value, m.name) for m in cls]
 
+class JobStatus(enum.Enum):
+    QUEUED    = 'QUEUED'
+    RUNNING   = 'RUNNING'
+    SUCCEEDED = 'SUCCEEDED'
+    FAILED    = 'FAILED'
+    @classmethod
+    def choices(cls): return [(m.value, m.name) for m in cls]
+
+class DocumentProcessingStatus(enum.Enum):
+    PENDING   = 'PENDING'
+    PROCESSED = 'PROCESSED'
+    FAILED    = 'FAILED'
+    @classmethod
+    def choices(cls): return [(m.value, m.name) for m in cls]
+
+class SearchEntryKind(enum.Enum):
+    DOSSIER     = 'dossier'
+    CONTENTIEUX = 'contentieux'
+    @classmethod
+    def choices(cls): return [(m.value, m.name) for m in cls]
+
 class DocumentType(enum.Enum):
     DAT = 'DAT'
     CERTIFICAT_MEDICAL = 'CERTIFICAT_MEDICAL'
@@ -118,6 +144,18 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.username
 
+    # Hashing runs on password_hash_pool, off the gevent hub (see hashing.py)
+    def set_password(self, raw_password):
+        self.password = make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return check_password(raw_password, self.password, setter)
+
 # ───────────────────────────────────────────────────────────────
 #  OTHER MODELS  (only FK/M2M changed to settings.AUTH_USER_MODEL)
 # ───────────────────────────────────────────────────────────────
@@ -136,16 +174,70 @@ class Document(models.Model):
     uploaded_by   = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploaded_documents')
     document_type = models.CharField(max_length=50, choices=DocumentType.choices())
     original_name = models.CharField(max_length=255)
-    file          = models.FileField(upload_to='documents/', blank=True, null=True)
+    file          = models.FileField(upload_to='documents/', storage=get_document_storage, blank=True, null=True)
+    sha256        = models.CharField(max_length=64, blank=True, default='', db_index=True)
     mime_type     = models.CharField(max_length=100)
     size          = models.IntegerField()
+    # Filled after the upload by the documents.process job (processing.py)
+    processing_status = models.CharField(max_length=20, choices=DocumentProcessingStatus.choices(), default=DocumentProcessingStatus.PENDING.value)
+    page_count    = models.PositiveIntegerField(blank=True, null=True)
+    text          = models.TextField(blank=True, default='')  # PDF text layer or OCR, indexed with the contentieux
+    thumbnail     = models.FileField(upload_to='thumbnails/', blank=True, null=True)  # one JPEG per content (sha256)
+    processed_at  = models.DateTimeField(blank=True, null=True)
     created_at    = models.DateTimeField(auto_now_add=True)
     updated_at    = models.DateTimeField(auto_now=True)
     class Meta:
         db_table = 'documents'
         ordering = ['-created_at']
+        indexes  = [models.Index(fields=['-created_at', '-id'], name='documents_created_id_idx')]
     def __str__(self): return self.original_name
 
+    def save(self, *args, **kwargs):
+        # Commit a new upload first so sha256 names the blob it landed in (see storage.py)
+        if self.file and not self.file._committed:
+            self.file.save(self.file.name, self.file.file, save=False)
+        self.sha256 = (get_document_storage().sha256_from_name(self.file.name) or '') if self.file else ''
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Blob the row referenced when loaded, for reference counting (see signals.py)
+        if 'sha256' in field_names:
+            instance._loaded_sha256 = instance.sha256
+        return instance
+
+class Blob(models.Model):
+    """A content-addressed file (storage.py) and the number of Document rows using it."""
+    sha256     = models.CharField(max_length=64, primary_key=True)
+    size       = models.BigIntegerField()
+    ref_count  = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        db_table = 'blobs'
+    def __str__(self): return f"{self.sha256} ({self.ref_count} refs)"
+
+class UploadSession(models.Model):
+    """Chunked upload in progress (see uploads.py); chunks are appended to a temp file."""
+    id            = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    contentieux   = models.ForeignKey('Contentieux', on_delete=models.CASCADE, related_name='upload_sessions')
+    uploaded_by   = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    document_type = models.CharField(max_length=50, choices=DocumentType.choices())
+    original_name = models.CharField(max_length=255)
+    mime_type     = models.CharField(max_length=100)
+    size          = models.BigIntegerField()
+    received      = models.BigIntegerField(default=0)
+    chunks        = models.IntegerField(default=0)
+    sha256        = models.CharField(max_length=64, blank=True, default='')
+    document      = models.OneToOneField(Document, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session')
+    created_at    = models.DateTimeField(auto_now_add=True)
+    updated_at    = models.DateTimeField(auto_now=True)
+    class Meta:
+        db_table = 'upload_sessions'
+        ordering = ['-created_at']
+    def __str__(self): return f"{self.original_name} ({self.received}/{self.size})"
+
 class Contentieux(models.Model):
     dossier_atmp      = models.OneToOneField('DossierATMP', on_delete=models.CASCADE, related_name='contentieux_detail')
     reference         = models.CharField(max_length=255, unique=True)
@@ -159,6 +251,7 @@ class Contentieux(models.Model):
     class Meta:
         db_table = 'contentieux'
         ordering = ['-created_at']
+        indexes  = [models.Index(fields=['-created_at', '-id'], name='contentieux_created_id_idx')]
     def __str__(self): return self.reference
 
 class DossierATMP(models.Model):
@@ -174,11 +267,97 @@ class DossierATMP(models.Model):
     documents       = models.ManyToManyField(Document, related_name='dossier_atmp_documents', blank=True)
     created_at      = models.DateTimeField(auto_now_add=True)
     updated_at      = models.DateTimeField(auto_now=True)
+
+    # Searchable JSON keys materialized as indexed generated columns (read-only)
+    entreprise_siret    = models.GeneratedField(expression=KT('entreprise__siret'), output_field=models.TextField(), db_persist=True, db_index=True)
+    salarie_numero_secu = models.GeneratedField(expression=KT('salarie__numeroSecu'), output_field=models.TextField(), db_persist=True, db_index=True)
+    accident_date       = models.GeneratedField(expression=KT('accident__date'), output_field=models.TextField(), db_persist=True, db_index=True)
+    accident_lieu       = models.GeneratedField(expression=KT('accident__lieu'), output_field=models.TextField(), db_persist=True, db_index=True)
+
     class Meta:
         db_table = 'dossiers_atmp'
         ordering = ['-created_at']
+        indexes  = [models.Index(fields=['-created_at', '-id'], name='dossiers_created_id_idx')]
     def __str__(self): return self.reference
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the dashboard bucket the row was loaded with (see signals.py)
+        if 'status' in field_names and 'accident' in field_names:
+            instance._loaded_bucket = (instance.status, instance.case_type)
+        return instance
+
+    @property
+    def case_type(self):
+        """Case type (AT, MP, TRAJET...) declared in accident['type'], '' when missing."""
+        if not isinstance(self.accident, dict):
+            return ''
+        return str(self.accident.get('type') or '')
+
+class ReferenceCounter(models.Model):
+    """Next free reference number per prefix (DAT, CONT), reserved in blocks by references.py."""
+    prefix     = models.CharField(max_length=20, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+    class Meta:
+        db_table = 'reference_counters'
+    def __str__(self): return f"{self.prefix}: {self.next_value}"
+
+class DossierAggregate(models.Model):
+    """Dossier counters per (status, case type), maintained by signals.py."""
+    status     = models.CharField(max_length=50, choices=DossierStatus.choices())
+    case_type  = models.CharField(max_length=100, blank=True, default='')
+    count      = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        db_table    = 'dossier_aggregates'
+        constraints = [models.UniqueConstraint(fields=['status', 'case_type'], name='dossier_aggregates_bucket_uniq')]
+    def __str__(self): return f"{self.status}/{self.case_type or '-'}: {self.count}"
+
+class SearchEntry(models.Model):
+    """
+    Searchable text of a dossier or contentieux, maintained by signals.py and
+    indexed by migration 0008: tsvector + trigram on PostgreSQL, FTS5 on SQLite.
+    """
+    kind         = models.CharField(max_length=20, choices=SearchEntryKind.choices())
+    object_id    = models.BigIntegerField()
+    dossier_atmp = models.ForeignKey('DossierATMP', on_delete=models.CASCADE, related_name='search_entries')
+    reference    = models.CharField(max_length=255)
+    names        = models.TextField(blank=True, default='')  # employee and company names (fuzzy matched)
+    body         = models.TextField(blank=True, default='')  # circumstances, injuries, contentieux subject
+    updated_at   = models.DateTimeField(auto_now=True)
+    class Meta:
+        db_table    = 'search_entries'
+        constraints = [models.UniqueConstraint(fields=['kind', 'object_id'], name='search_entries_object_uniq')]
+    def __str__(self): return f"{self.kind} {self.reference}"
+
+class Job(models.Model):
+    """Background job run by `manage.py run_workers` (jobs.py, tasks registered in tasks.py)."""
+    name         = models.CharField(max_length=100)
+    payload      = models.JSONField(default=dict)
+    status       = models.CharField(max_length=20, choices=JobStatus.choices(), default=JobStatus.QUEUED.value)
+    priority     = models.IntegerField(default=0)  # higher runs first
+    attempts     = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at       = models.DateTimeField(default=timezone.now)  # not before (delay, retry backoff)
+    locked_at    = models.DateTimeField(blank=True, null=True)
+    locked_by    = models.CharField(max_length=100, blank=True, default='')
+    result       = models.JSONField(blank=True, null=True)
+    last_error   = models.TextField(blank=True, default='')
+    created_by   = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at   = models.DateTimeField(auto_now_add=True)
+    updated_at   = models.DateTimeField(auto_now=True)
+    finished_at  = models.DateTimeField(blank=True, null=True)
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        indexes  = [
+            # The claim query: next ready job by priority, then age
+            models.Index(fields=['-priority', 'run_at', 'id'], condition=models.Q(status='QUEUED'), name='jobs_ready_idx'),
+            models.Index(fields=['locked_at'], condition=models.Q(status='RUNNING'), name='jobs_running_idx'),
+        ]
+    def __str__(self): return f"{self.name} #{self.pk} ({self.status})"
+
 class Audit(models.Model):
     dossier_atmp = models.OneToOneField(DossierATMP, on_delete=models.CASCADE, related_name='audit_detail', unique=True)
     auditor      = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='audits_performed')
@@ -193,4 +372,5 @@ class Audit(models.Model):
     class Meta:
         db_table = 'audits'
         ordering = ['-created_at']
+        indexes  = [models.Index(fields=['-created_at', '-id'], name='audits_created_id_idx')]
     def __str__(self): return f"Audit for {self.dossier_atmp.reference}"
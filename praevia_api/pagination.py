@@ -0,0 +1,123 @@
+# /home/siisi/praevia_gemini/praevia_api/pagination.py
+
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.utils.dateparse import parse_datetime
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, keyset (cursor) pagination on
+    (created_at, id) when the client sends ?cursor= (empty for the first page).
+
+    Keyset pages never run OFFSET nor COUNT(*): with the (created_at, id)
+    composite indexes a deep page costs the same as the first one.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Curseur invalide.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.request = request
+        self.display_page_controls = False
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+
+        if position is not None:
+            created_at, pk = position
+            # The leading range on created_at is what lets the database start
+            # the index scan right at the cursor instead of skipping rows.
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gte=created_at),
+                    Q(created_at__gt=created_at) | Q(id__gt=pk),
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lte=created_at),
+                    Q(created_at__lt=created_at) | Q(id__lt=pk),
+                )
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.first_item = results[0] if results else None
+        self.last_item = results[-1] if results else None
+        if reverse:
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or self.last_item is None:
+            return None
+        return self.build_cursor_link(self.last_item, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or self.first_item is None:
+            return None
+        return self.build_cursor_link(self.first_item, reverse=True)
+
+    # --- Cursor encoding ---
+    def build_cursor_link(self, instance, reverse):
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        token = self.encode_cursor(instance.created_at, instance.pk, reverse)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    @staticmethod
+    def encode_cursor(created_at, pk, reverse=False):
+        tokens = {'c': created_at.isoformat(), 'i': pk}
+        if reverse:
+            tokens['r'] = '1'
+        querystring = parse.urlencode(tokens)
+        return b64encode(querystring.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            created_at = parse_datetime(tokens['c'][0])
+            pk = int(tokens['i'][0])
+            reverse = tokens.get('r', ['0'])[0] == '1'
+        except (KeyError, TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (created_at, pk), reverse
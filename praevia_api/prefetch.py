@@ -0,0 +1,71 @@
+# /home/siisi/praevia_gemini/praevia_api/prefetch.py
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+
+def related_lookups(serializer, prefix='', nested=False):
+    """
+    (select_related, prefetch_related) lookups needed to render `serializer`
+    without a query per row, derived from its readable fields.
+
+    Forward FKs rendered as a plain id need nothing (DRF reads `<field>_id`);
+    to-many ids are prefetched with only the primary key loaded.
+    """
+    model = serializer.Meta.model
+    select, prefetch = [], []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        lookup = prefix + field.source
+        to_many = model_field.many_to_many or model_field.one_to_many
+        if isinstance(field, ManyRelatedField):
+            if isinstance(field.child_relation, PrimaryKeyRelatedField):
+                related = model_field.related_model
+                prefetch.append(Prefetch(lookup, queryset=related._default_manager.only('pk')))
+            else:
+                prefetch.append(lookup)
+        elif isinstance(field, RelatedField):
+            if field.use_pk_only_optimization() and not to_many:
+                continue
+            (prefetch if nested or to_many else select).append(lookup)
+        elif isinstance(field, serializers.BaseSerializer):
+            child = field.child if isinstance(field, serializers.ListSerializer) else field
+            inner_nested = nested or to_many
+            (prefetch if inner_nested else select).append(lookup)
+            inner_select, inner_prefetch = related_lookups(child, lookup + '__', inner_nested)
+            select += inner_select
+            prefetch += inner_prefetch
+    return select, prefetch
+
+
+def eager_load(queryset, serializer):
+    select, prefetch = related_lookups(serializer)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class EagerLoadingMixin:
+    """
+    Loads the relations the viewset's serializer renders up front, so list
+    pages run a fixed number of queries whatever their size. Writes are left
+    alone: DRF drops the prefetch cache after an update anyway.
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            queryset = eager_load(queryset, self.get_serializer())
+        return queryset
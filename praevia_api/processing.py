@@ -0,0 +1,200 @@
+# /home/siisi/praevia_gemini/praevia_api/processing.py
+
+import io
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # optional: PDFs then get no text, page count or thumbnail
+    pdfium = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional: no thumbnails, images are only OCRed
+    Image = None
+
+# Pages rendered at this many pixels per PDF point before downscaling: sharper thumbnails
+RENDER_OVERSAMPLING = 2
+
+
+# --- Analysis (runs in the pool processes: plain arguments in, plain values out, no ORM) ---
+def analyze(path, mime_type, options):
+    """
+    Page count, text and a JPEG thumbnail (bytes) of one file. `options`:
+    thumbnail_size, text_max_chars, ocr_languages, ocr_max_pages.
+    """
+    started = time.monotonic()
+    with open(path, 'rb') as file:
+        is_pdf = file.read(5) == b'%PDF-'
+    if is_pdf or mime_type == 'application/pdf':
+        result = analyze_pdf(path, options) if pdfium is not None else empty_result()
+    elif mime_type.startswith('image/'):
+        result = analyze_image(path, options)
+    else:
+        result = empty_result()  # Word, e-mails...: stored, not analyzed
+    result['seconds'] = time.monotonic() - started
+    return result
+
+
+def empty_result():
+    return {'page_count': None, 'text': '', 'thumbnail': None}
+
+
+def analyze_pdf(path, options):
+    result = empty_result()
+    pdf = pdfium.PdfDocument(path)
+    try:
+        result['page_count'] = len(pdf)
+        texts, length = [], 0
+        for index in range(len(pdf)):
+            if length >= options['text_max_chars']:
+                break
+            page = pdf[index]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range().strip()
+            textpage.close()
+            if not text and index < options['ocr_max_pages']:
+                text = ocr(render(page, scale=300 / 72), options)  # scanned page: no text layer
+            if index == 0 and Image is not None:
+                result['thumbnail'] = thumbnail(render(page, scale=options['thumbnail_size'] * RENDER_OVERSAMPLING / page.get_width()), options)
+            page.close()
+            if text:
+                texts.append(text)
+                length += len(text)
+        result['text'] = '\n\n'.join(texts)[:options['text_max_chars']]
+    finally:
+        pdf.close()
+    return result
+
+
+def analyze_image(path, options):
+    result = empty_result()
+    if Image is not None:
+        with Image.open(path) as image:
+            result['page_count'] = getattr(image, 'n_frames', 1)  # multi-page TIFF scans
+            result['thumbnail'] = thumbnail(image, options)
+    with open(path, 'rb') as file:
+        result['text'] = ocr(file.read(), options)[:options['text_max_chars']]
+    return result
+
+
+def render(page, scale):
+    """PNG bytes of a PDF page, or None without Pillow."""
+    if Image is None:
+        return None
+    image = page.render(scale=scale).to_pil()
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def thumbnail(image, options):
+    if isinstance(image, bytes):
+        image = Image.open(io.BytesIO(image))
+    image.thumbnail((options['thumbnail_size'], options['thumbnail_size']), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG', quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+def ocr(image_bytes, options):
+    """Text of an image with the tesseract binary, '' when it is not installed."""
+    if not image_bytes or not options['ocr_languages'] or shutil.which('tesseract') is None:
+        return ''
+    completed = subprocess.run(
+        ['tesseract', 'stdin', 'stdout', '-l', options['ocr_languages']],
+        input=image_bytes, capture_output=True, timeout=120,
+    )
+    return completed.stdout.decode('utf-8', 'replace').strip() if completed.returncode == 0 else ''
+
+
+# --- Process pool (job worker side) ---
+class DocumentProcessPool:
+    """
+    Runs analyze() in DOCUMENT_PROCESS_WORKERS processes (default: one per
+    core), so that parsing, rendering and OCR scale past the GIL and never
+    run in a web worker. Children are spawned, not forked from a process
+    holding threads and DB connections, and replaced every
+    DOCUMENT_PROCESS_MAX_TASKS files to bound PDF library memory growth.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self.completed = self.failed = 0
+        self.process_seconds = 0.0
+
+    @property
+    def size(self):
+        return settings.DOCUMENT_PROCESS_WORKERS or os.cpu_count() or 1
+
+    def get_pool(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pool = ProcessPoolExecutor(
+                    self.size,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    max_tasks_per_child=settings.DOCUMENT_PROCESS_MAX_TASKS,
+                )
+            return self._pool
+
+    def run(self, path, mime_type):
+        options = {
+            'thumbnail_size': settings.DOCUMENT_THUMBNAIL_SIZE,
+            'text_max_chars': settings.DOCUMENT_TEXT_MAX_CHARS,
+            'ocr_languages': settings.DOCUMENT_OCR_LANGUAGES,
+            'ocr_max_pages': settings.DOCUMENT_OCR_MAX_PAGES,
+        }
+        pool = self.get_pool()
+        try:
+            result = pool.submit(analyze, path, mime_type, options).result(timeout=settings.DOCUMENT_PROCESS_TIMEOUT)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                if isinstance(e, (BrokenProcessPool, TimeoutError)) and self._pool is pool:
+                    # A child died (crash on a malformed file, OOM kill) or hangs: a new pool for the next files
+                    self._pool = None
+            if isinstance(e, TimeoutError):
+                self.terminate(pool)
+            raise
+        with self._lock:
+            self.completed += 1
+            self.process_seconds += result['seconds']
+        return result
+
+    @staticmethod
+    def terminate(pool):
+        """
+        Kills the processes of a pool: a hung child would otherwise keep its
+        slot forever. Files other threads were analyzing in it fail with
+        BrokenProcessPool and their jobs are retried.
+        """
+        processes = list((pool._processes or {}).values())  # no public API before Python 3.14
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=5)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'completed': self.completed,
+                'failed': self.failed,
+                'processSecondsTotal': round(self.process_seconds, 6),
+            }
+
+
+document_pool = DocumentProcessPool()
@@ -0,0 +1,78 @@
+# /home/siisi/praevia_gemini/praevia_api/references.py
+
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import ReferenceCounter
+
+
+class ReferenceAllocator:
+    """
+    Collision-free references such as DAT-00000042.
+
+    Each worker reserves a block of numbers with a single counter UPDATE and
+    hands them out from memory, so most creates cost no extra round trip.
+    Numbers left in a block when a worker stops are skipped, never reused.
+    """
+
+    def __init__(self, prefix, block_size=None):
+        self.prefix = prefix
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._next = self._end = 0
+
+    def format(self, number):
+        return f"{self.prefix}-{number:08d}"
+
+    def reserve(self, size):
+        """Claims [start, end) in reference_counters and commits it."""
+        with transaction.atomic():
+            counter = ReferenceCounter.objects.filter(prefix=self.prefix)
+            # UPDATE first: the row stays locked until the reservation commits
+            if not counter.update(next_value=F('next_value') + size):
+                ReferenceCounter.objects.get_or_create(prefix=self.prefix)
+                counter.update(next_value=F('next_value') + size)
+            end = counter.values_list('next_value', flat=True).get()
+        return end - size, end
+
+    def reset(self):
+        """Drops this process's block: the next allocate() reserves from the counter again."""
+        with self._lock:
+            self._next = self._end = 0
+
+    def allocate(self, count=1):
+        if transaction.get_connection().in_atomic_block:
+            # A rollback would also undo the reservation: never cache such a block
+            start, end = self.reserve(count)
+            return [self.format(number) for number in range(start, end)]
+
+        numbers = []
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: the parent's block belongs to the parent
+                self._pid, self._next, self._end = os.getpid(), 0, 0
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    block_size = self.block_size or settings.REFERENCE_BLOCK_SIZE
+                    self._next, self._end = self.reserve(max(block_size, count - len(numbers)))
+                taken = min(count - len(numbers), self._end - self._next)
+                numbers.extend(range(self._next, self._next + taken))
+                self._next += taken
+        return [self.format(number) for number in numbers]
+
+
+dossier_references = ReferenceAllocator('DAT')
+contentieux_references = ReferenceAllocator('CONT')
+
+
+def next_dossier_reference():
+    return dossier_references.allocate()[0]
+
+
+def next_contentieux_reference():
+    return contentieux_references.allocate()[0]
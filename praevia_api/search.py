@@ -0,0 +1,218 @@
+# /home/siisi/praevia_gemini/praevia_api/search.py
+
+import logging
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Contentieux, Document, DossierATMP, SearchEntry, SearchEntryKind
+
+logger = logging.getLogger(__name__)
+
+ENTRY_FIELDS = ['dossier_atmp', 'reference', 'names', 'body', 'updated_at']
+HIGHLIGHT_START, HIGHLIGHT_STOP = '<mark>', '</mark>'
+# Subject plus document texts: bounded well under the PostgreSQL tsvector size limit (1MB)
+BODY_MAX_CHARS = 200_000
+
+# PostgreSQL: websearch syntax ("phrase", -exclu, or) on the tsvector, word
+# trigram similarity on names so that "Dupond" still finds Dupont
+POSTGRES_SEARCH = f"""
+    SELECT hit.*, ts_headline('french', entry.body, hit.query,
+                              'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=25, MinWords=8') AS highlight
+    FROM (
+        SELECT e.id, e.kind, e.object_id, e.dossier_atmp_id, e.reference, e.names, query,
+               ts_rank_cd(e.document, query) + word_similarity(%(q)s, e.names) AS rank
+        FROM search_entries e, websearch_to_tsquery('french', %(q)s) query
+        WHERE (e.document @@ query OR %(q)s <%% e.names) {{kind_filter}}
+        ORDER BY rank DESC, e.id DESC
+        LIMIT %(limit)s OFFSET %(offset)s
+    ) hit
+    JOIN search_entries entry ON entry.id = hit.id
+    ORDER BY hit.rank DESC, hit.id DESC
+"""
+
+# SQLite: FTS5 bm25 (lower is better), names weigh more than the body
+SQLITE_SEARCH = f"""
+    SELECT e.id, e.kind, e.object_id, e.dossier_atmp_id, e.reference, e.names,
+           -bm25(search_entries_fts, 10.0, 5.0, 1.0) AS rank,
+           snippet(search_entries_fts, 2, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '…', 16) AS highlight
+    FROM search_entries_fts JOIN search_entries e ON e.id = search_entries_fts.rowid
+    WHERE search_entries_fts MATCH %s {{kind_filter}}
+    ORDER BY bm25(search_entries_fts, 10.0, 5.0, 1.0), e.id DESC
+    LIMIT %s OFFSET %s
+"""
+
+
+# --- Indexed text ---
+def json_text(value):
+    """Every string of a JSON value, in order."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, list):
+        return []
+    return [text for item in value for text in json_text(item)]
+
+
+def dossier_names(salarie, entreprise):
+    salarie = salarie if isinstance(salarie, dict) else {}
+    entreprise = entreprise if isinstance(entreprise, dict) else {}
+    parts = (salarie.get('prenom'), salarie.get('nom'), entreprise.get('raisonSociale'))
+    return ' '.join(str(part) for part in parts if part)
+
+
+def dossier_body(accident):
+    accident = accident if isinstance(accident, dict) else {}
+    return '\n'.join(str(accident[key]) for key in ('circonstances', 'descriptionLesions') if accident.get(key))
+
+
+def dossier_entry(pk, reference, salarie, entreprise, accident):
+    return SearchEntry(
+        kind=SearchEntryKind.DOSSIER.value, object_id=pk, dossier_atmp_id=pk, reference=reference,
+        names=dossier_names(salarie, entreprise), body=dossier_body(accident),
+    )
+
+
+def contentieux_entry(pk, dossier_id, reference, subject, salarie, entreprise, document_texts=()):
+    # Text extracted from its documents (processing.py) makes a contentieux findable by their content
+    body = '\n'.join([*json_text(subject), *document_texts])
+    return SearchEntry(
+        kind=SearchEntryKind.CONTENTIEUX.value, object_id=pk, dossier_atmp_id=dossier_id, reference=reference,
+        names=dossier_names(salarie, entreprise), body=body[:BODY_MAX_CHARS],
+    )
+
+
+def document_texts(contentieux_ids):
+    texts = {}
+    documents = Document.objects.filter(contentieux_id__in=contentieux_ids).exclude(text='').order_by('pk')
+    for contentieux_id, text in documents.values_list('contentieux_id', 'text'):
+        texts.setdefault(contentieux_id, []).append(text)
+    return texts
+
+
+def build_entries(batch_size):
+    """Batches of entries for every dossier and contentieux."""
+    dossiers = DossierATMP.objects.order_by('pk').values_list('pk', 'reference', 'salarie', 'entreprise', 'accident')
+    batch = []
+    for row in dossiers.iterator(chunk_size=batch_size):
+        batch.append(dossier_entry(*row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+    contentieux = Contentieux.objects.order_by('pk').values_list(
+        'pk', 'dossier_atmp_id', 'reference', 'subject', 'dossier_atmp__salarie', 'dossier_atmp__entreprise'
+    )
+    rows = []
+    for row in contentieux.iterator(chunk_size=batch_size):
+        rows.append(row)
+        if len(rows) >= batch_size:
+            yield contentieux_entries(rows)
+            rows = []
+    if rows:
+        yield contentieux_entries(rows)
+
+
+def contentieux_entries(rows):
+    texts = document_texts([row[0] for row in rows])
+    return [contentieux_entry(*row, texts.get(row[0], ())) for row in rows]
+
+
+def fts5_query(text):
+    """User text as an FTS5 expression: every word required, as a prefix ("dupo" finds Dupont)."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+
+
+# --- Index maintenance and queries ---
+class SearchService:
+    batch_size = 2000
+
+    @classmethod
+    def upsert(cls, entries):
+        # One INSERT ... ON CONFLICT: the tsvector column / FTS5 triggers follow
+        SearchEntry.objects.bulk_create(
+            entries, batch_size=cls.batch_size,
+            update_conflicts=True, unique_fields=['kind', 'object_id'], update_fields=ENTRY_FIELDS,
+        )
+
+    @classmethod
+    def index_dossiers(cls, dossiers):
+        cls.upsert([
+            dossier_entry(d.pk, d.reference, d.salarie, d.entreprise, d.accident) for d in dossiers
+        ])
+
+    @staticmethod
+    def refresh_contentieux_names(dossier):
+        # A contentieux is found by the names of its dossier too
+        names = dossier_names(dossier.salarie, dossier.entreprise)
+        SearchEntry.objects.filter(
+            kind=SearchEntryKind.CONTENTIEUX.value, dossier_atmp_id=dossier.pk
+        ).exclude(names=names).update(names=names)
+
+    @classmethod
+    def index_contentieux(cls, contentieux):
+        if Contentieux.dossier_atmp.is_cached(contentieux):
+            dossier = contentieux.dossier_atmp
+        else:
+            dossier = DossierATMP.objects.only('salarie', 'entreprise').get(pk=contentieux.dossier_atmp_id)
+        texts = document_texts([contentieux.pk]).get(contentieux.pk, ())
+        cls.upsert([contentieux_entry(
+            contentieux.pk, contentieux.dossier_atmp_id, contentieux.reference, contentieux.subject,
+            dossier.salarie, dossier.entreprise, texts,
+        )])
+
+    @staticmethod
+    def remove_contentieux(pk):
+        SearchEntry.objects.filter(kind=SearchEntryKind.CONTENTIEUX.value, object_id=pk).delete()
+
+    @classmethod
+    def rebuild(cls):
+        """Re-creates every entry (after raw SQL, COPY seeding...), returns how many were written."""
+        written = 0
+        with transaction.atomic():
+            SearchEntry.objects.all().delete()
+            for batch in build_entries(cls.batch_size):
+                SearchEntry.objects.bulk_create(batch, batch_size=cls.batch_size)
+                written += len(batch)
+        logger.info(f"Index de recherche reconstruit: {written} entrées")
+        return written
+
+    @classmethod
+    def search(cls, text, kind=None, limit=10, offset=0):
+        """Ranked hits: dicts with kind, object_id, dossier_atmp_id, reference, names, rank, highlight."""
+        if connection.vendor == 'postgresql':
+            sql = POSTGRES_SEARCH.format(kind_filter='AND e.kind = %(kind)s' if kind else '')
+            params = {'q': text, 'kind': kind, 'limit': limit, 'offset': offset}
+        elif connection.vendor == 'sqlite':
+            match = fts5_query(text)
+            if not match:
+                return []
+            sql = SQLITE_SEARCH.format(kind_filter='AND e.kind = %s' if kind else '')
+            params = [match, *([kind] if kind else []), limit, offset]
+        else:
+            return cls.search_unindexed(text, kind, limit, offset)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [
+                {key: value for key, value in zip(columns, row) if key != 'query'}
+                for row in cursor.fetchall()
+            ]
+
+    @staticmethod
+    def search_unindexed(text, kind, limit, offset):
+        """Other databases: every word in the names or body, newest first."""
+        entries = SearchEntry.objects.order_by('-id')
+        if kind:
+            entries = entries.filter(kind=kind)
+        for word in re.findall(r'\w+', text):
+            entries = entries.filter(Q(names__icontains=word) | Q(body__icontains=word) | Q(reference__icontains=word))
+        return [
+            {**row, 'rank': None, 'highlight': None}
+            for row in entries.values('id', 'kind', 'object_id', 'dossier_atmp_id', 'reference', 'names')[offset:offset + limit]
+        ]
@@ -0,0 +1,368 @@
+# /home/siisi/praevia_gemini/praevia_api/seeding.py
+
+import io
+import json
+import random
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+
+from .models import (
+    Audit, AuditDecision, AuditStatus, Contentieux, ContentieuxStatus, Document, DocumentProcessingStatus, DocumentType,
+    DossierATMP, DossierStatus, JuridictionType
+)
+from .references import contentieux_references, dossier_references
+
+# ─── Reference data ───────────────────────────────────────────────
+NOMS = [
+    'Martin', 'Bernard', 'Thomas', 'Petit', 'Robert', 'Richard', 'Durand', 'Dubois', 'Moreau', 'Laurent',
+    'Simon', 'Michel', 'Lefebvre', 'Leroy', 'Roux', 'David', 'Bertrand', 'Morel', 'Fournier', 'Girard',
+    'Bonnet', 'Dupont', 'Lambert', 'Fontaine', 'Rousseau', 'Vincent', 'Muller', 'Faure', 'André', 'Mercier',
+    'Blanc', 'Guérin', 'Boyer', 'Garnier', 'Chevalier', 'François', 'Legrand', 'Gauthier', 'Garcia', 'Perrin',
+]
+PRENOMS = {
+    1: ['Jean', 'Pierre', 'Michel', 'Nicolas', 'Julien', 'Thomas', 'Mehdi', 'Karim', 'Sébastien', 'Antoine', 'Lucas', 'Hugo'],
+    2: ['Marie', 'Nathalie', 'Isabelle', 'Sophie', 'Camille', 'Élodie', 'Fatima', 'Laura', 'Émilie', 'Chloé', 'Inès', 'Julie'],
+}
+# (commune, code postal, code INSEE de la commune)
+VILLES = [
+    ('Paris', '75011', '75111'), ('Lyon', '69003', '69383'), ('Marseille', '13005', '13205'),
+    ('Toulouse', '31000', '31555'), ('Nantes', '44000', '44109'), ('Lille', '59000', '59350'),
+    ('Bordeaux', '33000', '33063'), ('Strasbourg', '67000', '67482'), ('Rennes', '35000', '35238'),
+    ('Montpellier', '34000', '34172'), ('Grenoble', '38000', '38185'), ('Rouen', '76000', '76540'),
+    ('Dijon', '21000', '21231'), ('Clermont-Ferrand', '63000', '63113'), ('Reims', '51100', '51454'),
+    ('Saint-Étienne', '42000', '42218'), ('Angers', '49000', '49007'), ('Metz', '57000', '57463'),
+]
+RUES = [
+    'rue de la République', 'avenue Jean Jaurès', 'boulevard Victor Hugo', 'rue Pasteur', 'rue du Général de Gaulle',
+    'place de la Mairie', 'rue des Lilas', 'chemin des Vignes', 'rue de la Gare', 'allée des Tilleuls',
+]
+# (code NAF, activité, forme juridique)
+ACTIVITES = [
+    ('4321A', 'Installations électriques', 'SARL'), ('4941A', 'Transports', 'SAS'), ('8610Z', 'Clinique', 'SA'),
+    ('4711D', 'Distribution', 'SAS'), ('1011Z', 'Abattoirs', 'SA'), ('4399C', 'Maçonnerie', 'SARL'),
+    ('5610A', 'Restauration', 'SARL'), ('8810A', 'Aide à domicile', 'Association'), ('2562B', 'Mécanique', 'SAS'),
+    ('5210B', 'Logistique', 'SAS'),
+]
+POSTES = [
+    'Cariste', 'Préparateur de commandes', 'Aide-soignante', 'Maçon', 'Électricien', 'Chauffeur poids lourd',
+    "Agent d'entretien", 'Opérateur de production', 'Hôtesse de caisse', 'Cuisinier', 'Magasinier',
+    'Technicien de maintenance',
+]
+CIRCONSTANCES = {
+    'AT': [
+        'Chute de plain-pied sur un sol glissant', "Chute de hauteur depuis un escabeau",
+        "Manutention manuelle d'une charge lourde", 'Heurt par un chariot élévateur',
+        "Coupure lors de l'utilisation d'un cutter", "Projection d'un produit chimique",
+        "Écrasement de la main dans une presse", "Chute d'une palette lors du déchargement",
+    ],
+    'MP': [
+        'Tableau 57 - Affections périarticulaires (épaule)', 'Tableau 98 - Lombalgies (manutention de charges lourdes)',
+        'Tableau 42 - Surdité provoquée par les bruits lésionnels', 'Tableau 30 - Affections liées à l\'amiante',
+    ],
+    'TRAJET': ['Accident de trajet domicile-travail', 'Collision lors du trajet vers le lieu de travail'],
+}
+LESIONS = [
+    'Entorse de la cheville', 'Fracture du poignet', 'Lombalgie aiguë', 'Contusion du genou', 'Plaie de la main gauche',
+    "Brûlure de l'avant-bras", "Tendinopathie de l'épaule droite", 'Traumatisme crânien léger',
+]
+LIEUX = ['Atelier', 'Entrepôt', 'Quai de chargement', 'Chantier', 'Bureau', 'Parking', 'Voie publique', 'Cuisine']
+CHECKLIST = [
+    'Déclaration reçue dans les délais', 'Certificat médical initial cohérent', 'Témoins identifiés',
+    'Réserves motivées émises', 'Horaires de travail vérifiés',
+]
+CASE_TYPES = [('AT', 75), ('MP', 15), ('TRAJET', 10)]  # accident['type'], weight
+
+
+# ─── Identifiers ──────────────────────────────────────────────────
+def luhn_complete(digits):
+    """`digits` + the Luhn check digit (SIREN/SIRET)."""
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        value = int(digit) * (2 if i % 2 == 0 else 1)
+        total += value - 9 if value > 9 else value
+    return digits + str((10 - total % 10) % 10)
+
+
+def numero_secu(rng, sexe, birth, insee):
+    """NIR: sexe, année, mois, département + commune of birth, rang, clé (97 - n mod 97)."""
+    nir = f"{sexe}{birth:%y%m}{insee}{rng.randint(1, 999):03d}"
+    return f"{nir}{97 - int(nir) % 97:02d}"
+
+
+@lru_cache(maxsize=None)
+def entreprise(seed, number):
+    """Employer `number`: dossiers pick among a pool of employers, as in production."""
+    rng = random.Random(f"{seed}:entreprise:{number}")
+    code_naf, activite, forme = rng.choice(ACTIVITES)
+    ville, code_postal, _ = rng.choice(VILLES)
+    siren = luhn_complete(f"{rng.randint(10_000_000, 99_999_999)}")
+    return {
+        'siret': luhn_complete(f"{siren}{rng.randint(1, 9999):04d}"),
+        'raisonSociale': f"{activite} {rng.choice(NOMS)} {forme}",
+        'adresse': f"{rng.randint(1, 150)} {rng.choice(RUES)}, {code_postal} {ville}",
+        'numeroRisque': f"{rng.randint(100, 999)}{rng.choice('ABCDEFGH')}{rng.choice('ABCDEFGH')}",
+        'codeNaf': code_naf,
+        'effectif': rng.choice([12, 35, 80, 150, 420, 1200]),
+    }
+
+
+# ─── Row generation ───────────────────────────────────────────────
+class DossierGenerator:
+    """
+    Everything seeded for dossier `number` (its contentieux, audit and
+    documents included) comes from a random.Random seeded with (seed,
+    number): the data set depends on the options only, not on the batch
+    size, the order of the chunks or the number of processes.
+    Primary keys are derived from the number too, so chunks never need to
+    read back ids and can be inserted in parallel.
+    """
+
+    def __init__(self, seed, end, audits_ratio, contentieux_ratio, documents_per_contentieux, creators, auditors,
+                 employers):
+        self.seed = seed
+        self.end = end
+        self.audits_ratio = audits_ratio
+        self.contentieux_ratio = contentieux_ratio
+        self.documents_per_contentieux = documents_per_contentieux
+        self.creators = creators
+        self.auditors = auditors
+        self.employers = employers
+
+    def datetime_between(self, rng, start, days):
+        moment = start + timedelta(days=rng.uniform(0, days))
+        return min(moment, self.end)
+
+    def chunk(self, first, last):
+        """Rows per table for dossiers first..last (inclusive), as {model or through model: [row dicts]}."""
+        rows = {
+            DossierATMP: [], Contentieux: [], Audit: [], Document: [],
+            DossierATMP.documents.through: [], Contentieux.documents.through: [],
+        }
+        for number in range(first, last + 1):
+            self.dossier(number, rows)
+        return rows
+
+    def dossier(self, number, rows):
+        rng = random.Random(self.seed * 1_000_003 + number)
+        case_type = rng.choices([t for t, _ in CASE_TYPES], weights=[w for _, w in CASE_TYPES])[0]
+        accident_at = self.end - timedelta(days=rng.uniform(5, 3 * 365), minutes=rng.randint(0, 24 * 60))
+        created_at = self.datetime_between(rng, accident_at, 10)
+
+        sexe = rng.choice((1, 2))
+        birth = datetime(rng.randint(1960, 2004), rng.randint(1, 12), rng.randint(1, 28))
+        ville, code_postal, insee = rng.choice(VILLES)
+        nom, prenom = rng.choice(NOMS), rng.choice(PRENOMS[sexe])
+        witnesses = [
+            {'nom': f"{rng.choice(PRENOMS[rng.choice((1, 2))])} {rng.choice(NOMS)}",
+             'coordonnees': f"06 {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}"}
+            for _ in range(rng.choice((0, 0, 1, 2)) if case_type != 'MP' else 0)
+        ]
+
+        has_audit = rng.random() < self.audits_ratio
+        has_contentieux = has_audit and rng.random() < self.contentieux_ratio / max(self.audits_ratio, 1e-9)
+        audit_status = rng.choices(
+            [AuditStatus.NOT_STARTED, AuditStatus.IN_PROGRESS, AuditStatus.COMPLETED], weights=[15, 35, 50]
+        )[0] if has_audit else None
+        if has_contentieux:
+            audit_status = AuditStatus.COMPLETED
+            decision = AuditDecision.CONTEST
+            status = DossierStatus.TRANSFORME_EN_CONTENTIEUX
+        elif audit_status == AuditStatus.COMPLETED:
+            decision = rng.choice([AuditDecision.DO_NOT_CONTEST, AuditDecision.NEED_MORE_INFO, AuditDecision.REFER_TO_EXPERT])
+            status = rng.choice([
+                DossierStatus.CONTESTATION_NON_RECOMMANDEE, DossierStatus.CLOTURE_SANS_SUITE,
+                DossierStatus.CONTESTATION_RECOMMANDEE,
+            ])
+        else:
+            decision = None
+            status = DossierStatus.ANALYSE_EN_COURS if has_audit else DossierStatus.A_ANALYSER
+
+        updated_at = self.datetime_between(rng, created_at, 60)
+        rows[DossierATMP].append({
+            'id': number,
+            'reference': dossier_references.format(number),
+            'status': status.value,
+            'created_by_id': rng.choice(self.creators),
+            'entreprise': entreprise(self.seed, rng.randrange(self.employers)),
+            'salarie': {
+                'nom': nom,
+                'prenom': prenom,
+                'dateNaissance': birth.date().isoformat(),
+                'numeroSecu': numero_secu(rng, sexe, birth, insee),
+                'adresse': f"{rng.randint(1, 150)} {rng.choice(RUES)}, {code_postal} {ville}",
+                'horairesTravail': rng.choice(['8h-16h', '9h-17h', '6h-14h', '14h-22h', '22h-6h']),
+                'poste': rng.choice(POSTES),
+                'anciennete': round(rng.uniform(0.2, 25), 1),
+            },
+            'accident': {
+                'type': case_type,
+                'date': accident_at.replace(tzinfo=None).isoformat(timespec='seconds'),
+                'heure': accident_at.strftime('%H:%M'),
+                'lieu': 'Trajet' if case_type == 'TRAJET' else rng.choice(LIEUX),
+                'circonstances': rng.choice(CIRCONSTANCES[case_type]),
+                'descriptionLesions': rng.choice(LESIONS),
+                'arretTravail': rng.random() < 0.7,
+                'joursArret': rng.choice([0, 3, 7, 15, 21, 45, 90]),
+            },
+            'temoins': witnesses,
+            'tiers_implique': (
+                {'nom': f"{rng.choice(NOMS)} {rng.choice(PRENOMS[1])}", 'assurance': rng.choice(['AXA', 'MAIF', 'Allianz'])}
+                if case_type == 'TRAJET' and rng.random() < 0.5 else None
+            ),
+            'service_sante': f"Service de prévention et de santé au travail de {ville}",
+            'created_at': created_at,
+            'updated_at': updated_at,
+        })
+
+        if has_audit:
+            started_at = self.datetime_between(rng, created_at, 15)
+            rows[Audit].append({
+                'id': number,
+                'dossier_atmp_id': number,
+                'auditor_id': rng.choice(self.auditors) if self.auditors else None,
+                'status': audit_status.value,
+                'decision': decision.value if decision else None,
+                'comments': f"Analyse du dossier {dossier_references.format(number)}." if audit_status != AuditStatus.NOT_STARTED else None,
+                'checklist': [
+                    {'item': item, 'checked': audit_status == AuditStatus.COMPLETED or rng.random() < 0.5}
+                    for item in rng.sample(CHECKLIST, rng.randint(2, len(CHECKLIST)))
+                ] if audit_status != AuditStatus.NOT_STARTED else [],
+                'started_at': started_at if audit_status != AuditStatus.NOT_STARTED else None,
+                'completed_at': self.datetime_between(rng, started_at, 30) if audit_status == AuditStatus.COMPLETED else None,
+                'created_at': created_at,
+                'updated_at': updated_at,
+            })
+
+        if has_contentieux:
+            self.contentieux(rng, number, created_at, nom, rows)
+
+    def contentieux(self, rng, number, dossier_created_at, nom, rows):
+        created_at = self.datetime_between(rng, dossier_created_at, 45)
+        steps = {}
+        for juridiction in (JuridictionType.TRIBUNAL_JUDICIAIRE, JuridictionType.COUR_APPEL, JuridictionType.COUR_CASSATION):
+            if rng.random() > (0.5 if not steps else 0.3):
+                break
+            steps[juridiction.value] = {
+                'dateSaisine': self.datetime_between(rng, created_at, 365).date().isoformat(),
+                'numeroRG': f"{created_at:%y}/{rng.randint(1, 99999):05d}",
+            }
+        reference = contentieux_references.format(number)
+        rows[Contentieux].append({
+            'id': number,
+            'dossier_atmp_id': number,
+            'reference': reference,
+            'subject': {
+                'title': f"Contentieux pour dossier {dossier_references.format(number)}",
+                'description': f"Contestation du caractère professionnel ({nom}).",
+            },
+            'status': ContentieuxStatus.DRAFT.value,
+            'juridiction_steps': steps,
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+
+        for j in range(self.documents_per_contentieux):
+            document_id = (number - 1) * self.documents_per_contentieux + j + 1
+            document_type = rng.choice(list(DocumentType))
+            uploaded_at = self.datetime_between(rng, created_at, 60)
+            rows[Document].append({
+                'id': document_id,
+                'contentieux_id': number,
+                'uploaded_by_id': rng.choice(self.creators),
+                'document_type': document_type.value,
+                'original_name': f"{document_type.value.lower()}_{nom.lower()}_{j + 1}.pdf",
+                'file': None,  # metadata only, like the fixture documents
+                'sha256': '',
+                'mime_type': 'application/pdf',
+                'size': rng.randint(30_000, 2_000_000),
+                'processing_status': DocumentProcessingStatus.PENDING.value,
+                'text': '',
+                'created_at': uploaded_at,
+                'updated_at': uploaded_at,
+            })
+            rows[Contentieux.documents.through].append({'contentieux_id': number, 'document_id': document_id})
+            rows[DossierATMP.documents.through].append({'dossieratmp_id': number, 'document_id': document_id})
+
+
+# ─── Insertion ────────────────────────────────────────────────────
+def copy_value(value):
+    """A value in PostgreSQL's COPY text format."""
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+PLAIN_FIELDS = (models.CharField, models.TextField, models.IntegerField, models.ForeignKey)
+
+
+def insert_rows(model, rows, use_copy=True):
+    """
+    Inserts row dicts as they are, with COPY on PostgreSQL and batched
+    executemany() elsewhere. Unlike bulk_create() no model instances are
+    built and auto_now/auto_now_add values are kept.
+    """
+    if not rows:
+        return
+    wrapper = connections[DEFAULT_DB_ALIAS]  # the proxy costs a thread-local lookup per attribute
+    fields = [model._meta.get_field(name) for name in rows[0]]
+    columns = [field.column for field in fields]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if use_copy and connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(copy_value(value) for value in row.values()))
+                buffer.write('\n')
+            buffer.seek(0)
+            quoted = ', '.join(connection.ops.quote_name(column) for column in columns)
+            cursor.copy_expert(f"COPY {table} ({quoted}) FROM STDIN", buffer)
+            return
+        sql = (
+            f"INSERT INTO {table} ({', '.join(connection.ops.quote_name(column) for column in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        )
+        # Strings and integers go to the driver as they are; JSON, datetimes... need the field's adaptation
+        adapted = [i for i, field in enumerate(fields) if not isinstance(field, PLAIN_FIELDS)]
+        params = []
+        for row in rows:
+            values = list(row.values())
+            for i in adapted:
+                values[i] = fields[i].get_db_prep_save(values[i], wrapper)
+            params.append(values)
+        cursor.executemany(sql, params)
+
+
+def seed_chunk(generator, first, last, use_copy=True):
+    """Generates and inserts dossiers first..last with their related rows, in one transaction."""
+    rows = generator.chunk(first, last)
+    with transaction.atomic():
+        for model, model_rows in rows.items():
+            insert_rows(model, model_rows, use_copy)
+    return {model._meta.db_table: len(model_rows) for model, model_rows in rows.items()}
+
+
+def day_end(date):
+    return datetime.combine(date, time(23, 59, 59), tzinfo=dt_timezone.utc)
+
+
+# Seeded tables with explicit primary keys: their sequences must be moved past them (PostgreSQL)
+SEEDED_MODELS = [DossierATMP, Contentieux, Audit, Document]
+
+
+def reset_sequences():
+    statements = connection.ops.sequence_reset_sql(no_style(), SEEDED_MODELS)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
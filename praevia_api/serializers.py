@@ -2,9 +2,10 @@
 
 import bcrypt
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from django import forms 
 from .models import (
-    User, Audit, Contentieux, Document, DossierATMP, Action,
+    User, Audit, Contentieux, Document, DossierATMP, Action, Job,
     AuditDecision, AuditStatus, ContentieuxStatus, JuridictionType,
     DocumentType, DossierStatus, UserRole
 )
@@ -34,6 +35,25 @@ class TiersSerializer(serializers.Serializer):
     assurance = serializers.CharField(max_length=255, required=False, allow_blank=True)
     immatriculation = serializers.CharField(max_length=255, required=False, allow_blank=True)
 
+# --- Related fields ---
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves ids from context['prefetched'][Model]
+    ({str(pk): instance}) when the caller loaded them up front with one IN
+    query, instead of running one query per value. Falls back to the queryset.
+    """
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched', {}).get(self.get_queryset().model)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool) or not isinstance(data, (str, int)):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return prefetched[str(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
 # --- Main Model Serializers ---
 class DocumentSerializer(serializers.ModelSerializer):
     # For ForeignKey fields, use PrimaryKeyRelatedField to represent by ID
@@ -43,10 +63,18 @@ class DocumentSerializer(serializers.ModelSerializer):
     # For FileField, Django REST Framework handles file uploads automatically
     # The 'file' field will be handled by MultiPartParser in views
 
+    # Served by DocumentThumbnailView (MEDIA_ROOT is not public)
+    thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = Document
-        fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        exclude = ['text']  # up to DOCUMENT_TEXT_MAX_CHARS: searchable through /search/, not sent with every document
+        read_only_fields = ['id', 'sha256', 'processing_status', 'page_count', 'processed_at', 'created_at', 'updated_at']
+
+    def get_thumbnail(self, document):
+        if not document.thumbnail:
+            return None
+        return reverse('praevia_api:document_thumbnail', args=[document.pk], request=self.context.get('request'))
 
 class ContentieuxSerializer(serializers.ModelSerializer):
     dossier_atmp = serializers.PrimaryKeyRelatedField(queryset=DossierATMP.objects.all())
@@ -66,7 +94,7 @@ class ContentieuxSerializer(serializers.ModelSerializer):
 
         
 class DossierATMPSerializer(serializers.ModelSerializer):
-    created_by = serializers.PrimaryKeyRelatedField(
+    created_by = PrefetchedPrimaryKeyRelatedField(
         queryset=User.objects.all(),
         style={'input_type': 'select'}
     )
@@ -80,7 +108,7 @@ class DossierATMPSerializer(serializers.ModelSerializer):
         }
     )
     
-    documents = serializers.PrimaryKeyRelatedField(
+    documents = PrefetchedPrimaryKeyRelatedField(
         many=True,
         queryset=Document.objects.all(),
         required=False,
@@ -92,7 +120,8 @@ class DossierATMPSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = DossierATMP
-        fields = '__all__'
+        # Generated filter columns duplicate the JSON payload, keep them out of the API
+        exclude = ['entreprise_siret', 'salarie_numero_secu', 'accident_date', 'accident_lieu']
         read_only_fields = ['id', 'reference', 'created_at', 'updated_at']
 
 
@@ -113,4 +142,32 @@ class ActionSerializer(serializers.ModelSerializer):
         model = Action
         fields = '__all__'
         read_only_fields = ['id', 'created_at', 'updated_at']
-        
\ No newline at end of file
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'result', 'last_error', 'created_at', 'updated_at', 'finished_at']
+        read_only_fields = fields
+        
+
+
+# --- Compact list representations (what the grids display) ---
+class DocumentListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Document
+        fields = ['id', 'original_name', 'document_type', 'mime_type', 'size', 'contentieux', 'created_at']
+
+class ContentieuxListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Contentieux
+        fields = ['id', 'reference', 'status', 'dossier_atmp', 'created_at', 'updated_at']
+
+class DossierATMPListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DossierATMP
+        fields = ['id', 'reference', 'status', 'created_by', 'created_at', 'updated_at']
+
+class AuditListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Audit
+        fields = ['id', 'dossier_atmp', 'auditor', 'status', 'decision', 'created_at', 'updated_at']
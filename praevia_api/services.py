@@ -1,9 +1,27 @@
 # /home/siisi/praevia_gemini/praevia_api/services.py
 
-from.models import Audit, DossierATMP, Contentieux, ContentieuxStatus
+from.models import (
+    Audit, AuditStatus, Blob, DossierATMP, DossierAggregate, DossierStatus,
+    Contentieux, ContentieuxStatus, Document, DocumentProcessingStatus, JuridictionType, User
+)
+from.serializers import ContentieuxSerializer, DossierATMPSerializer
+from.prefetch import eager_load
+from.caching import model_tag, response_cache
+from.references import dossier_references, next_contentieux_reference
+from.search import SearchService
+from.processing import document_pool
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from datetime import datetime
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, Q, TextField, Value, When
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import timedelta
 import logging
+from concurrent.futures.process import BrokenProcessPool
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +31,7 @@ class ContentieuxService:
         # Implement pagination/filtering based on query_params if needed
         # For now, a simple find all
         contentieux = Contentieux.objects.all().order_by('-created_at')
-        return list(contentieux)
+        return list(eager_load(contentieux, ContentieuxSerializer()))
 
     @staticmethod
     def get_contentieux_by_id(contentieux_id):
@@ -29,8 +47,8 @@ class ContentieuxService:
         Creates a new Contentieux dossier based on a finalized Audit.
         """
         try:
-            # Generate a simple reference for the contentieux
-            reference = f"CONT-{int(datetime.now().timestamp())}"
+            # Collision-free reference, see references.py
+            reference = next_contentieux_reference()
 
             new_contentieux = Contentieux(
                 dossier_atmp=dossier, # Link to the DossierATMP instance
@@ -56,3 +74,379 @@ class ContentieuxService:
         except Exception as e:
             logger.error(f"Error creating contentieux from audit: {e}")
             raise
+
+
+class DashboardAggregateService:
+    """
+    Reads and maintains the DossierAggregate counters behind the direction
+    dashboard. Deltas are applied by signals.py on every DossierATMP
+    save/delete; rebuild() recomputes everything from dossiers_atmp.
+    """
+    ESTIMATED_RISK_PER_CASE = 5000
+
+    @staticmethod
+    def apply_delta(bucket, delta):
+        status, case_type = bucket
+        counters = DossierAggregate.objects.filter(status=status, case_type=case_type)
+        if not counters.update(count=F('count') + delta):
+            DossierAggregate.objects.get_or_create(status=status, case_type=case_type)
+            counters.update(count=F('count') + delta)
+
+    @staticmethod
+    def compute_buckets():
+        """Counts per (status, case type), straight from dossiers_atmp."""
+        rows = (
+            DossierATMP.objects.order_by()
+            .values('status', bucket_case_type=Coalesce(KT('accident__type'), Value(''), output_field=TextField()))
+            .annotate(total=Count('id'))
+        )
+        return {(row['status'], str(row['bucket_case_type'])): row['total'] for row in rows}
+
+    @staticmethod
+    def stored_buckets():
+        return {
+            (status, case_type): count
+            for status, case_type, count in DossierAggregate.objects.values_list('status', 'case_type', 'count')
+        }
+
+    @staticmethod
+    def diff_buckets(expected, stored):
+        return {
+            bucket: expected.get(bucket, 0) - stored.get(bucket, 0)
+            for bucket in expected.keys() | stored.keys()
+            if expected.get(bucket, 0) != stored.get(bucket, 0)
+        }
+
+    @classmethod
+    def compute_drift(cls):
+        return cls.diff_buckets(cls.compute_buckets(), cls.stored_buckets())
+
+    @staticmethod
+    def lock_counters():
+        """
+        Holds apply_delta() off until the caller's transaction ends. Taken before
+        counting: writers that already updated a counter are waited for (their
+        dossiers are then counted), later ones add their delta to the rebuilt rows.
+        """
+        connection = transaction.get_connection()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # EXCLUSIVE: reads go on, UPDATE and the INSERT of a new bucket wait
+                cursor.execute(f'LOCK TABLE "{DossierAggregate._meta.db_table}" IN EXCLUSIVE MODE')
+        else:
+            # A no-op write: the database write lock on SQLite, the row locks elsewhere
+            DossierAggregate.objects.update(count=F('count'))
+
+    @classmethod
+    def rebuild(cls):
+        """Replaces the stored counters with freshly computed ones, returns the drift that was fixed."""
+        with transaction.atomic():
+            cls.lock_counters()
+            expected = cls.compute_buckets()
+            drift = cls.diff_buckets(expected, cls.stored_buckets())
+            DossierAggregate.objects.all().delete()
+            DossierAggregate.objects.bulk_create([
+                DossierAggregate(status=status, case_type=case_type, count=count)
+                for (status, case_type), count in expected.items()
+            ])
+            response_cache.invalidate('dashboards')
+        logger.info(f"Dashboard aggregates rebuilt ({len(drift)} bucket(s) drifted)")
+        return drift
+
+    @classmethod
+    def get_direction_dashboard(cls):
+        stats = cls.get_direction_stats()
+        return {
+            "stats": {
+                "openDossiers": stats['openDossiers'],
+                "totalDossiers": stats['totalDossiers'],
+                "totalRiskValue": stats['openDossiers'] * cls.ESTIMATED_RISK_PER_CASE,
+            },
+            "caseTypeDistribution": stats['caseTypeDistribution'],
+        }
+
+    @classmethod
+    def get_direction_stats(cls):
+        """Totals for the direction dashboard, read from a handful of counter rows."""
+        open_dossiers = total_dossiers = 0
+        case_types = {}
+        for (status, case_type), count in cls.stored_buckets().items():
+            total_dossiers += count
+            if status != DossierStatus.CLOTURE_SANS_SUITE.value:
+                open_dossiers += count
+            case_types[case_type] = case_types.get(case_type, 0) + count
+
+        return {
+            'openDossiers': open_dossiers,
+            'totalDossiers': total_dossiers,
+            'caseTypeDistribution': [
+                {'caseType': case_type, 'count': count}
+                for case_type, count in sorted(case_types.items()) if count
+            ],
+        }
+
+
+class JuristDashboardService:
+    """
+    Builds the jurist dashboard with a fixed number of grouped queries
+    (never one query per contentieux or audit).
+    """
+    NO_JURIDICTION = 'AUCUNE'
+    OVERDUE_ITEMS_LIMIT = 10
+
+    @classmethod
+    def current_juridiction(cls):
+        """Deepest juridiction found in Contentieux.juridiction_steps, as a SQL expression."""
+        deepest_first = [
+            JuridictionType.COUR_CASSATION, JuridictionType.COUR_APPEL, JuridictionType.TRIBUNAL_JUDICIAIRE,
+        ]
+        return Case(
+            *[When(juridiction_steps__has_key=step.value, then=Value(step.value)) for step in deepest_first],
+            default=Value(cls.NO_JURIDICTION),
+            output_field=CharField(),
+        )
+
+    @classmethod
+    def querysets(cls):
+        """The dashboard's independent queries, by name: evaluated in any order (or concurrently, see async_views.py)."""
+        cutoff = timezone.now() - timedelta(days=settings.DASHBOARD_OVERDUE_DAYS)
+        overdue_contentieux = Q(status=ContentieuxStatus.DRAFT.value, created_at__lt=cutoff)
+        open_audits = Audit.objects.exclude(status=AuditStatus.COMPLETED.value)
+
+        by_status = (
+            Contentieux.objects.order_by().values('status')
+            .annotate(total=Count('id'), overdue=Count('id', filter=overdue_contentieux))
+        )
+        by_juridiction = (
+            Contentieux.objects.order_by().values(juridiction=cls.current_juridiction())
+            .annotate(total=Count('id'))
+        )
+        by_auditor = (
+            open_audits.order_by().values('auditor_id', 'auditor__name')
+            .annotate(
+                in_progress=Count('id', filter=Q(status=AuditStatus.IN_PROGRESS.value)),
+                overdue=Count('id', filter=Q(created_at__lt=cutoff)),
+            )
+        )
+        overdue_audits = (
+            open_audits.filter(created_at__lt=cutoff).order_by('created_at')
+            .values('id', 'dossier_atmp__reference', 'auditor_id', 'created_at')[:cls.OVERDUE_ITEMS_LIMIT]
+        )
+        overdue_contentieux_items = (
+            Contentieux.objects.filter(overdue_contentieux).order_by('created_at')
+            .values('id', 'reference', 'created_at')[:cls.OVERDUE_ITEMS_LIMIT]
+        )
+        return {
+            'by_status': by_status,
+            'by_juridiction': by_juridiction,
+            'by_auditor': by_auditor,
+            'overdue_audits': overdue_audits,
+            'overdue_contentieux_items': overdue_contentieux_items,
+        }
+
+    @classmethod
+    def get_dashboard_data(cls):
+        return cls.build({name: list(queryset) for name, queryset in cls.querysets().items()})
+
+    @staticmethod
+    def build(rows):
+        """The dashboard payload from the evaluated querysets() rows."""
+        by_status = rows['by_status']
+        by_juridiction = rows['by_juridiction']
+        by_auditor = rows['by_auditor']
+        overdue_audits = rows['overdue_audits']
+        overdue_contentieux_items = rows['overdue_contentieux_items']
+        return {
+            "contentieux": {
+                "total": sum(row['total'] for row in by_status),
+                "overdue": sum(row['overdue'] for row in by_status),
+                "byStatus": [{"status": row['status'], "count": row['total']} for row in by_status],
+                "byJuridiction": [{"juridiction": row['juridiction'], "count": row['total']} for row in by_juridiction],
+            },
+            "audits": {
+                "inProgress": sum(row['in_progress'] for row in by_auditor),
+                "overdue": sum(row['overdue'] for row in by_auditor),
+                "byAuditor": [
+                    {
+                        "auditorId": row['auditor_id'],
+                        "auditorName": row['auditor__name'],
+                        "inProgress": row['in_progress'],
+                        "overdue": row['overdue'],
+                    }
+                    for row in by_auditor
+                ],
+            },
+            "overdueItems": {
+                "audits": [
+                    {
+                        "id": row['id'],
+                        "dossierReference": row['dossier_atmp__reference'],
+                        "auditorId": row['auditor_id'],
+                        "createdAt": row['created_at'],
+                    }
+                    for row in overdue_audits
+                ],
+                "contentieux": [
+                    {"id": row['id'], "reference": row['reference'], "createdAt": row['created_at']}
+                    for row in overdue_contentieux_items
+                ],
+            },
+        }
+
+
+class DossierBulkService:
+    """
+    Creates many dossiers at once: referenced users and documents are loaded
+    with one IN query each, rows are validated in a single pass and inserted
+    with bulk_create in one transaction.
+    """
+    batch_size = 500
+
+    @staticmethod
+    def collect_ids(items, field, many=False):
+        ids = set()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            values = item.get(field)
+            for value in (values if many and isinstance(values, list) else [values]):
+                if isinstance(value, (str, int)) and not isinstance(value, bool):
+                    ids.add(str(value))
+        return ids
+
+    @classmethod
+    def prefetch_related_objects(cls, items):
+        prefetched = {}
+        for model, field, many in ((User, 'created_by', False), (Document, 'documents', True)):
+            ids = [pk for pk in cls.collect_ids(items, field, many) if pk.isdigit()]
+            prefetched[model] = {str(obj.pk): obj for obj in model.objects.filter(pk__in=ids)}
+        return prefetched
+
+    @classmethod
+    def validate(cls, items):
+        """Returns ([(index, validated_data)], [{"index": i, "errors": {...}}])."""
+        context = {'prefetched': cls.prefetch_related_objects(items)}
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            serializer = DossierATMPSerializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+        return valid, errors
+
+    @classmethod
+    def create(cls, valid_rows):
+        """Inserts validated rows, returns the created dossiers in input order."""
+        # Reserved before the transaction so a rollback cannot hand the same numbers out twice
+        references = dossier_references.allocate(len(valid_rows))
+        dossiers, documents = [], []
+        for reference, (index, data) in zip(references, valid_rows):
+            data = dict(data)
+            documents.append(data.pop('documents', []))
+            dossiers.append(DossierATMP(reference=reference, **data))
+
+        with transaction.atomic():
+            DossierATMP.objects.bulk_create(dossiers, batch_size=cls.batch_size)
+
+            Through = DossierATMP.documents.through
+            Through.objects.bulk_create([
+                Through(dossieratmp_id=dossier.pk, document_id=document.pk)
+                for dossier, dossier_documents in zip(dossiers, documents)
+                for document in dossier_documents
+            ], batch_size=cls.batch_size)
+
+            # bulk_create sends no post_save: keep the dashboard counters in step
+            buckets = {}
+            for dossier in dossiers:
+                bucket = (dossier.status, dossier.case_type)
+                buckets[bucket] = buckets.get(bucket, 0) + 1
+            for bucket, count in buckets.items():
+                DashboardAggregateService.apply_delta(bucket, count)
+            response_cache.invalidate(model_tag(DossierATMP), 'dashboards')
+            # ... and the search index
+            SearchService.index_dossiers(dossiers)
+
+        logger.info(f"{len(dossiers)} dossiers created in bulk")
+        return dossiers
+
+
+class BlobService:
+    """Reference counts of content-addressed blobs, maintained by signals.py."""
+
+    @staticmethod
+    def apply_delta(sha256, delta, size=0):
+        if not sha256:
+            return
+        blobs = Blob.objects.filter(sha256=sha256)
+        if not blobs.update(ref_count=F('ref_count') + delta, updated_at=timezone.now()):
+            Blob.objects.get_or_create(sha256=sha256, defaults={'size': size})
+            blobs.update(ref_count=F('ref_count') + delta, updated_at=timezone.now())
+
+    @staticmethod
+    def collect_garbage(storage, older_than):
+        """Deletes blobs no Document references any more, once idle since `older_than`."""
+        deleted = 0
+        for sha256 in Blob.objects.filter(ref_count__lte=0, updated_at__lt=older_than).values_list('sha256', flat=True):
+            with transaction.atomic():
+                blob = Blob.objects.select_for_update().filter(sha256=sha256, ref_count__lte=0).first()
+                if blob is None:
+                    continue  # referenced again meanwhile
+                storage.delete(storage.blob_name(sha256))
+                default_storage.delete(DocumentProcessingService.thumbnail_name(sha256))
+                blob.delete()
+                deleted += 1
+        return deleted
+
+
+class DocumentProcessingService:
+    """Results of processing.analyze() on Document rows (the documents.process job)."""
+
+    RESULT_FIELDS = ['page_count', 'text', 'thumbnail']
+
+    @staticmethod
+    def thumbnail_name(sha256):
+        # One thumbnail per content, like the blobs: duplicates share it
+        return f"thumbnails/{sha256[:2]}/{sha256}.jpg"
+
+    @classmethod
+    def process(cls, document_id):
+        document = Document.objects.filter(pk=document_id).only('contentieux', 'file', 'sha256', 'mime_type').first()
+        if document is None or not document.file:
+            return {'skipped': True}  # deleted meanwhile, or nothing uploaded
+
+        # Content-addressed: the same file uploaded to another contentieux was already analyzed
+        done = Document.objects.filter(
+            sha256=document.sha256, processing_status=DocumentProcessingStatus.PROCESSED.value,
+        ).exclude(sha256='').exclude(pk=document.pk).values(*cls.RESULT_FIELDS).first()
+        if done is not None:
+            fields = done
+        else:
+            try:
+                analysis = document_pool.run(document.file.path, document.mime_type)
+            except (BrokenProcessPool, TimeoutError):
+                raise  # the pool, not the file: the job is retried
+            except Exception as e:
+                logger.warning(f"Document {document.pk} illisible: {e}")
+                cls.save_results(document, {}, DocumentProcessingStatus.FAILED)
+                return {'error': str(e)}
+            fields = {'page_count': analysis['page_count'], 'text': analysis['text'], 'thumbnail': None}
+            if analysis['thumbnail']:
+                name = cls.thumbnail_name(document.sha256) if document.sha256 else f"thumbnails/document-{document.pk}.jpg"
+                if not default_storage.exists(name):
+                    name = default_storage.save(name, ContentFile(analysis['thumbnail']))
+                fields['thumbnail'] = name
+
+        with transaction.atomic():
+            cls.save_results(document, fields, DocumentProcessingStatus.PROCESSED)
+            SearchService.index_contentieux(Contentieux.objects.get(pk=document.contentieux_id))
+        return {'pageCount': fields['page_count'], 'textLength': len(fields['text']), 'thumbnail': bool(fields['thumbnail'])}
+
+    @staticmethod
+    def save_results(document, fields, processing_status):
+        # update(): no save() signals, the blob reference count is untouched
+        now = timezone.now()
+        Document.objects.filter(pk=document.pk).update(
+            **fields, processing_status=processing_status.value, processed_at=now, updated_at=now,
+        )
+        response_cache.invalidate(model_tag(Document), model_tag(Document, document.pk))
@@ -0,0 +1,179 @@
+# /home/siisi/praevia_gemini/praevia_api/signals.py
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, pre_delete, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .caching import model_tag, response_cache
+from .jobs import enqueue
+from .models import Action, Audit, Contentieux, Document, DocumentProcessingStatus, DossierATMP, User
+from .search import SearchService
+from .services import BlobService, DashboardAggregateService
+
+
+# --- Dashboard aggregates ---
+@receiver(pre_save, sender=DossierATMP)
+def remember_previous_bucket(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._previous_bucket = None
+        return
+    previous = getattr(instance, '_loaded_bucket', None)
+    if previous is None:
+        # Instance built by hand or loaded with deferred fields
+        stored = DossierATMP.objects.filter(pk=instance.pk).only('status', 'accident').first()
+        previous = (stored.status, stored.case_type) if stored else None
+    instance._previous_bucket = previous
+
+
+@receiver(post_save, sender=DossierATMP)
+def update_dossier_aggregates(sender, instance, created, raw=False, **kwargs):
+    # The views save dossiers in a transaction: a rolled back save leaves no delta behind
+    if raw:
+        return
+    bucket = (instance.status, instance.case_type)
+    previous = getattr(instance, '_previous_bucket', None)
+    if created or previous != bucket:
+        with transaction.atomic():
+            if previous is not None:
+                DashboardAggregateService.apply_delta(previous, -1)
+            DashboardAggregateService.apply_delta(bucket, 1)
+    instance._loaded_bucket = bucket
+
+
+@receiver(post_delete, sender=DossierATMP)
+def release_dossier_aggregates(sender, instance, **kwargs):
+    bucket = getattr(instance, '_loaded_bucket', None) or (instance.status, instance.case_type)
+    DashboardAggregateService.apply_delta(bucket, -1)
+
+
+# --- Search index (search.py) ---
+SEARCHED_DOSSIER_FIELDS = {'reference', 'salarie', 'entreprise', 'accident'}
+
+
+@receiver(post_save, sender=DossierATMP)
+def index_dossier(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and not SEARCHED_DOSSIER_FIELDS & set(update_fields)):
+        return
+    SearchService.index_dossiers([instance])
+    if not created:
+        SearchService.refresh_contentieux_names(instance)
+
+
+@receiver(post_save, sender=Contentieux)
+def index_contentieux(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and not {'reference', 'subject'} & set(update_fields)):
+        return
+    SearchService.index_contentieux(instance)
+
+
+@receiver(post_delete, sender=Contentieux)
+def unindex_contentieux(sender, instance, **kwargs):
+    # Deleting a dossier cascades to its entries
+    SearchService.remove_contentieux(instance.pk)
+
+
+# --- Document processing (processing.py, run by the job workers) ---
+@receiver(post_save, sender=Document)
+def process_uploaded_document(sender, instance, created, raw=False, **kwargs):
+    # Connected before update_blob_references, which moves _loaded_sha256 to the new content
+    if raw or not instance.file:
+        return
+    if created or getattr(instance, '_loaded_sha256', '') != instance.sha256:
+        if not created:
+            Document.objects.filter(pk=instance.pk).update(processing_status=DocumentProcessingStatus.PENDING.value)
+        # The upload views save in a transaction: no job for a rolled back document
+        enqueue('documents.process', {'document_id': instance.pk})
+
+
+# --- Content-addressed blobs ---
+@receiver(post_save, sender=Document)
+def update_blob_references(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = '' if created else getattr(instance, '_loaded_sha256', '')
+    if previous != instance.sha256:
+        with transaction.atomic():
+            BlobService.apply_delta(previous, -1)
+            BlobService.apply_delta(instance.sha256, 1, size=instance.size)
+    instance._loaded_sha256 = instance.sha256
+
+
+@receiver(post_delete, sender=Document)
+def release_blob_reference(sender, instance, **kwargs):
+    BlobService.apply_delta(getattr(instance, '_loaded_sha256', instance.sha256), -1)
+
+
+# --- Token authentication cache ---
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, **kwargs):
+    # Password, role or is_active may have changed
+    token_cache.invalidate_user(instance.pk)
+
+
+# --- Response cache (caching.py) and conditional GET (conditional.py) ---
+DASHBOARD_MODELS = (DossierATMP, Audit, Contentieux)
+# Relations rendered as id lists: changing them changes the owner's representation
+RENDERED_M2M = (
+    DossierATMP._meta.get_field('documents'),
+    Contentieux._meta.get_field('documents'),
+    Contentieux._meta.get_field('actions'),
+)
+
+
+def touch_rows(model, pks):
+    """Bumps updated_at (new ETags) and drops cached responses of rows whose relations changed."""
+    pks = list(pks)
+    if not pks:
+        return
+    model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+    response_cache.invalidate(model_tag(model), *(model_tag(model, pk) for pk in pks))
+
+
+@receiver(post_save, sender=DossierATMP)
+@receiver(post_save, sender=Audit)
+@receiver(post_save, sender=Contentieux)
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=DossierATMP)
+@receiver(post_delete, sender=Audit)
+@receiver(post_delete, sender=Contentieux)
+@receiver(post_delete, sender=Document)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    tags = [model_tag(sender), model_tag(sender, instance.pk)]
+    if sender in DASHBOARD_MODELS:
+        tags.append('dashboards')
+    response_cache.invalidate(*tags)
+
+
+@receiver(m2m_changed, sender=DossierATMP.documents.through)
+@receiver(m2m_changed, sender=Contentieux.documents.through)
+@receiver(m2m_changed, sender=Contentieux.actions.through)
+def touch_m2m_owner(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_rows(type(instance), [instance.pk])
+            instance.updated_at = timezone.now()
+        return
+
+    # instance is the Document/Action, model the owner
+    if action == 'pre_clear':
+        field = next(f for f in model._meta.many_to_many if f.remote_field.through is sender)
+        instance._cleared_owners = list(model.objects.filter(**{field.name: instance.pk}).values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        touch_rows(model, getattr(instance, '_cleared_owners', []) if action == 'post_clear' else pk_set)
+
+
+@receiver(pre_delete, sender=Document)
+@receiver(pre_delete, sender=Action)
+def touch_owners_of_deleted(sender, instance, **kwargs):
+    # The cascade removes the through rows without m2m_changed
+    for field in RENDERED_M2M:
+        if field.related_model is sender:
+            touch_rows(field.model, field.model.objects.filter(**{field.name: instance.pk}).values_list('pk', flat=True))
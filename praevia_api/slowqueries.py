@@ -0,0 +1,177 @@
+# /home/siisi/praevia_gemini/praevia_api/slowqueries.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .metrics import current_route
+
+logger = logging.getLogger(__name__)
+# One JSON object per line (LOGGING sends it to SLOW_QUERY_LOG): read by `manage.py slow_queries`
+slow_query_logger = logging.getLogger('praevia_api.slow_queries')
+
+
+class SlowQueryFileHandler(logging.Handler):
+    """
+    Appends each record to SLOW_QUERY_LOG as it is set when the record is
+    written, not when logging was configured: override_settings() moves it.
+    Slow statements are rare, the file is opened for each one (O_APPEND).
+    """
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+            with open(settings.SLOW_QUERY_LOG, 'a', encoding='utf-8') as log:
+                log.write(line + '\n')
+        except Exception:
+            self.handleError(record)
+
+# Literal values out, so that the same statement with other parameters shares a fingerprint
+FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),  # string literals
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),  # numbers (not the digits of T3, col1...)
+    (re.compile(r'%s|\?'), '?'),  # placeholders of every backend
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),  # IN lists, VALUES rows
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),  # multi-row VALUES
+    (re.compile(r'\s+'), ' '),
+]
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def normalize(sql):
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode(), usedforsecurity=False).hexdigest()[:12]
+
+
+def explain(connection, sql, params):
+    """
+    EXPLAIN (never ANALYZE: the statement is not run again) on a cursor of
+    its own, so the slow statement's unread rows are left alone. Inside a
+    transaction a savepoint keeps a failing EXPLAIN from aborting it.
+    """
+    savepoint = None
+    try:
+        savepoint = connection.savepoint()
+        cursor = connection.create_cursor()  # no execute wrappers: not timed, not captured
+        try:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except DatabaseError as e:
+        if savepoint:
+            connection.savepoint_rollback(savepoint)
+        logger.warning(f"EXPLAIN impossible pour une requête lente: {e}")
+        return None
+    if savepoint:
+        connection.savepoint_commit(savepoint)
+    # Postgres: one line per row; SQLite EXPLAIN QUERY PLAN: (id, parent, notused, detail)
+    return [str(row[-1]) for row in rows]
+
+
+class SlowQueryLog:
+    """
+    Statements slower than SLOW_QUERY_MS, per worker: the last
+    SLOW_QUERY_BUFFER_SIZE in a ring buffer and totals per fingerprint. A
+    fingerprint is explained the first time it is seen, then again when it
+    beats its own worst time, at most every SLOW_QUERY_EXPLAIN_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+        self.fingerprints = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = execute(sql, params, many, context)
+            failed = False
+            return result
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if 0 < settings.SLOW_QUERY_MS <= elapsed_ms:
+                self.record(context['connection'], sql, params, many, elapsed_ms, failed)
+
+    def record(self, connection, sql, params, many, elapsed_ms, failed=False):
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        now = time.monotonic()
+        with self._lock:
+            totals = self.fingerprints.get(key)
+            if totals is None:
+                totals = self.fingerprints[key] = {
+                    'fingerprint': key, 'sql': normalized, 'count': 0, 'totalMs': 0.0, 'maxMs': 0.0,
+                    'views': [], 'plan': None, 'explainedAt': None,
+                }
+            # Never after a failed statement (statement timeout, IntegrityError after a lock wait):
+            # its PostgreSQL transaction is aborted, a SAVEPOINT or EXPLAIN would raise in its place
+            sample = not failed and (totals['explainedAt'] is None or (
+                elapsed_ms > totals['maxMs'] and now - totals['explainedAt'] >= settings.SLOW_QUERY_EXPLAIN_INTERVAL
+            ))
+            if sample:
+                totals['explainedAt'] = now  # claimed: concurrent slow runs do not explain it too
+        explainable = not many and normalized.lstrip('(').upper().startswith(EXPLAINABLE)
+        plan = explain(connection, sql, params) if sample and explainable else None
+
+        view = current_route()
+        entry = {
+            'at': timezone.now().isoformat(), 'fingerprint': key, 'view': view, 'ms': round(elapsed_ms, 1),
+            'vendor': connection.vendor, 'pid': os.getpid(), 'sql': normalized, 'plan': plan, 'failed': failed,
+        }
+        with self._lock:
+            totals['count'] += 1
+            totals['totalMs'] += elapsed_ms
+            totals['maxMs'] = max(totals['maxMs'], elapsed_ms)
+            if view and view not in totals['views']:
+                totals['views'].append(view)
+            if plan is not None:
+                totals['plan'] = plan
+            self.recent.append(entry)
+        slow_query_logger.info(json.dumps(entry))
+
+    def stats(self, top=20):
+        with self._lock:
+            recent = list(self.recent)[::-1]
+            worst = sorted(self.fingerprints.values(), key=lambda totals: totals['totalMs'], reverse=True)[:top]
+            worst = [
+                {**{k: v for k, v in totals.items() if k != 'explainedAt'},
+                 'totalMs': round(totals['totalMs'], 1), 'maxMs': round(totals['maxMs'], 1), 'views': list(totals['views'])}
+                for totals in worst
+            ]
+        return {'thresholdMs': settings.SLOW_QUERY_MS, 'top': worst, 'recent': recent}
+
+    def clear(self):
+        with self._lock:
+            self.recent.clear()
+            self.fingerprints.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    # First in the list: connection.execute_wrapper() blocks pop() from the end
+    if slow_query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_log)
+
+
+def instrument():
+    """Called from AppConfig.ready() when SLOW_QUERY_MS > 0."""
+    connection_created.connect(install_slow_query_log, dispatch_uid='praevia_slow_query_log')
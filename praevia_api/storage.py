@@ -0,0 +1,86 @@
+# /home/siisi/praevia_gemini/praevia_api/storage.py
+
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each distinct content once, under blobs/<aa>/<bb>/<sha256>.
+
+    The name passed by the FileField is ignored: uploading the same CERFA
+    to ten dossiers writes it once, and the two fan-out levels keep every
+    directory small. Blobs are never deleted here; Document rows reference
+    count them (see signals.py) and dedupe_documents --gc removes the
+    unreferenced ones.
+    """
+    prefix = 'blobs'
+
+    def blob_name(self, sha256):
+        return f"{self.prefix}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    @staticmethod
+    def sha256_from_name(name):
+        match = BLOB_NAME_RE.match(name or '')
+        return match.group('sha256') if match else None
+
+    def get_available_name(self, name, max_length=None):
+        return name  # the final name only depends on the content
+
+    def _save(self, name, content):
+        tmp_dir = self.path(os.path.join(self.prefix, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        sha256 = getattr(content, 'sha256', None)
+        if hasattr(content, 'temporary_file_path'):
+            if not sha256:
+                sha256 = file_sha256(content.temporary_file_path())
+            target = self.blob_name(sha256)
+            if not self.exists(target):
+                tmp_path = os.path.join(tmp_dir, sha256)
+                file_move_safe(content.temporary_file_path(), tmp_path, allow_overwrite=True)
+                self.publish(tmp_path, target)
+            return target
+
+        # Hash while spooling into the blob tree, then rename: a single pass over the content
+        hasher = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            for chunk in content.chunks():
+                hasher.update(chunk)
+                tmp.write(chunk)
+        target = self.blob_name(hasher.hexdigest())
+        if self.exists(target):
+            os.remove(tmp.name)
+        else:
+            self.publish(tmp.name, target)
+        return target
+
+    def publish(self, tmp_path, name):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(tmp_path, self.file_permissions_mode)
+        # Atomic: readers never see a partially written blob
+        os.replace(tmp_path, full_path)
+
+
+def file_sha256(path, block_size=64 * 1024):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+document_storage = ContentAddressedStorage()  # MEDIA_ROOT / MEDIA_URL
+
+
+def get_document_storage():
+    return document_storage
@@ -0,0 +1,32 @@
+# /home/siisi/praevia_gemini/praevia_api/tasks.py
+
+from .jobs import task
+from .models import Audit, Contentieux
+from .search import SearchService
+from .services import ContentieuxService, DashboardAggregateService, DocumentProcessingService
+
+# A job can run more than once (retry after a crash, JOB_TIMEOUT): tasks are idempotent.
+
+
+@task('contentieux.create_from_audit')
+def create_contentieux_from_audit(audit_id):
+    audit = Audit.objects.select_related('dossier_atmp').get(pk=audit_id)
+    contentieux = Contentieux.objects.filter(dossier_atmp_id=audit.dossier_atmp_id).first()
+    if contentieux is None:
+        contentieux = ContentieuxService.create_from_audit(audit, audit.dossier_atmp)
+    return {'contentieuxId': contentieux.pk, 'reference': contentieux.reference}
+
+
+@task('search.rebuild')
+def rebuild_search_index():
+    return {'entries': SearchService.rebuild()}
+
+
+@task('dashboards.rebuild')
+def rebuild_dashboard_aggregates():
+    return {'driftedBuckets': len(DashboardAggregateService.rebuild())}
+
+
+@task('documents.process', atomic=False)  # no transaction left open while the pool works
+def process_document(document_id):
+    return DocumentProcessingService.process(document_id)
@@ -1,3 +1,1347 @@
-from django.test import TestCase
+import csv
+import fcntl
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .models import (
+    User, Action, Blob, DossierATMP, DossierAggregate, DossierStatus, Contentieux, ContentieuxStatus, Audit, AuditStatus,
+    Document, DocumentProcessingStatus, Job, JobStatus, JuridictionType, ReferenceCounter, UploadSession
+)
+from . import async_views
+from .authentication import CachedTokenAuthentication, token_cache
+from .exports import NDJSONRenderer
+from .fastjson import FastJSONParser, FastJSONRenderer
+from .caching import response_cache
+from .hashing import password_hash_pool
+from .jobs import Worker, enqueue, task
+from .processing import DocumentProcessPool
+from .metrics import registry, write_series
+from .pagination import KeysetPagination
+from .references import ReferenceAllocator
+from .slowqueries import normalize, slow_query_log
+from .storage import get_document_storage
+from .seeding import DossierGenerator, day_end, luhn_complete, seed_chunk
+from .services import DashboardAggregateService, DossierBulkService, JuristDashboardService, SearchService
+
+
+@override_settings(RESPONSE_CACHE_TTL=300)  # off on locmem, but the test runs in a single process
+class JuristDashboardTests(TestCase):
+    url = reverse('praevia_api:jurist_dashboard_data')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jurist = User.objects.create_user(
+            email='juriste@example.com', username='juriste', password='juriste123', name='Juriste Alpha', role='JURISTE'
+        )
+        for i in range(12):
+            dossier = DossierATMP.objects.create(
+                reference=f"DAT-{i}", created_by=cls.jurist, entreprise={}, salarie={}, accident={}
+            )
+            steps = {JuridictionType.TRIBUNAL_JUDICIAIRE.value: {}} if i % 2 else {}
+            if i % 4 == 3:
+                steps[JuridictionType.COUR_APPEL.value] = {}
+            Contentieux.objects.create(
+                dossier_atmp=dossier, reference=f"CONT-{i}", subject={},
+                status=ContentieuxStatus.DRAFT.value, juridiction_steps=steps,
+            )
+            Audit.objects.create(dossier_atmp=dossier, auditor=cls.jurist, status=AuditStatus.IN_PROGRESS.value)
+        Audit.objects.filter(dossier_atmp__reference='DAT-0').update(created_at=timezone.now() - timedelta(days=60))
+
+    def setUp(self):
+        cache.clear()
+        response_cache.cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.jurist)
+
+    def test_bounded_query_count(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        data = response.json()
+        self.assertEqual(data['contentieux']['total'], 12)
+        by_juridiction = {row['juridiction']: row['count'] for row in data['contentieux']['byJuridiction']}
+        self.assertEqual(by_juridiction, {'AUCUNE': 6, 'TRIBUNAL_JUDICIAIRE': 3, 'COUR_APPEL': 3})
+        self.assertEqual(data['audits']['inProgress'], 12)
+        self.assertEqual(data['audits']['overdue'], 1)
+        self.assertEqual(data['overdueItems']['audits'][0]['dossierReference'], 'DAT-0')
+
+    def test_cached_until_data_changes(self):
+        self.client.get(self.url, format='json')
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        Audit.objects.filter(status=AuditStatus.IN_PROGRESS.value).first().delete()
+        response = self.client.get(self.url, format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['audits']['inProgress'], 11)
+
+    @override_settings(ASYNC_QUERY_FANOUT=False)  # other connections cannot see the test's transaction
+    async def test_async_view_matches_sync(self):
+        token = await Token.objects.acreate(user=self.jurist)
+        request = AsyncRequestFactory().get(self.url, headers={'Authorization': f"Token {token.key}"})
+        response = await async_views.get_jurist_dashboard_data(request)
+        self.assertEqual(response.status_code, 200)
+        expected = await sync_to_async(JuristDashboardService.get_dashboard_data)()
+        self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(expected)))
+
+        anonymous = await async_views.get_jurist_dashboard_data(AsyncRequestFactory().get(self.url))
+        self.assertEqual(anonymous.status_code, 403)
+
+
+class ReferenceAllocatorTests(TestCase):
+    def test_allocators_never_share_numbers(self):
+        first, second = ReferenceAllocator('TST', block_size=5), ReferenceAllocator('TST', block_size=5)
+        references = first.allocate(3) + second.allocate(4) + first.allocate(2)
+        self.assertEqual(len(set(references)), 9)
+        self.assertEqual(references[0], 'TST-00000001')
+
+    def test_viewset_creates_get_distinct_references(self):
+        user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {'created_by': user.pk, 'entreprise': {}, 'salarie': {}, 'accident': {}}
+        references = {
+            client.post(reverse('praevia_api:dossier-list'), payload, format='json').json()['reference']
+            for _ in range(2)
+        }
+        self.assertEqual(len(references), 2)
+
+
+class ReferenceBlockTests(TransactionTestCase):
+    """Outside atomic(): allocate() serves numbers from its cached block."""
+
+    def test_allocation_crosses_blocks_without_gaps_or_duplicates(self):
+        allocator = ReferenceAllocator('TST', block_size=3)
+        with mock.patch.object(allocator, 'reserve', wraps=allocator.reserve) as reserve:
+            references = allocator.allocate(2) + allocator.allocate(3) + allocator.allocate(2)
+        self.assertEqual(references, [allocator.format(number) for number in range(1, 8)])
+        self.assertEqual([c.args for c in reserve.call_args_list], [(3,), (3,), (3,)])  # one UPDATE per block
+        self.assertEqual(allocator.allocate(2), ['TST-00000008', 'TST-00000009'])  # rest of the third block
+
+    def test_allocators_sharing_a_prefix_take_disjoint_blocks(self):
+        first, second = ReferenceAllocator('TST', block_size=4), ReferenceAllocator('TST', block_size=4)
+        references = first.allocate(3) + second.allocate(3) + first.allocate(3) + second.allocate(3)
+        self.assertEqual(len(set(references)), 12)
+        self.assertEqual(references[:3], ['TST-00000001', 'TST-00000002', 'TST-00000003'])
+        self.assertEqual(references[3:6], ['TST-00000005', 'TST-00000006', 'TST-00000007'])
+
+    def test_forked_worker_reserves_its_own_block(self):
+        allocator = ReferenceAllocator('TST', block_size=5)
+        self.assertEqual(allocator.allocate(), ['TST-00000001'])
+        with mock.patch('praevia_api.references.os.getpid', return_value=os.getpid() + 1):
+            child = allocator.allocate(2)  # the parent still owns TST-00000002..5
+        self.assertEqual(child, ['TST-00000006', 'TST-00000007'])
+
+    def test_reset_drops_the_block(self):
+        allocator = ReferenceAllocator('TST', block_size=5)
+        self.assertEqual(allocator.allocate(), ['TST-00000001'])
+        ReferenceCounter.objects.filter(prefix='TST').update(next_value=100)  # e.g. seed_data --scale
+        allocator.reset()
+        self.assertEqual(allocator.allocate(), ['TST-00000100'])
+
+
+class DashboardAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='direction@example.com', username='direction', password=None, name='Direction', role='MANAGER')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counters(self):
+        return {bucket: count for bucket, count in DashboardAggregateService.stored_buckets().items() if count}
+
+    def create(self, case_type='AT', **fields):
+        return DossierATMP.objects.create(
+            reference=f"DAT-{uuid.uuid4().hex[:8]}", created_by=self.user,
+            entreprise={}, salarie={}, accident={'type': case_type}, **fields,
+        )
+
+    def test_deltas_follow_saves_and_deletes(self):
+        dossier = self.create()
+        self.create(case_type='MP')
+        self.assertEqual(self.counters(), {('A_ANALYSER', 'AT'): 1, ('A_ANALYSER', 'MP'): 1})
+
+        dossier.status = DossierStatus.ANALYSE_EN_COURS.value
+        dossier.save()
+        self.assertEqual(self.counters(), {('ANALYSE_EN_COURS', 'AT'): 1, ('A_ANALYSER', 'MP'): 1})
+
+        dossier = DossierATMP.objects.get(pk=dossier.pk)  # bucket remembered by from_db
+        dossier.accident = {'type': 'TRAJET'}
+        dossier.save()
+        dossier.save()  # unchanged bucket: no delta
+        self.assertEqual(self.counters(), {('ANALYSE_EN_COURS', 'TRAJET'): 1, ('A_ANALYSER', 'MP'): 1})
+
+        dossier.delete()
+        self.assertEqual(self.counters(), {('A_ANALYSER', 'MP'): 1})
+        self.assertEqual(DashboardAggregateService.compute_drift(), {})
+
+    def test_failed_update_leaves_no_delta(self):
+        dossier = self.create()
+        url = reverse('praevia_api:dossier-detail', args=[dossier.pk])
+        with mock.patch.object(SearchService, 'index_dossiers', side_effect=RuntimeError('index indisponible')):
+            with self.assertRaises(RuntimeError):
+                self.client.patch(url, {'status': DossierStatus.CLOTURE_SANS_SUITE.value}, format='json')
+        self.assertEqual(self.counters(), {('A_ANALYSER', 'AT'): 1})
+
+        self.client.patch(url, {'status': DossierStatus.CLOTURE_SANS_SUITE.value}, format='json')
+        stats = self.client.get(reverse('praevia_api:direction_dashboard_data')).json()['stats']
+        self.assertEqual((stats['openDossiers'], stats['totalDossiers']), (0, 1))
+
+    def test_rebuild_repairs_drift(self):
+        self.create()
+        self.create(case_type='MP')
+        DossierAggregate.objects.filter(case_type='AT').update(count=5)
+        DossierAggregate.objects.create(status=DossierStatus.CLOTURE_SANS_SUITE.value, case_type='AT', count=2)
+
+        out = StringIO()
+        call_command('rebuild_dashboard_aggregates', '--check', stdout=out)
+        self.assertIn('2 bucket(s) drifted', out.getvalue())
+        self.assertEqual(DossierAggregate.objects.get(status='A_ANALYSER', case_type='AT').count, 5)  # --check writes nothing
+
+        call_command('rebuild_dashboard_aggregates', stdout=StringIO())
+        self.assertEqual(self.counters(), {('A_ANALYSER', 'AT'): 1, ('A_ANALYSER', 'MP'): 1})
+        self.assertEqual(DashboardAggregateService.compute_drift(), {})
+
+    def test_rebuild_locks_the_counters_before_counting(self):
+        self.create()
+        with CaptureQueriesContext(connection) as queries:
+            DashboardAggregateService.rebuild()
+        statements = [query['sql'] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertRegex(statements[0], r'^(LOCK TABLE|UPDATE) "dossier_aggregates"')  # a concurrent delta waits for the rebuild
+        self.assertIn('COUNT(', statements[1])
+        self.assertEqual(self.counters(), {('A_ANALYSER', 'AT'): 1})
+
+
+class DossierBulkTests(TestCase):
+    url = reverse('praevia_api:dossier-bulk')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        contentieux = Contentieux.objects.create(
+            dossier_atmp=DossierATMP.objects.create(reference='DAT-0', created_by=cls.user, entreprise={}, salarie={}, accident={}),
+            reference='CONT-0', status='DRAFT', subject={},
+        )
+        cls.document = Document.objects.create(
+            contentieux=contentieux, uploaded_by=cls.user, document_type='DAT',
+            original_name='dat.pdf', mime_type='application/pdf', size=1,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def row(self, nom, **fields):
+        return {
+            'created_by': self.user.pk, 'documents': [self.document.pk], 'entreprise': {'raisonSociale': 'Garage Moreau'},
+            'salarie': {'nom': nom}, 'accident': {'type': 'AT'}, **fields,
+        }
+
+    def test_references_resolved_with_one_query_per_model(self):
+        items = [self.row(f"Salarie {i}") for i in range(25)] + [self.row('Inconnu', created_by=999999)]
+        with self.assertNumQueries(2):  # users IN (...), documents IN (...)
+            valid, errors = DossierBulkService.validate(items)
+        self.assertEqual(len(valid), 25)
+        self.assertEqual([error['index'] for error in errors], [25])
+
+    def test_one_invalid_row_rejects_the_batch(self):
+        response = self.client.post(self.url, [self.row('Lefebvre'), self.row('Inconnu', created_by=999999)], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], [])
+        self.assertEqual(response.json()['errors'][0]['index'], 1)
+        self.assertIn('created_by', response.json()['errors'][0]['errors'])
+        self.assertEqual(DossierATMP.objects.count(), 1)
+
+    def test_allow_partial_creates_the_valid_rows(self):
+        items = [self.row('Lefebvre'), self.row('Inconnu', documents=[999999]), self.row('Garnier', accident={'type': 'MP'})]
+        response = self.client.post(f"{self.url}?allow_partial=true", items, format='json')
+        self.assertEqual(response.status_code, 201)
+        created = response.json()['created']
+        self.assertEqual([row['index'] for row in created], [0, 2])
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1])
+
+        dossiers = DossierATMP.objects.filter(pk__in=[row['id'] for row in created])
+        self.assertEqual({dossier.reference for dossier in dossiers}, {row['reference'] for row in created})
+        self.assertTrue(all(list(dossier.documents.all()) == [self.document] for dossier in dossiers))
+        self.assertEqual(DashboardAggregateService.compute_drift(), {})
+        self.assertEqual(DashboardAggregateService.stored_buckets()[('A_ANALYSER', 'MP')], 1)
+        hits = self.client.get(reverse('praevia_api:search'), {'q': 'garnier'}).json()['results']
+        self.assertEqual([hit['id'] for hit in hits], [created[1]['id']])
+
+    def test_rejects_non_lists_and_oversized_batches(self):
+        self.assertEqual(self.client.post(self.url, {'salarie': {}}, format='json').status_code, 400)
+        with mock.patch('praevia_api.views.DossierATMPViewSet.bulk_max_items', 2):
+            response = self.client.post(self.url, [self.row('A'), self.row('B'), self.row('C')], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    url = reverse('praevia_api:dossier-list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        dossiers = [
+            DossierATMP.objects.create(reference=f"DAT-{i}", created_by=cls.user, entreprise={}, salarie={}, accident={})
+            for i in range(8)
+        ]
+        # Three timestamps for eight rows: pages have to break ties on id
+        base = timezone.now() - timedelta(days=1)
+        for i, dossier in enumerate(dossiers):
+            DossierATMP.objects.filter(pk=dossier.pk).update(created_at=base + timedelta(minutes=i % 3))
+        cls.expected = list(DossierATMP.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.enterContext(mock.patch.object(KeysetPagination, 'page_size', 3))
+
+    def page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [row['id'] for row in data['results']], data['next'], data['previous']
+
+    def test_forward_then_backward(self):
+        pages, url, params = [], self.url, {'cursor': ''}
+        while url:
+            ids, url, previous = self.page(url, **params)
+            pages.append(ids)
+            params = {}
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(ids) for ids in pages], [3, 3, 2])
+        self.assertIsNone(self.page(self.url, cursor='')[2])
+
+        backward = [pages[-1]]
+        while previous:
+            ids, _, previous = self.page(previous)
+            backward.append(ids)
+        self.assertEqual(backward[::-1], pages)
+
+    def test_invalid_cursor(self):
+        for cursor in ('pas-un-curseur', 'Yz1ob3VwcyZpPTE='):  # not base64, then c=houps&i=1
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json()['detail'], 'Curseur invalide.')
+
+    @skipUnless(connection.vendor == 'sqlite', 'reads the SQLite query plan')
+    def test_deep_page_uses_the_composite_index(self):
+        cursor = KeysetPagination.encode_cursor(timezone.now(), 10 ** 6)
+        with CaptureQueriesContext(connection) as queries:
+            self.page(self.url, cursor=cursor)
+        # The ETag version and the page itself
+        keyset_queries = [query['sql'] for query in queries if 'LIMIT' in query['sql']]
+        self.assertEqual(len(keyset_queries), 2)
+        for sql in keyset_queries:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertIn('USING INDEX dossiers_created_id_idx', plan)
+            self.assertNotIn('OFFSET', sql)
+
+
+class JSONFieldFilterTests(TestCase):
+    url = reverse('praevia_api:dossier-list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        for i, (siret, day, nom) in enumerate((
+            ('12345678900001', '2024-01-15', 'Dupont'),
+            ('12345678900001', '2024-03-02', 'Martin'),
+            ('98765432100002', '2023-11-30', 'Dupont'),
+        )):
+            DossierATMP.objects.create(
+                reference=f"DAT-{i}", created_by=cls.user, entreprise={'siret': siret},
+                salarie={'nom': nom}, accident={'date': day},
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def references(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row['reference'] for row in response.json()['results'])
+
+    def test_generated_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.references(**{'entreprise.siret': '12345678900001'}), ['DAT-0', 'DAT-1'])
+        self.assertIn('"entreprise_siret"', queries.captured_queries[-1]['sql'])
+        self.assertEqual(self.references(**{'accident.date__gte': '2024-01-01'}), ['DAT-0', 'DAT-1'])
+        self.assertEqual(self.references(**{'accident.date__lt': '2024-01-01', 'entreprise.siret': '98765432100002'}), ['DAT-2'])
+        self.assertEqual(self.references(**{'accident.date__in': '2024-03-02,2023-11-30'}), ['DAT-1', 'DAT-2'])
+
+    def test_other_keys_of_a_root_match_exactly(self):
+        self.assertEqual(self.references(**{'salarie.nom': 'Dupont'}), ['DAT-0', 'DAT-2'])
+        self.assertEqual(self.client.get(self.url, {'salarie.nom__icontains': 'dup'}).status_code, 400)
+
+    def test_unknown_paths_and_lookups_are_rejected(self):
+        for param in ('temoins.nom', 'salarie.adresse.ville', 'accident.date__regex', 'entreprise.'):
+            response = self.client.get(self.url, {param: 'x'})
+            self.assertEqual(response.status_code, 400, param)
+            self.assertIn(param, response.json())
+
+
+class ExportTests(TestCase):
+    url = reverse('praevia_api:dossier-export')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        for i in range(5):
+            dossier = DossierATMP.objects.create(
+                reference=f"DAT-{i}", created_by=cls.user, entreprise={'siret': f"1234567890000{i % 2}"},
+                salarie={'nom': 'Lefèvre', 'prenom': 'Zoé'}, accident={'lieu': 'Entrepôt, quai "B"'},
+            )
+            Contentieux.objects.create(dossier_atmp=dossier, reference=f"CONT-{i}", status='DRAFT', subject={'title': f"Litige {i}"})
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        with mock.patch.object(NDJSONRenderer, 'buffer_size', 1):  # one chunk per row
+            response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="dossier-export.ndjson"')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted(row['reference'] for row in rows), [f"DAT-{i}" for i in range(5)])
+        self.assertEqual(rows[0]['salarie'], {'nom': 'Lefèvre', 'prenom': 'Zoé'})
+
+    def test_csv(self):
+        response, body = self.export(format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        header, *rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(len(rows), 5)
+        row = dict(zip(header, rows[0]))
+        self.assertEqual(json.loads(row['accident']), {'lieu': 'Entrepôt, quai "B"'})  # quoted, not split
+        self.assertEqual(row['created_by'], str(self.user.pk))
+
+        _, body = self.export(reverse('praevia_api:contentieux-export'), format='csv')
+        self.assertEqual(len(body.splitlines()), 6)
+
+    def test_list_filters_apply(self):
+        _, body = self.export(**{'entreprise.siret': '12345678900001'})
+        self.assertEqual(sorted(json.loads(line)['reference'] for line in body.splitlines()), ['DAT-1', 'DAT-3'])
+        self.assertEqual(self.client.get(self.url, {'temoins.nom': 'x'}).status_code, 400)
+
+
+class ListQueryCountTests(TestCase):
+    """List pages must not run one query per row for to-many relations."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            i = DossierATMP.objects.count()
+            dossier = DossierATMP.objects.create(
+                reference=f"DAT-{i}", created_by=self.user, entreprise={}, salarie={}, accident={}
+            )
+            contentieux = Contentieux.objects.create(
+                dossier_atmp=dossier, reference=f"CONT-{i}", subject={}, status=ContentieuxStatus.DRAFT.value
+            )
+            document = Document.objects.create(
+                contentieux=contentieux, uploaded_by=self.user, document_type='AUTRE',
+                original_name=f"{i}.pdf", mime_type='application/pdf', size=1,
+            )
+            dossier.documents.add(document)
+            contentieux.documents.add(document)
+            contentieux.actions.add(Action.objects.create(name=f"Action {i}"))
+
+    def assertConstantQueries(self, url, num):
+        for count in (2, 8):
+            self.add_rows(count)
+            with self.assertNumQueries(num):
+                response = self.client.get(url, {'fields': '*'}, format='json')
+            self.assertEqual(len(response.json()['results']), DossierATMP.objects.count())
+
+    def test_dossier_list(self):
+        # ETag version, count, page, documents
+        self.assertConstantQueries(reverse('praevia_api:dossier-list'), 4)
+
+    def test_contentieux_list(self):
+        # ETag version, count, page, documents, actions
+        self.assertConstantQueries(reverse('praevia_api:contentieux-list'), 5)
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        DossierATMP.objects.create(
+            reference='DAT-1', created_by=cls.user, entreprise={'nom': 'ACME'}, salarie={}, accident={'type': 'AT'}
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('praevia_api:dossier-list')
+
+    def test_compact_list_by_default(self):
+        row = self.client.get(self.url).json()['results'][0]
+        self.assertEqual(set(row), {'id', 'reference', 'status', 'created_by', 'created_at', 'updated_at'})
+
+    def test_fields_and_exclude_push_down_to_only(self):
+        with CaptureQueriesContext(connection) as queries:
+            row = self.client.get(self.url, {'fields': 'reference,accident,documents', 'exclude': 'documents'}).json()['results'][0]
+        self.assertEqual(row, {'reference': 'DAT-1', 'accident': {'type': 'AT'}})
+        page_query = next(q['sql'] for q in queries if 'LIMIT' in q['sql'])
+        self.assertIn('"accident"', page_query)
+        self.assertNotIn('"entreprise"', page_query)
+        self.assertFalse(any('dossiers_atmp_documents' in q['sql'] for q in queries))
+
+    def test_unknown_field_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'fields': 'nope'}).status_code, 400)
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_matches_stdlib_output(self):
+        data = {
+            'when': datetime(2024, 6, 1, 8, 30, 12, 345678, tzinfo=dt_timezone.utc),
+            'day': date(2024, 6, 1),
+            'amount': Decimal('1234.56'),
+            'label': gettext_lazy('Dossier'),
+            'id': uuid.UUID(int=1),
+            1: ['é', '\u2028', None, 1.5],
+        }
+        for indent in (None, 4):
+            context = {'indent': indent}
+            self.assertEqual(
+                FastJSONRenderer().render(data, renderer_context=context),
+                JSONRenderer().render(data, renderer_context=context),
+            )
+
+    def test_parser(self):
+        self.assertEqual(FastJSONParser().parse(BytesIO('{"nom": "Élodie"}'.encode())), {'nom': 'Élodie'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"a": NaN}'))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cached_until_invalidated(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.auth.authenticate_credentials(self.token.key)[0], self.user)
+        with self.assertNumQueries(0):
+            self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_logout_revokes_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.auth.authenticate_credentials(self.token.key)
+        response = client.post(reverse('praevia_api:logout'), {'email': 'rh@example.com', 'password': 'rh123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+
+class PasswordHashPoolTests(TestCase):
+    def test_login_hashes_on_the_pool(self):
+        User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        before = password_hash_pool.stats()['completed']
+        response = APIClient().post(reverse('praevia_api:login'), {'email': 'rh@example.com', 'password': 'rh123'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(password_hash_pool.stats()['completed'], before + 1)
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    def test_rejects_beyond_capacity(self):
+        password_hash_pool.pending += 1  # a hash already running
+        try:
+            response = APIClient().post(reverse('praevia_api:login'), {'email': 'x@example.com', 'password': 'x'}, format='json')
+        finally:
+            password_hash_pool.pending -= 1
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(RESPONSE_CACHE_TTL=0)  # validators computed from the database
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        cls.dossier = DossierATMP.objects.create(
+            reference='DAT-1', created_by=cls.user, entreprise={}, salarie={}, accident={}
+        )
+        cls.audit = Audit.objects.create(dossier_atmp=cls.dossier, auditor=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertRevalidates(self, url, queries):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_detail_and_list(self):
+        detail = reverse('praevia_api:dossier-detail', args=[self.dossier.pk])
+        etag = self.assertRevalidates(detail, 1)
+        self.dossier.documents.add(Document.objects.create(
+            contentieux=Contentieux.objects.create(dossier_atmp=self.dossier, reference='CONT-1', subject={}, status='DRAFT'),
+            uploaded_by=self.user, document_type='AUTRE', original_name='a.pdf', mime_type='application/pdf', size=1,
+        ))
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.assertRevalidates(reverse('praevia_api:dossier-list'), 1)
+        self.assertRevalidates(reverse('praevia_api:dossier-list') + '?cursor=', 1)
+
+    def test_keyset_list_is_versioned_without_scanning_the_table(self):
+        url = reverse('praevia_api:dossier-list') + '?cursor='
+        with CaptureQueriesContext(connection) as queries:
+            etag = self.client.get(url)['ETag']
+        self.assertEqual([query['sql'] for query in queries if 'COUNT(' in query['sql'] or 'MAX(' in query['sql']], [])
+        DossierATMP.objects.filter(pk=self.dossier.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)  # a row of the page changed
+
+    def test_malformed_key_is_a_404(self):
+        for url in (reverse('praevia_api:dossier-detail', args=['abc']), reverse('praevia_api:contentieux-detail', args=['abc'])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 404)
+            self.assertNotIn('X-Cache', response)
+
+    def test_audit_by_dossier(self):
+        url = reverse('praevia_api:audit-by-dossier', args=[self.dossier.pk])
+        self.assertRevalidates(url, 1)
+
+    async def test_async_audit_by_dossier(self):
+        url = reverse('praevia_api:audit-by-dossier', args=[self.dossier.pk])
+        token = await Token.objects.acreate(user=self.user)
+        headers = {'Authorization': f"Token {token.key}"}
+        response = await async_views.audit_by_dossier_id(AsyncRequestFactory().get(url, headers=headers), self.dossier.pk)
+        self.assertEqual(json.loads(response.content)['id'], self.audit.pk)
+        request = AsyncRequestFactory().get(url, headers={**headers, 'If-None-Match': response['ETag']})
+        self.assertEqual((await async_views.audit_by_dossier_id(request, self.dossier.pk)).status_code, 304)
+
+
+@override_settings(RESPONSE_CACHE_TTL=300)  # off on locmem, but the test runs in a single process
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        cls.dossiers = [
+            DossierATMP.objects.create(reference=f"DAT-{i}", created_by=cls.user, entreprise={}, salarie={}, accident={})
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        response_cache.cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_detail_invalidated_by_its_own_row_only(self):
+        first, second = (reverse('praevia_api:dossier-detail', args=[d.pk]) for d in self.dossiers)
+        self.client.get(first), self.client.get(second)
+        with self.assertNumQueries(0):
+            response = self.client.get(first)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        etag = response['ETag']
+        self.assertEqual(self.client.get(first, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.dossiers[0].status = 'CLOTURE_SANS_SUITE'
+        self.dossiers[0].save()
+        response = self.client.get(first)
+        self.assertEqual((response['X-Cache'], response.json()['status']), ('MISS', 'CLOTURE_SANS_SUITE'))
+        self.assertEqual(self.client.get(second)['X-Cache'], 'HIT')
+
+    def test_detail_tag_uses_the_stored_key(self):
+        dossier = self.dossiers[0]
+        padded = reverse('praevia_api:dossier-detail', args=[f"0{dossier.pk}"])
+        self.client.get(padded)
+        self.assertEqual(self.client.get(padded)['X-Cache'], 'HIT')
+        dossier.status = 'CLOTURE_SANS_SUITE'
+        dossier.save()
+        response = self.client.get(padded)
+        self.assertEqual((response['X-Cache'], response.json()['status']), ('MISS', 'CLOTURE_SANS_SUITE'))
+
+    def test_list_invalidated_by_m2m_change(self):
+        url = reverse('praevia_api:dossier-list') + '?fields=id,documents'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        contentieux = Contentieux.objects.create(dossier_atmp=self.dossiers[0], reference='CONT-1', subject={}, status='DRAFT')
+        document = Document.objects.create(
+            contentieux=contentieux, uploaded_by=self.user, document_type='AUTRE',
+            original_name='a.pdf', mime_type='application/pdf', size=1,
+        )
+        self.client.get(url)
+        self.dossiers[1].documents.add(document)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn([document.pk], [row['documents'] for row in response.json()['results']])
+
+
+class SeedingTests(TestCase):
+    def test_chunks_are_deterministic_and_consistent(self):
+        user = User.objects.create_user(email='rh@example.com', username='rh', password=None, name='RH', role='RH')
+        generator = DossierGenerator(
+            seed=7, end=day_end(date(2025, 1, 1)), audits_ratio=0.6, contentieux_ratio=0.3,
+            documents_per_contentieux=2, creators=[user.pk], auditors=[user.pk], employers=5,
+        )
+        # A dossier's rows do not depend on the chunk it is generated in
+        self.assertEqual(generator.chunk(20, 20)[DossierATMP], generator.chunk(1, 40)[DossierATMP][19:20])
+
+        counts = seed_chunk(generator, 1, 40)
+        self.assertEqual(DossierATMP.objects.count(), 40)
+        self.assertEqual(Document.objects.count(), 2 * Contentieux.objects.count())
+        self.assertEqual(counts['documents'], Document.objects.count())
+        for contentieux in Contentieux.objects.select_related('dossier_atmp', 'dossier_atmp__audit_detail'):
+            self.assertEqual(contentieux.dossier_atmp.status, 'TRANSFORME_EN_CONTENTIEUX')
+            self.assertEqual(contentieux.dossier_atmp.audit_detail.decision, 'CONTEST')
+            self.assertEqual(contentieux.documents.count(), 2)
+        siret = DossierATMP.objects.first().entreprise['siret']
+        self.assertEqual(luhn_complete(siret[:-1]), siret)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='rh@example.com', username='rh', password='rh123', name='RH', role='RH')
+        DossierATMP.objects.create(reference='DAT-1', created_by=cls.user, entreprise={}, salarie={}, accident={})
+
+    def setUp(self):
+        registry.reset()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_DIR=directory.name, METRICS_TOKEN='scrape', RESPONSE_CACHE_TTL=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.directory = directory.name
+
+    def scrape(self):
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response.status_code, 200)
+        return dict(line.rsplit(' ', 1) for line in response.content.decode().splitlines() if not line.startswith('#'))
+
+    def test_route_histograms(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get(reverse('praevia_api:dossier-list'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        series = self.scrape()
+        labels = 'route="praevia_api:dossier-list",method="GET"'
+        self.assertEqual(series[f'praevia_http_requests_total{{{labels},status="200"}}'], '1')
+        self.assertGreater(float(series[f'praevia_http_request_db_queries_sum{{{labels}}}']), 0)
+        self.assertEqual(series[f'praevia_http_request_db_queries_bucket{{{labels},le="+Inf"}}'], '1')
+        self.assertGreater(float(series[f'praevia_http_request_serializer_duration_seconds_sum{{{labels}}}']), 0)
+
+    def test_dead_worker_snapshot_is_archived(self):
+        process = subprocess.Popen(['true'])
+        process.wait()
+        key = ('praevia_http_requests_total', 'praevia_api:dossier-list', 'GET', '200')
+        write_series(os.path.join(self.directory, f"{process.pid}-1.json"), {key: 5, ('praevia_password_hash_pending',): 3})
+
+        for _ in range(2):  # the second scrape reads it back from archive.json
+            series = self.scrape()
+            self.assertEqual(series['praevia_http_requests_total{route="praevia_api:dossier-list",method="GET",status="200"}'], '5')
+            self.assertEqual(series['praevia_password_hash_pending'], '0')  # gauges die with their worker
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f"{process.pid}-1.json")))
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        slow_query_log.clear()
+        self.addCleanup(slow_query_log.clear)
+        self.log = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'slow_queries.jsonl')
+        self.enterContext(override_settings(SLOW_QUERY_LOG=self.log))
+
+    def logged(self):
+        with open(self.log, encoding='utf-8') as log:
+            return [json.loads(line) for line in log]
+
+    def test_fingerprint_ignores_literal_values(self):
+        self.assertEqual(
+            normalize("SELECT *\n FROM \"T3\" WHERE id IN (%s, %s, %s) AND name = 'l''x' LIMIT 21"),
+            'SELECT * FROM "T3" WHERE id IN (...) AND name = ? LIMIT ?',
+        )
+        self.assertEqual(normalize('INSERT INTO t VALUES (%s, %s), (%s, %s)'), 'INSERT INTO t VALUES (...)')
+
+    def test_worst_run_is_explained_and_logged(self):
+        sql = 'SELECT "id" FROM "dossiers_atmp" WHERE "reference" = %s'
+        slow_query_log.record(connection, sql, ['DAT-1'], False, 250.0)
+        slow_query_log.record(connection, sql, ['DAT-2'], False, 120.0)
+        first, second = self.logged()
+        self.assertEqual(first['fingerprint'], second['fingerprint'])
+        self.assertTrue(first['plan'])
+        self.assertIsNone(second['plan'])  # not slower than the explained run
+
+        stats = slow_query_log.stats()
+        self.assertEqual([entry['ms'] for entry in stats['recent']], [120.0, 250.0])
+        self.assertEqual((stats['top'][0]['count'], stats['top'][0]['maxMs']), (2, 250.0))
+        self.assertEqual(stats['top'][0]['plan'], first['plan'])
+
+    @override_settings(SLOW_QUERY_MS=1)
+    def test_failed_statement_is_recorded_without_explain(self):
+        def execute(sql, params, many, context):
+            time.sleep(0.005)
+            raise IntegrityError('duplicate key')  # e.g. after a lock wait: the transaction is aborted
+
+        with self.assertRaisesMessage(IntegrityError, 'duplicate key'):
+            slow_query_log(execute, 'INSERT INTO "jobs" ("name") VALUES (%s)', ['x'], False, {'connection': connection})
+        [entry] = self.logged()
+        self.assertTrue(entry['failed'])
+        self.assertIsNone(entry['plan'])
+
+
+class SearchTests(TestCase):
+    url = reverse('praevia_api:search')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='juriste@example.com', username='juriste', password=None, name='Juriste', role='JURISTE')
+        cls.dossier = DossierATMP.objects.create(
+            reference='DAT-1', created_by=cls.user,
+            entreprise={'raisonSociale': 'Transports Lambert SAS'},
+            salarie={'nom': 'Dupont', 'prenom': 'Sophie'},
+            accident={'circonstances': "Chute dans l'escalier du dépôt", 'descriptionLesions': 'Entorse de la cheville'},
+        )
+        DossierATMP.objects.create(
+            reference='DAT-2', created_by=cls.user, entreprise={'raisonSociale': 'Boulangerie Martin'},
+            salarie={'nom': 'Martin', 'prenom': 'Paul'}, accident={'circonstances': 'Brûlure au four'},
+        )
+        cls.contentieux = Contentieux.objects.create(
+            dossier_atmp=cls.dossier, reference='CONT-1', status='DRAFT',
+            subject={'title': 'Contestation', 'description': 'Caractère professionnel contesté'},
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranked_hits_follow_saves(self):
+        hits = self.search(q='dupon')['results']
+        self.assertEqual({(hit['type'], hit['id']) for hit in hits}, {('dossier', self.dossier.pk), ('contentieux', self.contentieux.pk)})
+        hit, = self.search(q='escalier', type='dossier')['results']
+        self.assertIn('<mark>escalier</mark>', hit['highlight'])
+        self.assertEqual(self.search(q='professionnel')['results'][0]['reference'], 'CONT-1')
+
+        self.dossier.salarie = {'nom': 'Durand', 'prenom': 'Sophie'}
+        self.dossier.save()
+        self.assertEqual(self.search(q='dupont')['results'], [])
+        self.assertEqual(len(self.search(q='durand')['results']), 2)  # the contentieux follows its dossier
+
+        self.contentieux.delete()
+        self.assertEqual([hit['type'] for hit in self.search(q='durand')['results']], ['dossier'])
+
+    def test_pages_without_count(self):
+        first = self.search(q='dupont', page_size=1)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual((second['next'], len(second['results'])), (None, 1))
+        self.assertEqual({hit['type'] for hit in first['results'] + second['results']}, {'dossier', 'contentieux'})
+        self.assertTrue(second['previous'])
+        self.assertEqual(self.client.get(self.url, {'q': ''}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'type': 'audit'}).status_code, 400)
+
+
+@task('tests.flaky')
+def flaky_task(fail):
+    if fail:
+        raise RuntimeError('échec volontaire')
+    return {'ok': True}
+
+
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='juriste@example.com', username='juriste', password=None, name='Juriste', role='JURISTE')
+
+    def work(self):
+        worker = Worker('test:0', threading.Event(), poll_interval=0)
+        worker.run(burst=True)
+        return worker
+
+    def test_priority_then_age(self):
+        low = enqueue('tests.flaky', {'fail': False})
+        high = enqueue('tests.flaky', {'fail': False}, priority=5)
+        later = enqueue('tests.flaky', {'fail': False}, priority=9, delay=60)
+        worker = Worker('test:0', threading.Event())
+        self.assertEqual(worker.claim().pk, high.pk)
+        self.assertEqual(worker.claim().pk, low.pk)
+        self.assertIsNone(worker.claim())  # `later` is not due yet
+        later.refresh_from_db()
+        self.assertEqual(later.status, JobStatus.QUEUED.value)
+
+    @override_settings(JOB_RETRY_BASE_SECONDS=10)
+    def test_failures_back_off_then_fail(self):
+        job = enqueue('tests.flaky', {'fail': True}, max_attempts=2)
+        self.assertEqual(self.work().failed, 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.QUEUED.value, 1))
+        self.assertIn('échec volontaire', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=8))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.work()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.FAILED.value, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_database_error_while_recording_keeps_the_worker_alive(self):
+        enqueue('tests.flaky', {'fail': False})
+        worker = Worker('test:0', threading.Event(), poll_interval=0)
+        with mock.patch.object(Worker, 'record_success', side_effect=OperationalError('server closed the connection')), \
+                self.assertLogs('praevia_api.jobs', 'WARNING') as logs:
+            worker.run(burst=True)  # returns once the queue is empty instead of raising
+        self.assertIn('non enregistré', logs.output[0])
+        self.assertEqual(Job.objects.get().status, JobStatus.RUNNING.value)  # left to requeue_stale_jobs()
+
+    def test_finalize_prefer_async_returns_202(self):
+        dossier = DossierATMP.objects.create(reference='DAT-1', created_by=self.user, entreprise={}, salarie={}, accident={})
+        audit = Audit.objects.create(dossier_atmp=dossier, status=AuditStatus.IN_PROGRESS.value)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post(
+            reverse('praevia_api:finalize-audit', args=[audit.pk]), {'decision': 'CONTEST'},
+            format='json', HTTP_PREFER='respond-async',
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Contentieux.objects.exists())
+        self.assertEqual(response['Location'], response.json()['statusUrl'])
+
+        self.work()
+        job = client.get(response['Location']).json()
+        contentieux = Contentieux.objects.get(dossier_atmp=dossier)
+        self.assertEqual(job['status'], JobStatus.SUCCEEDED.value)
+        self.assertEqual(job['result'], {'contentieuxId': contentieux.pk, 'reference': contentieux.reference})
+
+        # Only the creator (or staff) sees the job
+        other = User.objects.create_user(email='rh@example.com', username='rh', password=None, name='RH', role='RH')
+        client.force_authenticate(other)
+        self.assertEqual(client.get(response['Location']).status_code, 404)
+
+
+def text_pdf(text):
+    """A one-page PDF with `text` (ASCII) in its text layer."""
+    content = f"BT /F1 18 Tf 72 760 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    return pdf + b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+
+class DocumentProcessingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='juriste@example.com', username='juriste', password=None, name='Juriste', role='JURISTE')
+        dossier = DossierATMP.objects.create(reference='DAT-1', created_by=cls.user, entreprise={}, salarie={}, accident={})
+        cls.contentieux = Contentieux.objects.create(dossier_atmp=dossier, reference='CONT-1', status='DRAFT', subject={})
+        cls.other = Contentieux.objects.create(
+            dossier_atmp=DossierATMP.objects.create(reference='DAT-2', created_by=cls.user, entreprise={}, salarie={}, accident={}),
+            reference='CONT-2', status='DRAFT', subject={},
+        )
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, contentieux, content):
+        response = self.client.post(reverse('praevia_api:upload_document'), {
+            'file': SimpleUploadedFile('dat.pdf', content, content_type='application/pdf'),
+            'contentieuxId': contentieux.pk, 'uploadedBy': self.user.pk, 'documentType': 'DAT',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['processing_status'], DocumentProcessingStatus.PENDING.value)
+        return Document.objects.get(pk=response.json()['id'])
+
+    def test_upload_is_processed_by_the_workers(self):
+        content = text_pdf('Chute depuis un echafaudage')
+        document = self.upload(self.contentieux, content)
+        duplicate = self.upload(self.other, content)
+        self.assertEqual(Job.objects.filter(name='documents.process').count(), 2)
+        download = reverse('praevia_api:download_document', args=[document.pk])
+        etag = self.client.get(download)['ETag']
+
+        Worker('test:0', threading.Event(), poll_interval=0).run(burst=True)
+        # The row changed, the file did not: a resume or revalidation still matches
+        self.assertEqual(self.client.get(download, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        for doc in (document, duplicate):  # the duplicate reuses the first analysis
+            doc.refresh_from_db()
+            self.assertEqual(doc.processing_status, DocumentProcessingStatus.PROCESSED.value)
+            self.assertEqual(doc.page_count, 1)
+            self.assertIn('echafaudage', doc.text)
+        self.assertEqual(document.thumbnail.name, duplicate.thumbnail.name)
+
+        thumbnail = self.client.get(reverse('praevia_api:document_thumbnail', args=[document.pk]))
+        self.assertEqual(thumbnail['Content-Type'], 'image/jpeg')
+        self.assertIn('no-cache', thumbnail['Cache-Control'])
+        self.assertTrue(b''.join(thumbnail.streaming_content).startswith(b'\xff\xd8'))
+        revalidated = self.client.get(reverse('praevia_api:document_thumbnail', args=[document.pk]), HTTP_IF_NONE_MATCH=thumbnail['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        hits = self.client.get(reverse('praevia_api:search'), {'q': 'echafaudage', 'type': 'contentieux'}).json()['results']
+        self.assertEqual({hit['id'] for hit in hits}, {self.contentieux.pk, self.other.pk})
+
+    @override_settings(DOCUMENT_PROCESS_WORKERS=1)
+    def test_timeout_kills_the_pool(self):
+        path = os.path.join(settings.MEDIA_ROOT, 'dat.pdf')
+        with open(path, 'wb') as file:
+            file.write(text_pdf('Expertise medicale'))
+        pool = DocumentProcessPool()
+        with mock.patch.object(DocumentProcessPool, 'terminate', wraps=DocumentProcessPool.terminate) as terminate:
+            with override_settings(DOCUMENT_PROCESS_TIMEOUT=0.001), self.assertRaises(TimeoutError):
+                pool.run(path, 'application/pdf')
+        hung = terminate.call_args.args[0]
+        self.assertIsNone(pool._pool)
+        self.assertTrue(hung._shutdown_thread)
+        self.assertEqual(pool.run(path, 'application/pdf')['page_count'], 1)  # a fresh pool
+        self.addCleanup(pool._pool.shutdown)
+
+    def test_unreadable_file_fails_without_retry(self):
+        document = self.upload(self.contentieux, b'%PDF-1.4 tronque')
+        Worker('test:0', threading.Event(), poll_interval=0).run(burst=True)
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, DocumentProcessingStatus.FAILED.value)
+        self.assertEqual(Job.objects.get(name='documents.process').status, JobStatus.SUCCEEDED.value)
+
+
+class ChunkedUploadTests(TestCase):
+    content = b'%PDF-1.4 ' + bytes(range(256)) * 40  # 10249 bytes: chunks of 4096, 4096, 2057
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='juriste@example.com', username='juriste', password=None, name='Juriste', role='JURISTE')
+        dossier = DossierATMP.objects.create(reference='DAT-1', created_by=cls.user, entreprise={}, salarie={}, accident={})
+        cls.contentieux = Contentieux.objects.create(dossier_atmp=dossier, reference='CONT-1', status='DRAFT', subject={})
+
+    def setUp(self):
+        for setting in ('MEDIA_ROOT', 'UPLOAD_TEMP_DIR'):
+            directory = tempfile.TemporaryDirectory()
+            self.addCleanup(directory.cleanup)
+            self.enterContext(override_settings(**{setting: directory.name}))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self, size=None):
+        response = self.client.post(reverse('praevia_api:chunked_upload'), {
+            'contentieuxId': self.contentieux.pk, 'uploadedBy': self.user.pk, 'documentType': 'DAT',
+            'fileName': 'expertise.pdf', 'mimeType': 'application/pdf', 'size': size or len(self.content),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['uploadId']
+
+    def put_chunk(self, upload_id, index, sha256=None):
+        chunk = self.content[index * 4096:(index + 1) * 4096]
+        headers = {'HTTP_X_CHUNK_SHA256': sha256} if sha256 else {}
+        return self.client.put(
+            reverse('praevia_api:chunked_upload_chunk', args=[upload_id, index]), chunk,
+            content_type='application/octet-stream', **headers,
+        )
+
+    def complete(self, upload_id, **data):
+        return self.client.post(reverse('praevia_api:chunked_upload_complete', args=[upload_id]), data, format='json')
+
+    def part_exists(self, upload_id):
+        return os.path.exists(os.path.join(settings.UPLOAD_TEMP_DIR, f"{upload_id}.part"))
+
+    def test_chunks_in_order_with_retries(self):
+        upload_id = self.start()
+        self.assertEqual(self.put_chunk(upload_id, 0, hashlib.sha256(self.content[:4096]).hexdigest()).json()['nextChunk'], 1)
+        retried = self.put_chunk(upload_id, 0)  # response lost, the client sends it again
+        self.assertEqual((retried.status_code, retried.json()['received']), (200, 4096))
+        skipped = self.put_chunk(upload_id, 2)
+        self.assertEqual(skipped.status_code, 409)
+        self.assertEqual(skipped.json()['message'], 'Chunk 1 attendu.')
+        self.assertEqual(self.complete(upload_id).status_code, 409)  # incomplete
+        self.put_chunk(upload_id, 1)
+        self.put_chunk(upload_id, 2)
+
+        state = self.client.get(reverse('praevia_api:chunked_upload_detail', args=[upload_id])).json()
+        self.assertEqual((state['received'], state['nextChunk']), (len(self.content), 3))
+        response = self.complete(upload_id, sha256=hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['sha256'], hashlib.sha256(self.content).hexdigest())
+        document = Document.objects.get(pk=response.json()['id'])
+        with document.file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertIn(document, self.contentieux.documents.all())
+        self.assertFalse(self.part_exists(upload_id))
+        self.assertEqual(self.complete(upload_id).json()['id'], document.pk)  # completing twice is harmless
+        self.assertEqual(self.put_chunk(upload_id, 2).status_code, 409)  # finalized
+
+    def test_checksum_mismatches(self):
+        upload_id = self.start()
+        self.assertEqual(self.put_chunk(upload_id, 0, '0' * 64).status_code, 400)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).received, 0)
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        response = self.complete(upload_id, sha256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(UploadSession.objects.get(pk=upload_id).document_id)
+        self.assertEqual(Document.objects.count(), 0)
+
+    def test_rejected_chunk_is_cut_from_the_part_file(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0)
+        self.assertEqual(self.put_chunk(upload_id, 1, '0' * 64).status_code, 400)
+        self.assertEqual(os.path.getsize(os.path.join(settings.UPLOAD_TEMP_DIR, f"{upload_id}.part")), 4096)
+        self.put_chunk(upload_id, 1)
+        self.put_chunk(upload_id, 2)
+        self.assertEqual(os.listdir(settings.UPLOAD_TEMP_DIR), [f"{upload_id}.part"])  # nothing spooled beside it
+        response = self.complete(upload_id, sha256=hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(response.status_code, 201)
+
+    def test_chunk_of_an_upload_already_being_written_is_refused(self):
+        upload_id = self.start()
+        with open(os.path.join(settings.UPLOAD_TEMP_DIR, f"{upload_id}.part"), 'r+b') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)  # another worker streaming chunk 0
+            self.assertEqual(self.put_chunk(upload_id, 0).status_code, 409)
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, 200)
+
+    def test_invalid_document_leaves_no_blob_behind(self):
+        upload_id = self.start()
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        with mock.patch.object(Document, 'full_clean', side_effect=ValidationError({'original_name': ['Invalide.']})):
+            self.assertEqual(self.complete(upload_id).status_code, 400)
+        storage = get_document_storage()
+        self.assertFalse(storage.exists(storage.blob_name(hashlib.sha256(self.content).hexdigest())))
+        self.assertEqual(Document.objects.count(), 0)
+
+    def test_abort_and_purge(self):
+        aborted = self.start()
+        self.put_chunk(aborted, 0)
+        self.assertEqual(self.client.delete(reverse('praevia_api:chunked_upload_detail', args=[aborted])).status_code, 204)
+        self.assertFalse(UploadSession.objects.filter(pk=aborted).exists())
+        self.assertFalse(self.part_exists(aborted))
+        self.assertEqual(self.put_chunk(aborted, 1).status_code, 404)
+
+        stale, fresh, done = self.start(), self.start(), self.start()
+        for index in range(3):
+            self.put_chunk(done, index)
+        self.complete(done)
+        UploadSession.objects.filter(pk__in=[stale, done]).update(updated_at=timezone.now() - timedelta(hours=25))
+        out = StringIO()
+        call_command('purge_upload_sessions', '--hours', '24', stdout=out)
+        self.assertIn('Purged 1 unfinished upload(s).', out.getvalue())
+        self.assertEqual(set(UploadSession.objects.values_list('pk', flat=True)), {uuid.UUID(fresh), uuid.UUID(done)})
+        self.assertFalse(self.part_exists(stale))
+        self.assertTrue(self.part_exists(fresh))
+
+
+class BlobDeduplicationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='juriste@example.com', username='juriste', password=None, name='Juriste', role='JURISTE')
+        dossier = DossierATMP.objects.create(reference='DAT-1', created_by=cls.user, entreprise={}, salarie={}, accident={})
+        cls.contentieux = Contentieux.objects.create(dossier_atmp=dossier, reference='CONT-1', status='DRAFT', subject={})
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.storage = get_document_storage()
+
+    def document(self, file, size=None):
+        return Document.objects.create(
+            contentieux=self.contentieux, uploaded_by=self.user, document_type='DAT',
+            original_name='cerfa.pdf', mime_type='application/pdf', size=size or file.size, file=file,
+        )
+
+    def refs(self, content):
+        return Blob.objects.get(sha256=hashlib.sha256(content).hexdigest()).ref_count
+
+    def test_same_content_is_stored_once_and_counted(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ids = [
+            client.post(reverse('praevia_api:upload_document'), {
+                'file': SimpleUploadedFile(name, b'%PDF-1.4 cerfa', content_type='application/pdf'),
+                'contentieuxId': self.contentieux.pk, 'uploadedBy': self.user.pk, 'documentType': 'DAT',
+            }).json()['id']
+            for name in ('cerfa.pdf', 'copie.pdf')
+        ]
+        first, second = Document.objects.filter(pk__in=ids)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(first.file.name, self.storage.blob_name(first.sha256))
+        self.assertEqual(self.refs(b'%PDF-1.4 cerfa'), 2)
+
+        second.file = ContentFile(b'%PDF-1.4 expertise', name='expertise.pdf')
+        second.save()
+        self.assertEqual((self.refs(b'%PDF-1.4 cerfa'), self.refs(b'%PDF-1.4 expertise')), (1, 1))
+        second.delete()
+        first.delete()
+        self.assertEqual((self.refs(b'%PDF-1.4 cerfa'), self.refs(b'%PDF-1.4 expertise')), (0, 0))
+        self.assertTrue(self.storage.exists(first.file.name))  # until the garbage collection
+
+    def test_gc_deletes_idle_unreferenced_blobs_only(self):
+        kept = self.document(ContentFile(b'%PDF-1.4 kept', name='kept.pdf'))
+        idle = self.document(ContentFile(b'%PDF-1.4 idle', name='idle.pdf'))
+        recent = self.document(ContentFile(b'%PDF-1.4 recent', name='recent.pdf'))
+        idle.delete()
+        recent.delete()
+        Blob.objects.filter(sha256=idle.sha256).update(updated_at=timezone.now() - timedelta(hours=2))
+        Blob.objects.filter(sha256=kept.sha256).update(updated_at=timezone.now() - timedelta(hours=2))
+
+        out = StringIO()
+        call_command('dedupe_documents', '--gc', '--grace-minutes', '60', stdout=out)
+        self.assertIn('Deleted 1 unreferenced blob(s).', out.getvalue())
+        self.assertEqual(set(Blob.objects.values_list('sha256', flat=True)), {kept.sha256, recent.sha256})
+        self.assertFalse(self.storage.exists(idle.file.name))
+        self.assertTrue(self.storage.exists(kept.file.name))
+        self.assertTrue(self.storage.exists(recent.file.name))
+
+    def test_legacy_files_move_into_the_blob_store(self):
+        # Stored under their upload name before the blob store existed
+        names = ['documents/cerfa.pdf', 'documents/cerfa_copie.pdf']
+        os.makedirs(self.storage.path('documents'))
+        for name in names:
+            with open(self.storage.path(name), 'wb') as file:
+                file.write(b'%PDF-1.4 ancien')
+        legacy = [self.document(name, size=15) for name in names]
+        self.assertEqual([document.sha256 for document in legacy], ['', ''])
+
+        out = StringIO()
+        call_command('dedupe_documents', stdout=out)
+        self.assertIn('Migrated 2 document(s), skipped 0.', out.getvalue())
+        sha256 = hashlib.sha256(b'%PDF-1.4 ancien').hexdigest()
+        for document in legacy:
+            document.refresh_from_db()
+            self.assertEqual((document.sha256, document.file.name), (sha256, self.storage.blob_name(sha256)))
+        self.assertEqual(self.refs(b'%PDF-1.4 ancien'), 2)
+        self.assertFalse(any(self.storage.exists(name) for name in names))
+
+
+class DocumentDownloadTests(TestCase):
+    content = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='juriste@example.com', username='juriste', password=None, name='Juriste', role='JURISTE')
+        dossier = DossierATMP.objects.create(reference='DAT-1', created_by=cls.user, entreprise={}, salarie={}, accident={})
+        cls.contentieux = Contentieux.objects.create(dossier_atmp=dossier, reference='CONT-1', status='DRAFT', subject={})
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.document = Document.objects.create(
+            contentieux=self.contentieux, uploaded_by=self.user, document_type='DAT', original_name='arrêt.pdf',
+            mime_type='application/pdf', size=len(self.content), file=ContentFile(self.content, name='arret.pdf'),
+        )
+        self.url = reverse('praevia_api:download_document', args=[self.document.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_whole_file_and_revalidation(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, self.content))
+        self.assertEqual(response['ETag'], f'"{self.document.sha256}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn("filename*=utf-8''arr%C3%AAt.pdf", response['Content-Disposition'])
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"autre"')[0].status_code, 200)
+
+    def test_ranges(self):
+        for header, start, end in (('bytes=10-19', 10, 19), ('bytes=1000-', 1000, 1023), ('bytes=-100', 924, 1023), ('bytes=1000-5000', 1000, 1023)):
+            response, body = self.get(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response['Content-Range'], f"bytes {start}-{end}/1024")
+            self.assertEqual(body, self.content[start:end + 1])
+
+        for header in ('bytes=1024-', 'bytes=-0'):
+            response, _ = self.get(HTTP_RANGE=header)
+            self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */1024'))
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-1,5-6')[0].status_code, 200)  # multi-range: whole file
+
+    def test_if_range(self):
+        etag = self.get()[0]['ETag']
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)[0].status_code, 206)
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"ancienne-version"')
+        self.assertEqual((response.status_code, body), (200, self.content))  # changed since: the whole new file
+        response, _ = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='Thu, 01 Jan 2015 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(DOCUMENT_DOWNLOAD_MODE='x-accel-redirect', DOCUMENT_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f"/protected-media/{self.document.file.name}")
+        self.assertEqual(body, b'')
+        self.assertEqual(response['ETag'], f'"{self.document.sha256}"')
+
+    @override_settings(DOCUMENT_DOWNLOAD_MODE='x-sendfile')
+    def test_x_sendfile(self):
+        response, body = self.get()
+        self.assertEqual(response['X-Sendfile'], self.document.file.path)
+        self.assertEqual(body, b'')
@@ -0,0 +1,211 @@
+# /home/siisi/praevia_gemini/praevia_api/uploads.py
+
+import fcntl
+import hashlib
+import os
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from rest_framework import status
+
+from .models import Blob, Document, UploadSession
+from .storage import file_sha256
+
+BLOCK_SIZE = 64 * 1024
+
+# In-process SHA-256 state per upload: (hasher, bytes hashed so far). hashlib
+# objects cannot be persisted, so when a chunk lands on another worker the
+# entry is dropped and the file is hashed once more on completion.
+_hashers = OrderedDict()
+_MAX_HASHERS = 256
+
+
+class ChunkedUploadError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _TemporaryFile(File):
+    """Lets the storage move the assembled file instead of copying it."""
+    def temporary_file_path(self):
+        return self.name
+
+
+class ChunkedUploadService:
+    """
+    Resumable uploads: init -> PUT chunk 0..N-1 (in order, retries allowed) -> complete.
+    Chunks are streamed into the .part file in BLOCK_SIZE pieces, so a worker
+    holds at most one block per upload whatever the file size, and each byte
+    is written once before the storage moves the file.
+    """
+
+    @staticmethod
+    def part_path(session_id):
+        return os.path.join(settings.UPLOAD_TEMP_DIR, f"{session_id}.part")
+
+    @classmethod
+    def start(cls, **fields):
+        if not 0 < fields['size'] <= settings.UPLOAD_MAX_SIZE:
+            raise ChunkedUploadError(f"La taille doit être comprise entre 1 et {settings.UPLOAD_MAX_SIZE} octets.")
+        os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+        session = UploadSession.objects.create(**fields)
+        open(cls.part_path(session.pk), 'wb').close()
+        return session
+
+    @staticmethod
+    def is_retry(session, index):
+        """True for a chunk we already have; raises for a finalized upload or a chunk out of order."""
+        if session.document_id:
+            raise ChunkedUploadError("Upload déjà finalisé.", status.HTTP_409_CONFLICT)
+        if index > session.chunks:
+            raise ChunkedUploadError(f"Chunk {session.chunks} attendu.", status.HTTP_409_CONFLICT)
+        return index < session.chunks
+
+    @classmethod
+    def receive_chunk(cls, session_id, index, stream, expected_sha256=None):
+        """
+        Streams the request body straight into the .part file at the chunk's
+        offset, outside any transaction (slow clients hold no row lock). An
+        flock on the .part file keeps two requests of one upload from writing
+        at once; the counters only move once the whole chunk is written and checked.
+        """
+        if stream is None:  # DRF gives no stream for an empty body
+            raise ChunkedUploadError("Chunk vide.")
+        session = UploadSession.objects.get(pk=session_id)
+        if cls.is_retry(session, index):
+            return session
+        try:
+            part = open(cls.part_path(session_id), 'r+b')
+        except FileNotFoundError:
+            raise UploadSession.DoesNotExist  # aborted meanwhile
+        with part:
+            try:
+                fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ChunkedUploadError("Un chunk de cet upload est déjà en cours de réception.", status.HTTP_409_CONFLICT)
+            session.refresh_from_db()  # another request may have written it before we got the lock
+            if cls.is_retry(session, index):
+                return session
+
+            chunk_size = cls.write(session, part, stream, expected_sha256)
+            with transaction.atomic():
+                session = UploadSession.objects.select_for_update().get(pk=session_id)
+                session.received += chunk_size
+                session.chunks += 1
+                session.save(update_fields=['received', 'chunks', 'updated_at'])
+        return session
+
+    @staticmethod
+    def write(session, part, stream, expected_sha256=None):
+        """Writes one chunk at session.received, hashing it as it goes; returns its size."""
+        offset = session.received
+        hasher, hashed = _hashers.pop(session.pk, (None, None))
+        if offset == 0:
+            hasher, hashed = hashlib.sha256(), 0
+        elif hashed != offset:
+            hasher = None
+
+        digest, size = hashlib.sha256(), 0
+        # Drop whatever a rejected or crashed attempt left past the last committed chunk
+        part.truncate(offset)
+        part.seek(offset)
+        try:
+            for block in iter(lambda: stream.read(BLOCK_SIZE), b''):
+                size += len(block)
+                if size > settings.UPLOAD_CHUNK_MAX_SIZE:
+                    raise ChunkedUploadError(
+                        f"Chunk trop volumineux (maximum {settings.UPLOAD_CHUNK_MAX_SIZE} octets).",
+                        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    )
+                if offset + size > session.size:
+                    raise ChunkedUploadError("Les chunks dépassent la taille annoncée.")
+                digest.update(block)
+                part.write(block)
+                if hasher is not None:
+                    hasher.update(block)
+            if not size:
+                raise ChunkedUploadError("Chunk vide.")
+            if expected_sha256 and expected_sha256.lower() != digest.hexdigest():
+                raise ChunkedUploadError("Somme de contrôle du chunk invalide.")
+        except Exception:
+            part.truncate(offset)  # the hasher saw the rejected bytes: it is not kept
+            raise
+
+        if hasher is not None:
+            _hashers[session.pk] = (hasher, offset + size)
+            while len(_hashers) > _MAX_HASHERS:
+                _hashers.popitem(last=False)
+        return size
+
+    @classmethod
+    def file_sha256(cls, session):
+        hasher, hashed = _hashers.pop(session.pk, (None, None))
+        if hasher is not None and hashed == session.size:
+            return hasher.hexdigest()
+        return file_sha256(cls.part_path(session.pk), BLOCK_SIZE)
+
+    @classmethod
+    def complete(cls, session_id, expected_sha256=None):
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update(of=('self',)).select_related('contentieux').get(pk=session_id)
+            if session.document_id:
+                return session  # completing twice is harmless
+            if session.received != session.size:
+                raise ChunkedUploadError(
+                    f"Upload incomplet: {session.received}/{session.size} octets reçus.", status.HTTP_409_CONFLICT
+                )
+
+            session.sha256 = cls.file_sha256(session)
+            if expected_sha256 and expected_sha256.lower() != session.sha256:
+                # The chunks are kept: the client can abort and start over
+                raise ChunkedUploadError("Somme de contrôle du fichier invalide.")
+            document = Document(
+                contentieux=session.contentieux,
+                uploaded_by_id=session.uploaded_by_id,
+                document_type=session.document_type,
+                original_name=session.original_name,
+                mime_type=session.mime_type,
+                size=session.size,
+            )
+            storage = document.file.storage
+            stored = storage.exists(storage.blob_name(session.sha256))
+            with open(cls.part_path(session.pk), 'rb') as part:
+                assembled = _TemporaryFile(part, name=part.name)
+                assembled.sha256 = session.sha256  # spares the storage a second hashing pass
+                document.file.save(session.original_name, assembled, save=False)
+            if os.path.exists(cls.part_path(session.pk)):
+                os.remove(cls.part_path(session.pk))  # content was already stored (deduplicated)
+            try:
+                document.full_clean()
+            except ValidationError:
+                # No Document counts the blob we just moved in: the garbage collector would never see it
+                if not stored and not Blob.objects.filter(sha256=session.sha256).exists():
+                    storage.delete(document.file.name)
+                raise
+            document.save()
+            session.contentieux.documents.add(document)
+
+            session.document = document
+            session.save(update_fields=['sha256', 'document', 'updated_at'])
+        return session
+
+    @classmethod
+    def abort(cls, session_id):
+        _hashers.pop(session_id, None)
+        UploadSession.objects.filter(pk=session_id, document__isnull=True).delete()
+        if os.path.exists(cls.part_path(session_id)):
+            os.remove(cls.part_path(session_id))
+
+    @classmethod
+    def purge(cls, older_than):
+        """Deletes unfinished sessions last touched before `older_than`, returns how many."""
+        stale = list(
+            UploadSession.objects.filter(document__isnull=True, updated_at__lt=older_than).values_list('pk', flat=True)
+        )
+        for session_id in stale:
+            cls.abort(session_id)
+        return len(stale)
@@ -1,5 +1,6 @@
 # /home/siisi/praevia_gemini/praevia_api/urls.py
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -12,12 +13,35 @@ from .views import (
     get_direction_dashboard_data,
     DocumentUploadView,
     DocumentDownloadView,
+    DocumentThumbnailView,
+    ChunkedUploadInitView,
+    ChunkedUploadView,
+    ChunkedUploadChunkView,
+    ChunkedUploadCompleteView,
+    ResponseCacheStatsView,
+    SlowQueriesView,
+    SearchView,
+    JobView,
     DossierATMPViewSet,
     ContentieuxViewSet,
     AuditViewSet,
     DocumentViewSet
 )
-from .auth_views import UserViewSet, LoginView, LogoutView
+from .auth_views import UserViewSet, LoginView, LogoutView, PasswordHashStatsView
+
+audit_by_dossier_id = AuditByDossierIdView.as_view()
+download_document = DocumentDownloadView.as_view()
+
+if settings.ASYNC_VIEWS:
+    # Served by uvicorn (praevia_core.asgi): the I/O-bound endpoints as coroutines
+    from .async_views import (
+        audit_by_dossier_id,
+        download_document,
+        get_jurist_dashboard_data,
+        get_rh_dashboard_data,
+        get_qse_dashboard_data,
+        get_direction_dashboard_data,
+    )
 
 app_name = 'praevia_api'
 
@@ -36,7 +60,16 @@ urlpatterns = [
     # Authentication
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('auth/password-hashing/', PasswordHashStatsView.as_view(), name='password_hash_stats'),
+    path('cache/stats/', ResponseCacheStatsView.as_view(), name='response_cache_stats'),
+    path('db/slow-queries/', SlowQueriesView.as_view(), name='slow_queries'),
     
+    # Full-text search
+    path('search/', SearchView.as_view(), name='search'),
+
+    # Background jobs
+    path('jobs/<int:job_id>/', JobView.as_view(), name='job-detail'),
+
     # Dashboard endpoints
     path('dashboard/juridique/', get_jurist_dashboard_data, name='jurist_dashboard_data'),
     path('dashboard/rh/', get_rh_dashboard_data, name='rh_dashboard_data'),
@@ -44,10 +77,17 @@ urlpatterns = [
     path('dashboard/direction/', get_direction_dashboard_data, name='direction_dashboard_data'),
 
     # Special case endpoints
-    path('dossiers/<int:dossier_id>/audit/', AuditByDossierIdView.as_view(), name='audit-by-dossier'),
+    path('dossiers/<int:dossier_id>/audit/', audit_by_dossier_id, name='audit-by-dossier'),
     path('audits/<int:audit_id>/finalize/', AuditFinalizeView.as_view(), name='finalize-audit'),
     path('documents/upload/', DocumentUploadView.as_view(), name='upload_document'),
-    path('documents/<int:document_id>/download/', DocumentDownloadView.as_view(), name='download_document'),
+    path('documents/<int:document_id>/download/', download_document, name='download_document'),
+    path('documents/<int:document_id>/thumbnail/', DocumentThumbnailView.as_view(), name='document_thumbnail'),
+
+    # Resumable chunked uploads
+    path('documents/uploads/', ChunkedUploadInitView.as_view(), name='chunked_upload'),
+    path('documents/uploads/<uuid:upload_id>/', ChunkedUploadView.as_view(), name='chunked_upload_detail'),
+    path('documents/uploads/<uuid:upload_id>/chunks/<int:index>/', ChunkedUploadChunkView.as_view(), name='chunked_upload_chunk'),
+    path('documents/uploads/<uuid:upload_id>/complete/', ChunkedUploadCompleteView.as_view(), name='chunked_upload_complete'),
     
     # Include router URLs
     path('', include(router.urls)),
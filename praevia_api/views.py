@@ -1,7 +1,7 @@
 # /home/siisi/praevia_gemini/praevia_api/views.py
 
-from rest_framework import status, viewsets, renderers, parsers
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework import status, viewsets, parsers
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -9,24 +9,43 @@ from rest_framework.decorators import action
 from rest_framework.routers import DefaultRouter, APIRootView
 from rest_framework.reverse import reverse # Needed for CustomAPIRootView if you customize it
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from django.utils.text import slugify
+from django.utils.http import quote_etag
 import os
-from datetime import datetime, timezone
+from datetime import datetime
+from django.utils import timezone
 import logging
 from django.conf import settings
 from django.http import FileResponse, Http404
+from django.db import transaction
 from django.db.models import Count # Import Count for aggregation
 
 from.models import (
-    ContentieuxStatus, User, Audit, Contentieux, Document, DossierATMP,
-    AuditDecision, AuditStatus, DossierStatus, DocumentType
+    ContentieuxStatus, User, Audit, Contentieux, Document, DossierATMP, Job, UploadSession,
+    AuditDecision, AuditStatus, DossierStatus, DocumentType, SearchEntryKind
 )
 from.serializers import (
     AuditSerializer, ContentieuxSerializer,
-    DocumentSerializer, DossierATMPSerializer
+    DocumentSerializer, DossierATMPSerializer,
+    AuditListSerializer, ContentieuxListSerializer,
+    DocumentListSerializer, DossierATMPListSerializer, JobSerializer
 )
-from.services import ContentieuxService
+from.services import ContentieuxService, DashboardAggregateService, DossierBulkService, JuristDashboardService
+from.pagination import KeysetPagination
+from.filters import JSONFieldFilterBackend
+from.exports import StreamingExportMixin
+from.prefetch import EagerLoadingMixin
+from.fieldsets import SparseFieldsetMixin
+from.conditional import ConditionalGetMixin, not_modified, representation_etag, set_validators
+from.caching import ResponseCacheMixin, cache_response, response_cache
+from.references import next_contentieux_reference, next_dossier_reference
+from.downloads import document_response
+from.uploads import ChunkedUploadError, ChunkedUploadService
+from.slowqueries import slow_query_log
+from.search import SearchService
+from.jobs import accepted_response, enqueue, prefers_async
 
 logger = logging.getLogger(__name__)
 
@@ -97,27 +116,168 @@ class RootAPIView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+# --- Response cache metrics ---
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats(), status=status.HTTP_200_OK)
+
+
+# --- Slow queries (this worker's ring buffer; `manage.py slow_queries` reads every worker's log) ---
+class SlowQueriesView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(slow_query_log.stats(), status=status.HTTP_200_OK)
+
+
+# --- Background jobs (202 responses point here) ---
+class JobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        jobs = Job.objects.all()
+        if not request.user.is_staff:
+            jobs = jobs.filter(created_by=request.user)
+        try:
+            job = jobs.get(pk=job_id)
+        except Job.DoesNotExist:
+            return Response({"message": "Tâche non trouvée."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(JobSerializer(job).data, status=status.HTTP_200_OK)
+
+
 # --- Dossier Views ---
-class DossierATMPViewSet(viewsets.ModelViewSet):
+class DossierATMPViewSet(EagerLoadingMixin, SparseFieldsetMixin, ResponseCacheMixin, ConditionalGetMixin, StreamingExportMixin, viewsets.ModelViewSet):
     queryset = DossierATMP.objects.all().order_by('-created_at')
     serializer_class = DossierATMPSerializer
+    list_serializer_class = DossierATMPListSerializer
     permission_classes = [IsAuthenticated]
-    
-    # Use DRF's default renderer classes
-    renderer_classes = [
-        renderers.JSONRenderer,
-        renderers.BrowsableAPIRenderer,
-    ]
+    pagination_class = KeysetPagination
+    filter_backends = [JSONFieldFilterBackend]
+    json_filter_fields = {
+        'entreprise.siret': 'entreprise_siret',
+        'salarie.numeroSecu': 'salarie_numero_secu',
+        'accident.date': 'accident_date',
+        'accident.lieu': 'accident_lieu',
+    }
+    json_filter_roots = ('entreprise', 'salarie', 'accident')
+    bulk_max_items = 1000
+
+    # Saves and deletes in a transaction: the row and its dashboard delta (signals.py) commit together
+    def perform_create(self, serializer):
+        reference = next_dossier_reference()  # outside: a rollback must not reuse the block
+        with transaction.atomic():
+            serializer.save(reference=reference)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        POST /praevia/api/dossiers/bulk/[?allow_partial=true]
+        Body: a JSON list of dossiers. Without allow_partial, one invalid row rejects the whole batch.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({"message": "Une liste non vide de dossiers est attendue."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.bulk_max_items:
+            return Response({"message": f"Maximum {self.bulk_max_items} dossiers par requête."}, status=status.HTTP_400_BAD_REQUEST)
+
+        allow_partial = request.query_params.get('allow_partial', '').lower() in ('1', 'true')
+        try:
+            valid_rows, errors = DossierBulkService.validate(items)
+            if errors and not allow_partial:
+                return Response({"created": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            dossiers = DossierBulkService.create(valid_rows) if valid_rows else []
+            created = [
+                {"index": index, "id": dossier.id, "reference": dossier.reference}
+                for (index, _), dossier in zip(valid_rows, dossiers)
+            ]
+            return Response(
+                {"created": created, "errors": errors},
+                status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Erreur lors de la création groupée de dossiers: {e}")
+            return Response({"message": "Erreur lors de la création groupée de dossiers."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+# --- Search ---
+class SearchView(APIView):
+    """
+    GET /praevia/api/search/?q=dupont chute&type=dossier|contentieux&page=2&page_size=20
+
+    Ranked hits over employee and company names, accident circumstances and
+    injuries, and contentieux subjects. Pages are fetched with one extra row
+    instead of a COUNT(*), so there is no total.
+    """
+    permission_classes = [IsAuthenticated]
+    max_page_size = 100
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        kind = request.query_params.get('type') or None
+        if not text:
+            return Response({"message": "Le paramètre q est requis."}, status=status.HTTP_400_BAD_REQUEST)
+        if kind and kind not in dict(SearchEntryKind.choices()):
+            return Response({"message": f"Type inconnu: {kind}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = min(int(request.query_params.get('page_size', api_settings.PAGE_SIZE)), self.max_page_size)
+            if page < 1 or page_size < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"message": "page et page_size doivent être des entiers positifs."}, status=status.HTTP_400_BAD_REQUEST)
+
+        hits = SearchService.search(text, kind, limit=page_size + 1, offset=(page - 1) * page_size)
+        url = request.build_absolute_uri()
+        previous = None
+        if page > 1:
+            previous = replace_query_param(url, 'page', page - 1) if page > 2 else remove_query_param(url, 'page')
+        return Response({
+            "next": replace_query_param(url, 'page', page + 1) if len(hits) > page_size else None,
+            "previous": previous,
+            "results": [
+                {
+                    "type": hit['kind'],
+                    "id": hit['object_id'],
+                    "dossierId": hit['dossier_atmp_id'],
+                    "reference": hit['reference'],
+                    "names": hit['names'],
+                    "rank": round(hit['rank'], 4) if hit['rank'] is not None else None,
+                    "highlight": hit['highlight'],
+                }
+                for hit in hits[:page_size]
+            ],
+        }, status=status.HTTP_200_OK)
 
 
 # --- Audit Views (APIView subclasses) ---
 class AuditByDossierIdView(APIView):
     def get(self, request, dossier_id):
         try:
-            dossier = DossierATMP.objects.get(id=dossier_id)
-            audit = dossier.audit_detail # Accessing the reverse relation
+            # Answer conditional requests from updated_at alone, before loading the audit
+            version = Audit.objects.filter(dossier_atmp_id=dossier_id).values_list('pk', 'updated_at').first()
+            if version is None:
+                raise Audit.DoesNotExist
+            audit_id, updated_at = version
+            etag = representation_etag(request, 'audit', audit_id, updated_at.isoformat())
+            response = not_modified(request, etag, updated_at)
+            if response is not None:
+                return response
+
+            audit = Audit.objects.get(id=audit_id)
             serializer = AuditSerializer(audit)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return set_validators(Response(serializer.data, status=status.HTTP_200_OK), etag, updated_at)
         except ObjectDoesNotExist:
             return Response({"message": "Aucun audit trouvé pour ce dossier ou dossier AT/MP non trouvé."}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -131,11 +291,12 @@ class AuditUpdateView(APIView):
             audit = Audit.objects.get(id=audit_id)
             serializer = AuditSerializer(audit, data=request.data, partial=True)
             if serializer.is_valid():
-                updated_audit = serializer.save()
+                with transaction.atomic():
+                    updated_audit = serializer.save()
 
-                dossier = updated_audit.dossier_atmp
-                dossier.status = updated_audit.status
-                dossier.save()
+                    dossier = updated_audit.dossier_atmp
+                    dossier.status = updated_audit.status
+                    dossier.save()
 
                 return Response(AuditSerializer(updated_audit).data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -167,13 +328,21 @@ class AuditFinalizeView(APIView):
             audit.status = AuditStatus.COMPLETED.value
             audit.decision = decision.value
             audit.completed_at = timezone.now()
-            audit.save()
+            with transaction.atomic():
+                audit.save()
 
-            dossier = audit.dossier_atmp
-            dossier.status = DossierStatus.ANALYSE_EN_COURS.value
-            dossier.save()
+                dossier = audit.dossier_atmp
+                dossier.status = DossierStatus.ANALYSE_EN_COURS.value
+                dossier.save()
 
             new_contentieux = None
+            if decision == AuditDecision.CONTEST and prefers_async(request):
+                # Prefer: respond-async: the contentieux is created by a worker, poll statusUrl
+                job = enqueue('contentieux.create_from_audit', {'audit_id': audit.pk}, priority=10, user=request.user)
+                return accepted_response(
+                    request, job, "Audit finalisé, création du contentieux en cours.",
+                    audit=AuditSerializer(audit).data,
+                )
             if decision == AuditDecision.CONTEST:
                 new_contentieux = ContentieuxService.create_from_audit(audit, dossier)
                 contentieux_serializer = ContentieuxSerializer(new_contentieux)
@@ -224,15 +393,13 @@ class ContentieuxDetailView(APIView):
 class ContentieuxCreateView(APIView):
     def post(self, request):
         try:
-            reference = f"CONT-{int(datetime.now().timestamp())}"
             new_contentieux_data = {
                 **request.data,
-                'reference': reference,
                 'status': ContentieuxStatus.DRAFT.value,
             }
             serializer = ContentieuxSerializer(data=new_contentieux_data)
             if serializer.is_valid():
-                contentieux = serializer.save()
+                contentieux = serializer.save(reference=next_contentieux_reference())
                 return Response(ContentieuxSerializer(contentieux).data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -242,14 +409,22 @@ class ContentieuxCreateView(APIView):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_response('dashboard-juridique', ['dashboards'], timeout=settings.DASHBOARD_CACHE_TTL)
 def get_jurist_dashboard_data(request):
     """
     GET /praevia/api/dashboard/juridique/
     """
-    return Response(
-        {"message": "Jurist dashboard data (not implemented)"},
-        status=status.HTTP_200_OK
-    )
+    try:
+        # Served from the response cache until a dossier, audit or contentieux changes
+        data = JuristDashboardService.get_dashboard_data()
+        return Response(data, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération des données du tableau de bord Juridique: {e}")
+        return Response(
+            {"message": "Erreur lors de la récupération des données du tableau de bord Juridique."},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
 
 
 @api_view(['GET'])
@@ -278,29 +453,15 @@ def get_qse_dashboard_data(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_response('dashboard-direction', ['dashboards'], timeout=settings.DASHBOARD_CACHE_TTL)
 def get_direction_dashboard_data(request):
     """
     GET /praevia/api/dashboard/direction/
     """
     try:
-        open_dossiers = DossierATMP.objects.exclude(
-            status=DossierStatus.CLOTURE_SANS_SUITE.value
-        ).count()
-        total_dossiers = DossierATMP.objects.count()
-        estimated_risk_per_case = 5000
-        total_risk_value = open_dossiers * estimated_risk_per_case
-
-        # If you later need real case-type distribution, query your JSONField here.
-        case_type_distribution = []
-
-        return Response({
-            "stats": {
-                "openDossiers": open_dossiers,
-                "totalDossiers": total_dossiers,
-                "totalRiskValue": total_risk_value,
-            },
-            "caseTypeDistribution": case_type_distribution,
-        }, status=status.HTTP_200_OK)
+        # Counters maintained by signals.py, see DashboardAggregateService
+        data = DashboardAggregateService.get_direction_dashboard()
+        return Response(data, status=status.HTTP_200_OK)
 
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des données du tableau de bord Direction: {e}")
@@ -342,10 +503,11 @@ class DocumentUploadView(APIView):
                 size=uploaded_file.size
             )
             new_document.full_clean()
-            new_document.save()
-
-            contentieux.documents.add(new_document)
-            contentieux.save()
+            # The row, its processing job (signals.py) and the contentieux link commit together
+            with transaction.atomic():
+                new_document.save()
+                contentieux.documents.add(new_document)
+                contentieux.save()
 
             serializer = DocumentSerializer(new_document)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -357,18 +519,123 @@ class DocumentUploadView(APIView):
             logger.error(f"Error uploading document: {e}")
             return Response({"message": "Erreur lors de l'upload du document."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class ChunkedUploadInitView(APIView):
+    """
+    POST /praevia/api/documents/uploads/
+    Body: contentieuxId, uploadedBy, documentType, fileName, mimeType, size (total bytes).
+    """
+    def post(self, request):
+        contentieux_id = request.data.get('contentieuxId')
+        uploaded_by_id = request.data.get('uploadedBy')
+        document_type_value = request.data.get('documentType')
+        file_name = request.data.get('fileName')
+        size = request.data.get('size')
+
+        if not all([contentieux_id, uploaded_by_id, document_type_value, file_name, size]):
+            return Response({"message": "Missing required upload fields (contentieuxId, uploadedBy, documentType, fileName, size)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            contentieux = Contentieux.objects.get(id=contentieux_id)
+            uploaded_by = User.objects.get(id=uploaded_by_id)
+            document_type = DocumentType(document_type_value).value
+            size = int(size)
+        except (ObjectDoesNotExist, ValueError, TypeError) as e:
+            return Response({"message": f"Invalid ID, DocumentType or size: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            session = ChunkedUploadService.start(
+                contentieux=contentieux,
+                uploaded_by=uploaded_by,
+                document_type=document_type,
+                original_name=file_name,
+                mime_type=request.data.get('mimeType') or 'application/octet-stream',
+                size=size,
+            )
+            return Response(chunked_upload_state(session), status=status.HTTP_201_CREATED)
+        except ChunkedUploadError as e:
+            return Response({"message": str(e)}, status=e.status_code)
+        except Exception as e:
+            logger.error(f"Error starting chunked upload: {e}")
+            return Response({"message": "Erreur lors de l'initialisation de l'upload."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ChunkedUploadView(APIView):
+    """
+    GET    /praevia/api/documents/uploads/<upload_id>/  -> progress (resume from nextChunk)
+    DELETE /praevia/api/documents/uploads/<upload_id>/  -> abort
+    """
+    def get(self, request, upload_id):
+        try:
+            return Response(chunked_upload_state(UploadSession.objects.get(pk=upload_id)), status=status.HTTP_200_OK)
+        except ObjectDoesNotExist:
+            return Response({"message": "Upload non trouvé."}, status=status.HTTP_404_NOT_FOUND)
+
+    def delete(self, request, upload_id):
+        ChunkedUploadService.abort(upload_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChunkedUploadChunkView(APIView):
+    """
+    PUT /praevia/api/documents/uploads/<upload_id>/chunks/<index>/
+    Raw body (application/octet-stream), optional X-Chunk-SHA256 header.
+    """
+    def put(self, request, upload_id, index):
+        try:
+            session = ChunkedUploadService.receive_chunk(
+                upload_id, index, request.stream, request.headers.get('X-Chunk-SHA256')
+            )
+            return Response(chunked_upload_state(session), status=status.HTTP_200_OK)
+        except ObjectDoesNotExist:
+            return Response({"message": "Upload non trouvé."}, status=status.HTTP_404_NOT_FOUND)
+        except ChunkedUploadError as e:
+            return Response({"message": str(e)}, status=e.status_code)
+        except Exception as e:
+            logger.error(f"Error receiving upload chunk: {e}")
+            return Response({"message": "Erreur lors de la réception du chunk."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ChunkedUploadCompleteView(APIView):
+    """
+    POST /praevia/api/documents/uploads/<upload_id>/complete/
+    Body (optional): sha256 of the whole file, checked against the assembled one.
+    """
+    def post(self, request, upload_id):
+        try:
+            session = ChunkedUploadService.complete(upload_id, request.data.get('sha256'))
+            return Response({
+                **DocumentSerializer(session.document).data,
+                "sha256": session.sha256,
+            }, status=status.HTTP_201_CREATED)
+        except ObjectDoesNotExist:
+            return Response({"message": "Upload non trouvé."}, status=status.HTTP_404_NOT_FOUND)
+        except ChunkedUploadError as e:
+            return Response({"message": str(e)}, status=e.status_code)
+        except ValidationError as e:
+            logger.error(f"Validation error completing upload: {e.message_dict}")
+            return Response({"message": "Erreur de validation des données.", "details": e.message_dict}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Error completing chunked upload: {e}")
+            return Response({"message": "Erreur lors de la finalisation de l'upload."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def chunked_upload_state(session):
+    return {
+        "uploadId": str(session.pk),
+        "size": session.size,
+        "received": session.received,
+        "nextChunk": session.chunks,
+        "maxChunkSize": settings.UPLOAD_CHUNK_MAX_SIZE,
+        "documentId": session.document_id,
+    }
+
+
 class DocumentDownloadView(APIView):
     def get(self, request, document_id):
         try:
             document = Document.objects.get(id=document_id)
-            file_path = document.file.path
-
-            if not os.path.exists(file_path):
-                raise Http404("Fichier non trouvé sur le serveur.")
-
-            response = FileResponse(open(file_path, 'rb'), content_type=document.mime_type)
-            response = f'attachment; filename="{document.original_name}"' # Correct header
-            return response
+            # Offloaded to the proxy or served with Range/ETag support, see downloads.py
+            return document_response(request, document)
         except ObjectDoesNotExist:
             return Response({"message": "Document non trouvé."}, status=status.HTTP_404_NOT_FOUND)
         except Http404 as e:
@@ -378,6 +645,19 @@ class DocumentDownloadView(APIView):
             return Response({"message": "Erreur lors du téléchargement du document."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class DocumentThumbnailView(APIView):
+    def get(self, request, document_id):
+        document = Document.objects.filter(id=document_id).only('thumbnail').first()
+        if document is None or not document.thumbnail:
+            return Response({"message": "Aperçu non disponible."}, status=status.HTTP_404_NOT_FOUND)
+        # Same URL after a re-upload, another file: revalidated on every use against its name (the sha256)
+        etag = quote_etag(os.path.basename(document.thumbnail.name))
+        response = not_modified(request, etag, None)
+        if response is not None:
+            return response
+        return set_validators(FileResponse(document.thumbnail.open('rb'), content_type='image/jpeg'), etag, None)
+
+
 # --- DossierATMP Views (function-based, now DRF @api_view) ---
 
 @api_view(['GET', 'POST'])
@@ -387,11 +667,12 @@ def dossiers_view(request):
     GET or POST /praevia/api/dossiers/
     """
     if request.method == 'POST':
-        data = {**request.data, 'reference': f"DAT-{int(datetime.now().timestamp())}"}
-        serializer = DossierATMPSerializer(data=data)
+        serializer = DossierATMPSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        dossier = serializer.save()
+        reference = next_dossier_reference()
+        with transaction.atomic():
+            dossier = serializer.save(reference=reference)
         return Response(DossierATMPSerializer(dossier).data, status=status.HTTP_201_CREATED)
 
     elif request.method == 'GET':
@@ -409,12 +690,13 @@ def create_dossier(request):
     """
     POST /praevia/api/dossiers/
     """
-    # inject a reference on the fly
-    data = {**request.data, 'reference': f"DAT-{int(datetime.now().timestamp())}"}
-    serializer = DossierATMPSerializer(data=data)
+    # inject a reference on the fly (reference is read-only in the serializer)
+    serializer = DossierATMPSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    dossier = serializer.save()
+    reference = next_dossier_reference()
+    with transaction.atomic():
+        dossier = serializer.save(reference=reference)
     return Response(DossierATMPSerializer(dossier).data, status=status.HTTP_201_CREATED)
 
 
@@ -443,32 +725,35 @@ def get_dossier_by_id(request, dossier_id):
     return Response(serialized.data, status=status.HTTP_200_OK)
 
 
-class ContentieuxViewSet(viewsets.ModelViewSet):
+class ContentieuxViewSet(EagerLoadingMixin, SparseFieldsetMixin, ResponseCacheMixin, ConditionalGetMixin, StreamingExportMixin, viewsets.ModelViewSet):
     queryset = Contentieux.objects.all()
     serializer_class = ContentieuxSerializer
+    list_serializer_class = ContentieuxListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
-    def create(self, request, *args, **kwargs):
-        reference = f"CONT-{int(datetime.now().timestamp())}"
-        request.data['reference'] = reference
-        request.data['status'] = ContentieuxStatus.DRAFT.value
-        return super().create(request, *args, **kwargs)
+    def perform_create(self, serializer):
+        serializer.save(reference=next_contentieux_reference(), status=ContentieuxStatus.DRAFT.value)
 
 
-class AuditViewSet(viewsets.ModelViewSet):
+class AuditViewSet(EagerLoadingMixin, SparseFieldsetMixin, ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Audit.objects.all()
     serializer_class = AuditSerializer
+    list_serializer_class = AuditListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     @action(detail=True, methods=['post'])
     def finalize(self, request, pk=None):
         return AuditFinalizeView.as_view()(request._request, pk)
 
 
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(EagerLoadingMixin, SparseFieldsetMixin, ResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
+    list_serializer_class = DocumentListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
 
     @action(detail=True, methods=['get'])
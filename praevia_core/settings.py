@@ -93,6 +93,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'praevia_api.metrics.RequestMetricsMiddleware',  # first: times the whole stack (METRICS_ENABLED)
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -128,6 +129,8 @@ WSGI_APPLICATION = 'praevia_core.wsgi.application'
 # -----------------------------------------------------------------------------
 # Database
 # -----------------------------------------------------------------------------
+# DATABASE_URL is required: DossierATMP's persisted GeneratedFields fail the system
+# checks (fields.E220/E222) on the dummy backend dj_database_url leaves without it
 DATABASES = {
     'default': dj_database_url.config(
         default=os.getenv('DATABASE_URL'),
@@ -147,12 +150,59 @@ DATABASES = {
 #}
 
 
+# -----------------------------------------------------------------------------
+# Caches
+# -----------------------------------------------------------------------------
+# CACHE_BACKEND / RESPONSE_CACHE_BACKEND: locmem (per process), file (shared by
+# the workers of one host), redis or memcached (shared by all hosts: set
+# *_LOCATION to the server URL, e.g. redis://cache:6379/1).
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+
+
+def cache_config(backend, location, timeout=300, max_entries=None):
+    if backend == 'file' and not os.path.isabs(location):
+        location = os.path.join(BASE_DIR, 'tmp_cache', location)
+    config = {'BACKEND': CACHE_BACKENDS[backend], 'LOCATION': location, 'TIMEOUT': timeout}
+    if max_entries and backend in ('locmem', 'file'):
+        # Size bound; redis and memcached evict on their own memory limit
+        config['OPTIONS'] = {'MAX_ENTRIES': max_entries, 'CULL_FREQUENCY': 4}
+    return config
+
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', CACHE_BACKEND)
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))  # seconds, 0 disables the response cache
+if RESPONSE_CACHE_BACKEND not in ('redis', 'memcached'):
+    # Invalidations only reach the process that made the write: other workers and the
+    # job container would serve stale responses (and confirm them with 304s)
+    RESPONSE_CACHE_TTL = 0
+
+CACHES = {
+    'default': cache_config(
+        CACHE_BACKEND, os.getenv('CACHE_LOCATION', 'praevia-default'),
+        max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+    ),
+    # Rendered API responses, invalidated by signals (praevia_api/caching.py)
+    'responses': cache_config(
+        RESPONSE_CACHE_BACKEND, os.getenv('RESPONSE_CACHE_LOCATION', 'praevia-responses'),
+        timeout=RESPONSE_CACHE_TTL,
+        max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '5000')),
+    ),
+}
+
+
 # -----------------------------------------------------------------------------
 # Django REST framework
 # -----------------------------------------------------------------------------
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication', # Keep for browsable API
+        'praevia_api.authentication.CachedTokenAuthentication', # Token from LoginView, for Postman/Frontend
         #'praevia_api.authentication.JWTAuthentication',         # For Postman/Frontend
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -161,14 +211,52 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'praevia_api.fastjson.FastJSONRenderer',  # orjson, stdlib json if not installed
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'praevia_api.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES_FOR_BROWSABLE_API': [
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
 
+# --- Dashboards ---
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '60'))  # seconds; also invalidated on writes
+DASHBOARD_OVERDUE_DAYS = int(os.getenv('DASHBOARD_OVERDUE_DAYS', '30'))
+
+# --- Async views (ASGI/uvicorn deployment, see praevia_api/async_views.py) ---
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() == 'true'  # route dashboards, audit-by-dossier and downloads to the async views
+ASYNC_QUERY_FANOUT = os.getenv('ASYNC_QUERY_FANOUT', 'True').lower() == 'true'  # run independent dashboard queries concurrently, one DB connection each
+
+# --- Request metrics (praevia_api/metrics.py, GET /metrics) ---
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(BASE_DIR, 'tmp_metrics'))  # worker snapshots summed by /metrics, empty: this worker only
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', '5'))  # seconds between snapshots of a worker
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # scraper bearer token; without one only staff sessions may read /metrics
+
+# --- Slow query log (praevia_api/slowqueries.py, `manage.py slow_queries`) ---
+SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', '200'))  # statements at least this slow are recorded, 0 disables
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv('SLOW_QUERY_BUFFER_SIZE', '200'))  # recent slow statements kept per worker
+SLOW_QUERY_EXPLAIN_INTERVAL = int(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', '300'))  # seconds before a fingerprint is explained again
+
+# --- Background jobs (praevia_api/jobs.py, `manage.py run_workers`) ---
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))  # runs before a failing job is marked FAILED
+JOB_RETRY_BASE_SECONDS = int(os.getenv('JOB_RETRY_BASE_SECONDS', '10'))  # first retry delay, doubled after every failure
+JOB_RETRY_MAX_SECONDS = int(os.getenv('JOB_RETRY_MAX_SECONDS', '3600'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))  # seconds an idle worker waits before looking again
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', '900'))  # RUNNING for longer: its worker died, the job is queued again
+
+# --- Token authentication cache (per worker process) ---
+TOKEN_AUTH_CACHE_SIZE = int(os.getenv('TOKEN_AUTH_CACHE_SIZE', '10000'))
+TOKEN_AUTH_CACHE_TTL = int(os.getenv('TOKEN_AUTH_CACHE_TTL', '60'))  # seconds; bounds staleness in other workers
+
+# --- References (DAT-00000001, CONT-00000001) ---
+REFERENCE_BLOCK_SIZE = int(os.getenv('REFERENCE_BLOCK_SIZE', '100'))  # numbers reserved per worker round trip
+
 # --- IMPORTANT: Custom Authentication Backend for Django's Auth System ---
 AUTHENTICATION_BACKENDS = [
     #'praevia_api.backends.CustomAuthBackend', # <--- NEW: Your custom backend
@@ -190,6 +278,10 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+# Password hashing runs on a small thread pool per worker (praevia_api/hashing.py)
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '32'))  # waiting hashes before 503
+
 AUTH_USER_MODEL = 'praevia_api.User'
 
 # -----------------------------------------------------------------------------
@@ -220,15 +312,38 @@ MEDIA_URL = '/media/'
 #MEDIA_ROOT = BASE_DIR / 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'uploads')
 
+# Chunked uploads: chunks are streamed to UPLOAD_TEMP_DIR, never held in memory
+UPLOAD_TEMP_DIR = os.getenv('UPLOAD_TEMP_DIR', os.path.join(BASE_DIR, 'tmp_uploads'))
+UPLOAD_CHUNK_MAX_SIZE = int(os.getenv('UPLOAD_CHUNK_MAX_SIZE', str(8 * 1024 * 1024)))  # 8MB
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', str(1024 * 1024 * 1024)))  # 1GB
+
+# Document downloads: 'python' (in-process, Range/ETag aware),
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd)
+DOCUMENT_DOWNLOAD_MODE = os.getenv('DOCUMENT_DOWNLOAD_MODE', 'python')
+DOCUMENT_ACCEL_REDIRECT_PREFIX = os.getenv('DOCUMENT_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# Document processing after upload (praevia_api/processing.py, run by `manage.py run_workers`)
+DOCUMENT_PROCESS_WORKERS = int(os.getenv('DOCUMENT_PROCESS_WORKERS', '0'))  # pool processes per job worker, 0: one per core
+DOCUMENT_PROCESS_MAX_TASKS = int(os.getenv('DOCUMENT_PROCESS_MAX_TASKS', '200'))  # files before a pool process is replaced
+DOCUMENT_PROCESS_TIMEOUT = int(os.getenv('DOCUMENT_PROCESS_TIMEOUT', '300'))  # seconds per file, then the job is retried
+DOCUMENT_THUMBNAIL_SIZE = int(os.getenv('DOCUMENT_THUMBNAIL_SIZE', '256'))  # pixels, longest side
+DOCUMENT_TEXT_MAX_CHARS = int(os.getenv('DOCUMENT_TEXT_MAX_CHARS', '100000'))  # extracted text kept per document
+DOCUMENT_OCR_LANGUAGES = os.getenv('DOCUMENT_OCR_LANGUAGES', 'fra')  # tesseract languages for images and scanned pages, empty disables OCR
+DOCUMENT_OCR_MAX_PAGES = int(os.getenv('DOCUMENT_OCR_MAX_PAGES', '5'))  # scanned PDF pages OCRed per document
+
 # -----------------------------------------------------------------------------
 # Logging
 # -----------------------------------------------------------------------------
 LOG_DIR = BASE_DIR / 'logs'
 LOG_DIR.mkdir(exist_ok=True)
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', str(LOG_DIR / 'slow_queries.jsonl'))
 
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
     'handlers': {
         'console': {
             'level': 'DEBUG' if DEBUG else 'WARNING',
@@ -239,6 +354,11 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': str(LOG_DIR / 'django.log'),
         },
+        'slow_queries': {
+            'level': 'INFO',
+            'class': 'praevia_api.slowqueries.SlowQueryFileHandler',  # follows SLOW_QUERY_LOG
+            'formatter': 'message',
+        },
     },
     'root': {
         'handlers': ['console', 'file'],
@@ -249,6 +369,11 @@ LOGGING = {
             'handlers': ['console'],
             'level': 'INFO',
         },
+        'praevia_api.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
     #'loggers': {
     #    'django': {
@@ -3,6 +3,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from praevia_api import views # Import your app's views
+from praevia_api.metrics import metrics_view
 from django.conf import settings
 from django.views.generic import RedirectView
 from django.conf.urls.static import static
@@ -32,6 +33,9 @@ urlpatterns = [
         include(('praevia_api.urls', 'praevia_api'), namespace='praevia_api')
     ),
 
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
+
     # Serve favicon.ico
     path('favicon.ico', RedirectView.as_view(url='/static/favicon.ico', permanent=True)),
 